@@ -0,0 +1,289 @@
+"""
+Benchmark Suite
+===============
+
+Measures how the traffic, rice and traffic/air quality pipelines behave
+as the data grows.
+
+For every pipeline and size, a seeded synthetic CSV is generated once
+(synthetic_data.py) and the pipeline runs in a fresh process, so that the
+peak resident memory (RSS) of one run never leaks into the next. The
+pipelines call the shipped entry points (traffic_analysis' load_traffic,
+the three parts of clean_traffic and analyze_traffic, the rice_statistics
+functions the rice report uses and traffic_air_quality's join), so a
+regression in the report code shows up here. Each phase is timed separately and the results are written as JSON, tagged with the
+git commit, so runs can be compared across commits to catch regressions.
+
+RSS is only known as a peak of the whole process, so every phase records
+`process_peak_rss_mb` (the process peak so far) and `peak_rss_growth_mb`
+(how much this phase raised it). A run that crashes, or gives no result
+within `--timeout` seconds, is recorded as failed instead of stopping the
+suite.
+
+Usage:
+    python benchmark_suite.py --sizes 10000 100000 1000000
+    python benchmark_suite.py --compare bench_results/old.json bench_results/new.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue as queue_module
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import synthetic_data
+import traffic_air_quality
+from csv_loader import load_csv
+from data_schemas import RICE_SCHEMA
+from instrumentation import Instrumentation, git_commit, peak_rss_mb
+from memory_optimizer import optimize_memory
+from rice_statistics import fill_missing_prices, national_average_daily, provincial_statistics
+from rice_timeseries import rolling_price_statistics
+from traffic_analysis import aggregate_traffic, analyze_traffic, derive_traffic, fill_traffic, load_traffic
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DEFAULT_DATA_DIR = '.bench_data'
+DEFAULT_RESULTS_DIR = 'bench_results'
+
+# A run that has not reported its measurements after this many seconds is stopped and recorded as failed
+DEFAULT_TIMEOUT_S = 3600
+
+# A phase counts as a regression when it is this much slower (and slower by at least MIN_DELTA_S)
+DEFAULT_THRESHOLD = 0.20
+MIN_DELTA_S = 0.005
+
+
+# ----------------------------------------------------------------------------
+# Pipelines: the datasets they read and a list of (phase, function(state) -> state);
+# the first phase is called with the dataset paths
+# ----------------------------------------------------------------------------
+
+# The traffic phases: STEP 1, the three parts of STEP 2, then STEPs 3-7
+TRAFFIC_PHASES = [
+    ('clean', fill_traffic),
+    ('derive', derive_traffic),
+    ('aggregate', aggregate_traffic),
+    ('report', analyze_traffic),
+]
+
+def _rice_clean(df):
+    """PHASE 2 of the rice report: fill the gaps per province, then compact the dtypes"""
+    df, _ = fill_missing_prices(df)
+    return optimize_memory(df, RICE_SCHEMA)[0]
+
+
+def _rice_national(df):
+    """PHASE 3 of the rice report: daily national average and rolling statistics"""
+    national_average_daily(df)
+    rolling_price_statistics(df)
+    return df
+
+
+def _aqi_daily_traffic(traffic_path, aqi_path):
+    """Step 1 of the air quality report: stream the traffic CSV into daily aggregates"""
+    return traffic_air_quality.stream_daily_traffic(traffic_path), aqi_path
+
+
+def _aqi_load(inputs):
+    """Read the daily AQI readings next to the daily traffic"""
+    daily, aqi_path = inputs
+    return daily, traffic_air_quality.load_air_quality(aqi_path, use_cache=False)
+
+
+def _aqi_correlate(inputs):
+    """Lagged correlations per Location/Road_Type and per Road_Type, as in the report"""
+    daily, aqi = inputs
+    return traffic_air_quality.lagged_correlations(daily, aqi), \
+        traffic_air_quality.lagged_correlations(daily, aqi, by=['Road_Type'])
+
+
+PIPELINES = {
+    'traffic': (['traffic'], [
+        ('load', lambda path: load_traffic(path, use_cache=False)),
+        *TRAFFIC_PHASES,
+    ]),
+    'traffic_stream': (['traffic'], [
+        ('load', lambda path: load_traffic(path, stream=True)),
+        *TRAFFIC_PHASES,
+    ]),
+    'aqi': (['traffic', 'aqi'], [
+        ('aggregate', _aqi_daily_traffic),
+        ('load', _aqi_load),
+        ('correlate', _aqi_correlate),
+    ]),
+    'rice': (['rice'], [
+        ('load', lambda path: load_csv(path, RICE_SCHEMA)),
+        ('clean', _rice_clean),
+        ('national', _rice_national),
+        ('provincial', provincial_statistics),
+    ]),
+}
+
+
+def _run_pipeline(name, paths, n_rows, queue):
+    """Run one pipeline on its files and put the per-phase measurements on `queue`"""
+    _, phases = PIPELINES[name]
+    profiler = Instrumentation(enabled=True)
+    peak_before = peak_rss_mb()
+    args = paths
+    for phase, func in phases:
+        with profiler.phase(phase, rows=n_rows):
+            args = (func(*args),)
+
+    records = []
+    for record in profiler.records:
+        record = {'pipeline': name, **record}
+        peak = record.pop('peak_rss_mb')
+        record['process_peak_rss_mb'] = peak
+        record['peak_rss_growth_mb'] = peak - peak_before if peak is not None else None
+        records.append(record)
+        peak_before = peak
+    queue.put(records)
+
+
+def _wait_for_measurements(process, queue, timeout):
+    """The measurements a run puts on `queue`, or None if it exits without them or times out"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            return queue.get(timeout=1)
+        except queue_module.Empty:
+            if not process.is_alive():
+                break
+    try:
+        # The run may have put its result just before it exited
+        return queue.get(timeout=1)
+    except queue_module.Empty:
+        return None
+
+
+def dataset_path(kind, n_rows, seed, data_dir=DEFAULT_DATA_DIR):
+    """
+    Generate (once) and return the synthetic CSV for a dataset size. The AQI
+    data has one reading per day, as many as the traffic data of that size spans.
+    """
+    if kind == 'aqi':
+        n_rows = synthetic_data.traffic_days(n_rows)
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"{kind}_{n_rows}_seed{seed}.csv")
+    if not os.path.exists(path):
+        synthetic_data.write_csv(kind, path + '.tmp', n_rows, seed=seed)
+        os.replace(path + '.tmp', path)
+    return path
+
+
+def run_benchmarks(pipelines, sizes, seed=0, data_dir=DEFAULT_DATA_DIR, timeout=DEFAULT_TIMEOUT_S):
+    """Run every pipeline at every size, each in a fresh process; returns the result records"""
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for n_rows in sizes:
+        for name in pipelines:
+            kinds, _ = PIPELINES[name]
+            paths = [dataset_path(kind, n_rows, seed, data_dir) for kind in kinds]
+            queue = context.Queue()
+            process = context.Process(target=_run_pipeline, args=(name, paths, n_rows, queue))
+            process.start()
+            measurements = _wait_for_measurements(process, queue, timeout)
+            timed_out = measurements is None and process.is_alive()
+            process.join(timeout=0 if timed_out else 60)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+            if measurements is None or process.exitcode != 0:
+                reason = f"no result after {timeout:g} s" if timed_out else f"exit code {process.exitcode}"
+                results.append({'pipeline': name, 'rows': n_rows, 'phase': 'run', 'failed': True,
+                                'error': reason})
+                print(f"  {name:<15} {n_rows:>12,} rows  ❌ FAILED ({reason})")
+                continue
+            results.extend(measurements)
+            total = sum(m['seconds'] for m in measurements)
+            print(f"  {name:<15} {n_rows:>12,} rows  {total:8.3f} s  "
+                  f"process peak RSS {measurements[-1]['process_peak_rss_mb'] or 0:8.1f} MB")
+    return results
+
+
+def write_results(results, seed, results_dir=DEFAULT_RESULTS_DIR):
+    """Write the results with enough metadata to compare runs across commits"""
+    os.makedirs(results_dir, exist_ok=True)
+    commit = git_commit()
+    payload = {
+        'meta': {
+            'commit': commit,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'seed': seed,
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': results,
+    }
+    path = os.path.join(results_dir, f"{datetime.now():%Y%m%d-%H%M%S}_{commit}.json")
+    with open(path, 'w') as handle:
+        json.dump(payload, handle, indent=2)
+    return path
+
+
+def compare_results(baseline_path, current_path, threshold=DEFAULT_THRESHOLD):
+    """Print phase-by-phase changes between two result files; returns the regressions"""
+    with open(baseline_path) as handle:
+        baseline = json.load(handle)
+    with open(current_path) as handle:
+        current = json.load(handle)
+
+    def key(record):
+        return record['pipeline'], record['rows'], record['phase']
+
+    old = {key(record): record for record in baseline['results']}
+    regressions = []
+    print(f"Comparing {baseline['meta']['commit']} → {current['meta']['commit']} (threshold {threshold:.0%})")
+    for record in current['results']:
+        if record.get('failed'):
+            print(f"  {record['pipeline']:<15} {record['rows']:>12,} ❌ FAILED ({record['error']})")
+            regressions.append(record)
+            continue
+        previous = old.get(key(record))
+        if previous is None or previous.get('failed'):
+            continue
+        change = record['seconds'] / previous['seconds'] - 1 if previous['seconds'] > 0 else 0.0
+        regressed = change > threshold and record['seconds'] - previous['seconds'] > MIN_DELTA_S
+        marker = "❌ REGRESSION" if regressed else ""
+        print(f"  {record['pipeline']:<15} {record['rows']:>12,} {record['phase']:<10} "
+              f"{previous['seconds']:8.3f} s → {record['seconds']:8.3f} s ({change:+7.1%}) {marker}")
+        if regressed:
+            regressions.append(record)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the traffic, rice and air quality pipelines")
+    parser.add_argument('--pipelines', nargs='+', choices=sorted(PIPELINES), default=sorted(PIPELINES))
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES,
+                        help="row counts to benchmark (10^4 to 10^8)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    parser.add_argument('--results-dir', default=DEFAULT_RESULTS_DIR)
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help="compare two result files instead of running benchmarks")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT_S,
+                        help="seconds to wait for one pipeline run before recording it as failed")
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare_results(*args.compare, threshold=args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    print(f"Benchmarking {', '.join(args.pipelines)} at sizes {args.sizes}")
+    records = run_benchmarks(args.pipelines, args.sizes, seed=args.seed, data_dir=args.data_dir,
+                             timeout=args.timeout)
+    print(f"✓ Results written to {write_results(records, args.seed, args.results_dir)}")
+    sys.exit(1 if any(record.get('failed') for record in records) else 0)
@@ -0,0 +1,143 @@
+"""
+Columnar Cache for CSV Inputs
+=============================
+
+The first load of a CSV parses the text straight into the typed schema
+from data_schemas.py (see csv_loader.py) and writes the result to a binary cache next to the
+source file (Parquet when pyarrow is installed, otherwise a pandas pickle).
+Later loads read the cache directly, skipping text parsing and date
+conversion entirely.
+
+A cache entry is keyed on the source file's size and modification time
+(and optionally a SHA-256 of its contents), together with the schema, so
+editing the CSV or changing the schema automatically rebuilds it.
+
+A date range and value filters (the same ones csv_loader takes) are pushed
+into the Parquet read: row groups whose Date statistics lie outside the
+range are skipped without being read, and only matching rows are kept.
+The pickle fallback loads the whole frame and filters it in memory.
+"""
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from csv_loader import load_csv, select_rows
+from data_schemas import schema_for
+
+try:
+    import pyarrow  # noqa: F401  (only needed for the Parquet format)
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+CACHE_DIR_NAME = '.data_cache'
+
+# Rows per Parquet row group: the unit a filtered read can skip
+ROW_GROUP_ROWS = 100_000
+
+
+def _file_sha256(file_path, block_size=1 << 20):
+    """Hash a file's contents in fixed-size blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as handle:
+        for block in iter(lambda: handle.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_fingerprint(file_path, schema, verify_hash=False):
+    """Describe the exact source file + schema a cache entry was built from"""
+    stat = os.stat(file_path)
+    fingerprint = {
+        'source': os.path.basename(file_path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'schema': schema,
+    }
+    if verify_hash:
+        fingerprint['sha256'] = _file_sha256(file_path)
+    return fingerprint
+
+
+def cache_paths(file_path, cache_dir=None):
+    """Return (data path, metadata path) of the cache entry for a CSV file"""
+    directory = cache_dir or os.path.join(os.path.dirname(os.path.abspath(file_path)), CACHE_DIR_NAME)
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    extension = '.parquet' if HAS_PYARROW else '.pkl'
+    return os.path.join(directory, stem + extension), os.path.join(directory, stem + '.json')
+
+
+def _parquet_filters(date_range, filters, date_column):
+    """pyarrow filter expression of a date range and {column: values} filters (None if there is nothing)"""
+    conditions = []
+    if date_range is not None:
+        start, end = date_range
+        if start is not None:
+            conditions.append((date_column, '>=', pd.Timestamp(start)))
+        if end is not None:
+            conditions.append((date_column, '<=', pd.Timestamp(end)))
+    for column, values in (filters or {}).items():
+        if values is not None:
+            conditions.append((column, 'in', list(values) if isinstance(values, (list, tuple, set, frozenset)) else [values]))
+    return conditions or None
+
+
+def _read_cache(data_path, date_range=None, filters=None, date_column='Date'):
+    if data_path.endswith('.parquet'):
+        conditions = _parquet_filters(date_range, filters, date_column)
+        if conditions is None:
+            return pd.read_parquet(data_path)
+        df = pd.read_parquet(data_path, filters=conditions).reset_index(drop=True)
+        # Keep only the categories of the rows read, like a filtered load_csv
+        for column in df.columns:
+            if isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = df[column].cat.remove_unused_categories()
+        return df
+    return select_rows(pd.read_pickle(data_path), date_range, filters, date_column)
+
+
+def _write_cache(df, data_path):
+    # Write to a temporary file first so a crash never leaves a half-written cache
+    temp_path = data_path + '.tmp'
+    if data_path.endswith('.parquet'):
+        df.to_parquet(temp_path, index=False, row_group_size=ROW_GROUP_ROWS)
+    else:
+        df.to_pickle(temp_path)
+    os.replace(temp_path, data_path)
+
+
+def load_csv_cached(file_path, schema=None, cache_dir=None, verify_hash=False, refresh=False, engine='c',
+                    date_range=None, filters=None, date_column='Date'):
+    """
+    Load a CSV as a typed DataFrame, using the columnar cache when it is valid
+    (`engine` is the csv_loader parse engine used to rebuild it). Only rows
+    inside `date_range` and matching `filters` are returned (see csv_loader.row_mask);
+    a valid Parquet cache applies them while reading.
+
+    Raises FileNotFoundError if the source CSV does not exist, exactly like
+    pd.read_csv, so callers keep their existing error handling.
+    """
+    if schema is None:
+        schema = schema_for(file_path)
+    fingerprint = source_fingerprint(file_path, schema, verify_hash)
+    data_path, meta_path = cache_paths(file_path, cache_dir)
+
+    if not refresh and os.path.exists(data_path) and os.path.exists(meta_path):
+        with open(meta_path) as handle:
+            stored = json.load(handle)
+        if stored == fingerprint:
+            return _read_cache(data_path, date_range, filters, date_column)
+
+    df = load_csv(file_path, schema, engine=engine)
+    try:
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        _write_cache(df, data_path)
+        with open(meta_path, 'w') as handle:
+            json.dump(fingerprint, handle, indent=2)
+    except OSError:
+        # A read-only location only costs us the warm start, never the analysis
+        pass
+    return select_rows(df, date_range, filters, date_column)
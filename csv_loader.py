@@ -0,0 +1,183 @@
+"""
+Schema-Driven CSV Loader
+========================
+
+Reads a CSV straight into the typed schemas of data_schemas.py, parsing
+only what a report needs:
+
+- usecols:   only the requested columns are parsed
+- dtypes:    the date columns are parsed by the reader itself instead of
+             in a second pass afterwards, float and string columns get
+             their type while the text is parsed, and the remaining
+             conversions run once on the selected rows only
+- filters:   rows outside `date_range`, or whose Location / Province (or
+             any other column) is not one of the requested values, are
+             dropped chunk by chunk, so only matching rows are ever kept.
+             With `date_sorted=True` reading stops at the first chunk past
+             the end of the range.
+- engines:   'c' (pandas' default parser) or 'pyarrow', which parses with
+             several threads when pyarrow is installed ('auto' picks it if
+             available). pyarrow reads the selected columns in one go and
+             filters them afterwards, so chunked reads (iter_csv with a
+             chunksize, i.e. every streaming consumer) refuse it and 'auto'
+             picks c for them: memory stays bounded by the chunk size.
+- gzip:      compressed files (.gz, .bz2, .zip, .xz) are read transparently
+
+load_csv() returns one frame, equal to apply_schema(pd.read_csv(path))
+restricted to the selected columns and rows. iter_csv() yields the chunks
+for streaming consumers; their categorical columns are still plain text.
+"""
+
+import numpy as np
+import pandas as pd
+
+from data_schemas import apply_schema, schema_for
+
+try:
+    import pyarrow  # noqa: F401  (only needed for engine='pyarrow')
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+PARSE_ENGINES = ['c', 'pyarrow', 'auto']
+
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def resolve_engine(engine, chunked=False):
+    """
+    The parser to use for `engine` ('auto' is pyarrow when installed, else c).
+    A `chunked` read always uses c: pyarrow would read the whole file at once.
+    """
+    if engine not in PARSE_ENGINES:
+        raise ValueError(f"Unknown parse engine '{engine}'. Choose from {PARSE_ENGINES}")
+    if engine == 'auto':
+        return 'pyarrow' if HAS_PYARROW and not chunked else 'c'
+    if engine == 'pyarrow' and chunked:
+        raise ValueError("engine='pyarrow' reads the whole file at once and cannot read in chunks; "
+                         "use engine='c' or 'auto'")
+    if engine == 'pyarrow' and not HAS_PYARROW:
+        raise ImportError("engine='pyarrow' needs the pyarrow package (pip install pyarrow)")
+    return engine
+
+
+def _read_options(schema, usecols):
+    """dtype and parse_dates arguments of pd.read_csv for the schema columns being read"""
+    dtype, parse_dates = {}, []
+    for column, kind in schema.items():
+        if usecols is not None and column not in usecols:
+            continue
+        if kind.startswith('datetime64'):
+            parse_dates.append(column)
+        elif kind.startswith('float') or kind == 'string':
+            dtype[column] = kind
+        # Integer and boolean columns are parsed as plain NumPy arrays (building the nullable
+        # types inside the parser is slower), and categories are built once the chunks are
+        # joined so that every chunk shares them; apply_schema finishes both
+    return dtype, parse_dates
+
+
+def _values(values):
+    """A filter value or list of values as a list"""
+    if isinstance(values, (list, tuple, set, frozenset, pd.Index, np.ndarray)):
+        return list(values)
+    return [values]
+
+
+def row_mask(df, date_range=None, filters=None, where=None, date_column='Date'):
+    """
+    Boolean mask of the rows with `date_column` inside the inclusive `date_range`
+    (start, end; either may be None), whose `filters` columns hold one of the given
+    values, and for which the callable `where(df)` is True
+    """
+    mask = np.ones(len(df), dtype=bool)
+    if date_range is not None:
+        start, end = date_range
+        dates = df[date_column]
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates)
+        if start is not None:
+            mask &= (dates >= pd.Timestamp(start)).to_numpy(dtype=bool, na_value=False)
+        if end is not None:
+            mask &= (dates <= pd.Timestamp(end)).to_numpy(dtype=bool, na_value=False)
+    for column, values in (filters or {}).items():
+        mask &= df[column].isin(_values(values)).to_numpy(dtype=bool, na_value=False)
+    if where is not None:
+        mask &= where(df)
+    return mask
+
+
+def select_rows(df, date_range=None, filters=None, date_column='Date'):
+    """Rows of a frame already in memory that pass the same filters as the loader"""
+    if date_range is None and not filters:
+        return df
+    return df.loc[row_mask(df, date_range, filters, date_column=date_column)].reset_index(drop=True)
+
+
+def _select_columns(chunk, usecols):
+    """The `usecols` columns of a chunk, in file order"""
+    if usecols is None or len(usecols) == len(chunk.columns):
+        return chunk
+    return chunk[[column for column in chunk.columns if column in usecols]]
+
+
+def iter_csv(file_path, schema=None, columns=None, date_range=None, filters=None, where=None,
+             chunksize=DEFAULT_CHUNKSIZE, engine='c', date_column='Date', date_sorted=False):
+    """
+    Yield the rows of a CSV that pass the filters, in chunks of at most `chunksize`
+    source rows (None: one chunk), with only `columns` (default: all). `schema`
+    defaults to the dataset's schema; pass {} to keep pandas' default types.
+    engine='pyarrow' needs chunksize=None (ValueError otherwise).
+    """
+    if schema is None:
+        schema = schema_for(file_path)
+    engine = resolve_engine(engine, chunked=chunksize is not None)
+    filters = {column: values for column, values in (filters or {}).items() if values is not None}
+
+    # The filter columns are read too, and dropped once the rows are selected
+    filter_columns = set(filters) | ({date_column} if date_range is not None else set())
+    usecols = None if columns is None else [column for column in schema if column in columns] + \
+        sorted(set(columns) - set(schema))
+    read_columns = None if usecols is None else usecols + sorted(filter_columns - set(usecols))
+    dtype, parse_dates = _read_options(schema, read_columns)
+    end = None if date_range is None or date_range[1] is None else pd.Timestamp(date_range[1])
+
+    options = dict(usecols=read_columns, dtype=dtype, parse_dates=parse_dates, engine=engine)
+    if chunksize is None:
+        # One read of the whole file (pyarrow parses it on several threads)
+        chunks = [pd.read_csv(file_path, **options)]
+    else:
+        chunks = pd.read_csv(file_path, chunksize=chunksize, **options)
+
+    filtered = date_range is not None or filters or where is not None
+    for chunk in chunks:
+        if date_sorted and end is not None and len(chunk):
+            first_date = chunk[date_column].iloc[0]
+            if pd.notna(first_date) and pd.Timestamp(first_date) > end:
+                # Every later row is past the range too
+                yield _select_columns(chunk.iloc[:0], usecols)
+                break
+        if filtered:
+            chunk = chunk.loc[row_mask(chunk, date_range, filters, where, date_column)]
+        yield _select_columns(chunk, usecols)
+
+
+def load_csv(file_path, schema=None, columns=None, date_range=None, filters=None, where=None,
+             chunksize=DEFAULT_CHUNKSIZE, engine='c', date_column='Date', date_sorted=False):
+    """
+    Load the rows of a CSV that pass the filters as one typed frame (see iter_csv).
+    With pyarrow the whole file is parsed at once and filtered afterwards.
+    Raises FileNotFoundError if the file does not exist, like pd.read_csv.
+    """
+    if schema is None:
+        schema = schema_for(file_path)
+    if (date_range is None and not filters and where is None) or resolve_engine(engine) == 'pyarrow':
+        # Nothing to filter, or pyarrow: a single read without chunks
+        chunksize = None
+    chunks = list(iter_csv(file_path, schema, columns, date_range, filters, where, chunksize, engine,
+                           date_column, date_sorted))
+    if not chunks:
+        # A file with a header and no rows
+        chunks = list(iter_csv(file_path, schema, columns, chunksize=None, engine=engine))
+    df = chunks[0] if len(chunks) == 1 else pd.concat(chunks)
+    return apply_schema(df.reset_index(drop=True), schema)
@@ -0,0 +1,108 @@
+"""
+Dataset Schemas
+===============
+
+Typed column schemas for the CSV datasets shipped with the course, plus a
+helper that converts a freshly parsed frame to those dtypes.
+
+Categorical columns hold each distinct string once, Hour fits in int16 and
+Is_Weekend is a (nullable) boolean, so typed frames are much smaller than
+the object-string frames pd.read_csv produces by default.
+"""
+
+import os
+
+import pandas as pd
+
+TRAFFIC_SCHEMA = {
+    'Date': 'datetime64[ns]',
+    'Location': 'category',
+    'Hour': 'int16',
+    'Vehicle_Count': 'float64',
+    'Average_Speed_kmh': 'float64',
+    'Weather_Condition': 'category',
+    'Is_Weekend': 'boolean',
+    'Road_Type': 'category',
+}
+
+# Columns derived in STEP 2 of the traffic analysis
+TRAFFIC_DERIVED_SCHEMA = {
+    'Day_of_Week': 'category',
+    'Time_Period': 'category',
+}
+
+RICE_SCHEMA = {
+    'Date': 'datetime64[ns]',
+    'Province': 'category',
+    'Price_per_Kg': 'float64',
+}
+
+AQI_SCHEMA = {
+    'Date': 'datetime64[ns]',
+    'PM2.5': 'float64',
+    'O3': 'float64',
+    'CO': 'float64',
+}
+
+STUDENT_SCHEMA = {
+    'StudentID': 'string',
+    'Name': 'string',
+    'Subject': 'category',
+    'Score': 'float64',
+    'StudyHours': 'float64',
+}
+
+# Schemas of the datasets that ship with the course
+DATASET_SCHEMAS = {
+    'jakarta_traffic_data.csv': TRAFFIC_SCHEMA,
+    'indonesia_rice_prices.csv': RICE_SCHEMA,
+    'jakarta_aqi_data.csv': AQI_SCHEMA,
+    'sample_student_data.csv': STUDENT_SCHEMA,
+}
+
+# Values the categorical traffic columns may hold
+WEATHER_CONDITIONS = ['Sunny', 'Cloudy', 'Rainy']
+ROAD_TYPES = ['Main_Road', 'Highway', 'Secondary_Road']
+
+# Extensions of compressed CSVs (pandas decompresses them while reading)
+COMPRESSION_EXTENSIONS = ('.gz', '.bz2', '.zip', '.xz')
+
+# Nullable counterparts used when an integer column contains missing values
+NULLABLE_INTEGERS = {
+    'int8': 'Int8',
+    'int16': 'Int16',
+    'int32': 'Int32',
+    'int64': 'Int64',
+    'uint8': 'UInt8',
+    'uint16': 'UInt16',
+    'uint32': 'UInt32',
+    'uint64': 'UInt64',
+}
+
+
+def dataset_name(file_path):
+    """File name of a dataset without its directory and compression extension"""
+    name = os.path.basename(file_path)
+    for extension in COMPRESSION_EXTENSIONS:
+        if name.endswith(extension):
+            name = name[:-len(extension)]
+    return name
+
+
+def schema_for(file_path):
+    """Schema of a course dataset by file name, also when compressed (an empty schema otherwise)"""
+    return DATASET_SCHEMAS.get(dataset_name(file_path), {})
+
+
+def apply_schema(df, schema):
+    """Convert the columns of `df` named in `schema` to their declared dtypes (in place)"""
+    for column, dtype in schema.items():
+        if column not in df.columns:
+            continue
+        if dtype.startswith('datetime64'):
+            df[column] = pd.to_datetime(df[column])
+        elif dtype in NULLABLE_INTEGERS and df[column].isnull().any():
+            df[column] = df[column].astype(NULLABLE_INTEGERS[dtype])
+        elif str(df[column].dtype) != dtype:
+            df[column] = df[column].astype(dtype)
+    return df
@@ -0,0 +1,398 @@
+"""
+Data Quality Validation
+=======================
+
+Declarative rules for the course datasets, checked with whole-column
+NumPy / pandas operations only (no per-row Python), so bad rows can be
+routed to a quarantine before STEP 2 / PHASE 2 fill and average them:
+
+- RangeRule:       values outside [low, high] or not numbers (a negative
+                   Vehicle_Count, a speed over 150 km/h, Hour 24)
+- AllowedValues:   values outside a reference list (e.g. Road_Type)
+- DependencyRule:  a column that must be fixed per key, e.g. one Road_Type per
+                   Location; rows that disagree with the key's most common
+                   value break it
+- UniqueRule:      a repeated key such as (Date, Location, Hour); the first
+                   row is kept and the repeats are quarantined
+- ConsistencyRule: any vectorized check across columns (Is_Weekend must
+                   match the weekday of Date)
+- OutlierRule:     robust z-score |x - median| / (1.4826 * MAD) per group
+                   above a threshold
+- SpikeRule:       a value that differs by more than `max_change` (0.5 = 50%)
+                   from both the previous and the next value of its group in
+                   date order, e.g. a one-day price spike
+
+Missing values never break a rule, because the cleaning steps fill them.
+
+    result = validate(df, TRAFFIC_RULES)
+    result.valid          # rows that pass every rule
+    result.quarantine     # the other rows, with the rules they broke
+    result.summary        # violations per rule
+
+Run this file on a course dataset to print its summary, e.g.
+`python data_validation.py jakarta_traffic_data.csv --quarantine bad_rows.csv`.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_schemas import ROAD_TYPES, WEATHER_CONDITIONS, dataset_name
+
+# Scale factor that makes the median absolute deviation comparable to a standard deviation
+MAD_SCALE = 1.4826
+
+QUARANTINE_COLUMN = 'Failed_Rules'
+
+
+def _numbers(series):
+    """Column as float64 values (values that are not numbers become NaN)"""
+    if pd.api.types.is_bool_dtype(series):
+        series = series.astype('float64')
+    return pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _known(mask):
+    """Boolean array of a (possibly nullable) mask; missing counts as no violation"""
+    if isinstance(mask, np.ndarray) and mask.dtype == bool:
+        return mask
+    return pd.array(mask, dtype='boolean').to_numpy(dtype=bool, na_value=False)
+
+
+def _group_codes(df, by):
+    """Integer code of the `by` group of every row (-1 where a key is missing)"""
+    if not by:
+        return np.zeros(len(df), dtype=np.int64)
+    return df.groupby(list(by), observed=True, dropna=True, sort=False).ngroup().to_numpy()
+
+
+def _group_median(values, codes):
+    """Median of `values` within each group, broadcast back to the rows"""
+    return pd.Series(values).groupby(codes).transform('median').to_numpy()
+
+
+class Rule:
+    """One data-quality check; violations(df) returns a boolean mask of the rows that break it"""
+
+    check = None
+
+    def __init__(self, name, columns):
+        self.name = name
+        self.columns = list(columns)
+
+    def applies(self, df):
+        return all(column in df.columns for column in self.columns)
+
+    def violations(self, df):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.name!r})"
+
+
+class RangeRule(Rule):
+    check = 'range'
+
+    def __init__(self, column, low=None, high=None, integer=False, name=None):
+        bounds = f"{'-inf' if low is None else low}..{'inf' if high is None else high}"
+        super().__init__(name or f"{column} in {bounds}", [column])
+        self.low, self.high, self.integer = low, high, integer
+
+    def violations(self, df):
+        series = df[self.columns[0]]
+        values = _numbers(series)
+        present = series.notna().to_numpy()
+        with np.errstate(invalid='ignore'):
+            bad = present & np.isnan(values)
+            if self.low is not None:
+                bad |= values < self.low
+            if self.high is not None:
+                bad |= values > self.high
+            if self.integer:
+                bad |= present & (values != np.floor(values))
+        return bad
+
+
+class AllowedValues(Rule):
+    check = 'referential'
+
+    def __init__(self, column, values, name=None):
+        super().__init__(name or f"{column} is a known value", [column])
+        self.values = list(values)
+
+    def violations(self, df):
+        series = df[self.columns[0]]
+        return _known(series.notna() & ~series.isin(self.values))
+
+
+class DependencyRule(Rule):
+    check = 'referential'
+
+    def __init__(self, column, key, name=None):
+        super().__init__(name or f"one {column} per {key}", [key, column])
+        self.key, self.column = key, column
+
+    def violations(self, df):
+        pairs = df[[self.key, self.column]].dropna()
+        counts = pairs.groupby([self.key, self.column], observed=True).size()
+        if not len(counts):
+            return np.zeros(len(df), dtype=bool)
+        # The most common value per key (ties go to the first in sorted order)
+        counts = counts.sort_values(ascending=False, kind='stable')
+        expected = counts.reset_index().drop_duplicates(self.key).set_index(self.key)[self.column]
+        reference = df[self.key].map(expected)
+        return _known(df[self.column].notna() & reference.notna() & (df[self.column] != reference))
+
+
+class UniqueRule(Rule):
+    check = 'uniqueness'
+
+    def __init__(self, keys, name=None):
+        super().__init__(name or f"unique ({', '.join(keys)})", keys)
+
+    def violations(self, df):
+        return df.duplicated(self.columns, keep='first').to_numpy()
+
+
+class ConsistencyRule(Rule):
+    """`valid(df)` returns a boolean (or nullable boolean) mask of the rows that are consistent"""
+
+    check = 'consistency'
+
+    def __init__(self, name, columns, valid):
+        super().__init__(name, columns)
+        self.valid = valid
+
+    def violations(self, df):
+        return _known(~pd.array(self.valid(df), dtype='boolean'))
+
+
+class OutlierRule(Rule):
+    check = 'outlier'
+
+    def __init__(self, column, by=(), threshold=6.0, name=None):
+        by = [by] if isinstance(by, str) else list(by)
+        scope = f" per {', '.join(by)}" if by else ''
+        super().__init__(name or f"{column} robust z <= {threshold:g}{scope}", by + [column])
+        self.column, self.by, self.threshold = column, by, threshold
+
+    def violations(self, df):
+        values = _numbers(df[self.column])
+        codes = _group_codes(df, self.by)
+        median = _group_median(values, codes)
+        deviation = np.abs(values - median)
+        mad = _group_median(deviation, codes) * MAD_SCALE
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = deviation / mad
+        return (codes >= 0) & (mad > 0) & (z > self.threshold)
+
+
+class SpikeRule(Rule):
+    check = 'outlier'
+
+    def __init__(self, column, by, order='Date', max_change=0.5, name=None):
+        by = [by] if isinstance(by, str) else list(by)
+        name = name or f"{column} has no spike over {max_change:.0%} per {', '.join(by)}"
+        super().__init__(name, by + [order, column])
+        self.column, self.by, self.order, self.max_change = column, by, order, max_change
+
+    def violations(self, df):
+        if not len(df):
+            return np.zeros(0, dtype=bool)
+        values = _numbers(df[self.column])
+        codes = _group_codes(df, self.by)
+        times = pd.to_datetime(df[self.order], errors='coerce').to_numpy(dtype='datetime64[ns]')
+        order = np.lexsort((times, codes))
+        sorted_values, sorted_codes = values[order], codes[order]
+
+        # Previous and next valid value of the same group (NaN gaps are skipped)
+        positions = np.arange(len(order))
+        valid = ~np.isnan(sorted_values)
+        previous = np.maximum.accumulate(np.where(valid, positions, -1))
+        previous = np.concatenate([[-1], previous[:-1]])
+        following = np.minimum.accumulate(np.where(valid, positions, len(order))[::-1])[::-1]
+        following = np.concatenate([following[1:], [len(order)]])
+        has_previous, from_previous = self._jumps(sorted_values, sorted_codes, previous)
+        has_next, to_next = self._jumps(sorted_values, sorted_codes, following)
+
+        # A spike jumps away from both neighbours, so the normal reading after a spike (which
+        # only differs from the spike) and a lasting change of level are not flagged. The first
+        # and last value of a group have one neighbour, which must itself agree with the value
+        # beyond it (two values alone cannot tell which one is wrong)
+        after, before = np.minimum(following, len(order) - 1), np.maximum(previous, 0)
+        jumps_from_previous = has_previous & (from_previous > self.max_change)
+        jumps_to_next = has_next & (to_next > self.max_change)
+        steady_after = has_next[after] & (to_next[after] <= self.max_change)
+        steady_before = has_previous[before] & (from_previous[before] <= self.max_change)
+        spikes = (sorted_codes >= 0) & valid & (
+            (jumps_from_previous & jumps_to_next)
+            | (~has_previous & jumps_to_next & steady_after)
+            | (~has_next & jumps_from_previous & steady_before))
+
+        result = np.zeros(len(order), dtype=bool)
+        result[order] = spikes
+        return result
+
+    @staticmethod
+    def _jumps(values, codes, neighbours):
+        """Whether each value has its neighbour at `neighbours` in the same group, and the relative change from it"""
+        inside = (neighbours >= 0) & (neighbours < len(values))
+        neighbours = np.clip(neighbours, 0, len(values) - 1)
+        has_neighbour = inside & (codes[neighbours] == codes)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = np.abs(values / values[neighbours] - 1)
+        return has_neighbour, change
+
+
+# ============================================================================
+# Rules of the course datasets
+# ============================================================================
+
+def _weekend_matches_date(df):
+    weekdays = pd.to_datetime(df['Date'], errors='coerce').dt.dayofweek
+    expected = (weekdays >= 5).astype('boolean').mask(weekdays.isna())
+    return expected == df['Is_Weekend'].astype('boolean')
+
+
+TRAFFIC_RULES = [
+    RangeRule('Hour', 0, 23, integer=True),
+    RangeRule('Vehicle_Count', 0),
+    RangeRule('Average_Speed_kmh', 0, 150),
+    UniqueRule(['Date', 'Location', 'Hour']),
+    AllowedValues('Weather_Condition', WEATHER_CONDITIONS),
+    AllowedValues('Road_Type', ROAD_TYPES),
+    DependencyRule('Road_Type', 'Location'),
+    ConsistencyRule('Is_Weekend matches Date', ['Date', 'Is_Weekend'], _weekend_matches_date),
+    OutlierRule('Vehicle_Count', by=['Location', 'Hour']),
+]
+
+RICE_RULES = [
+    RangeRule('Price_per_Kg', 1),
+    UniqueRule(['Date', 'Province']),
+    SpikeRule('Price_per_Kg', by='Province'),
+]
+
+AQI_RULES = [
+    RangeRule('PM2.5', 0, 1000),
+    RangeRule('O3', 0, 1000),
+    RangeRule('CO', 0, 100),
+    OutlierRule('PM2.5'),
+]
+
+STUDENT_RULES = [
+    RangeRule('Score', 0, 100),
+    RangeRule('StudyHours', 0, 168),
+    UniqueRule(['StudentID', 'Subject']),
+]
+
+DATASET_RULES = {
+    'jakarta_traffic_data.csv': TRAFFIC_RULES,
+    'indonesia_rice_prices.csv': RICE_RULES,
+    'jakarta_aqi_data.csv': AQI_RULES,
+    'sample_student_data.csv': STUDENT_RULES,
+}
+
+
+def rules_for(file_path):
+    """Rules of a course dataset by file name (also when compressed)"""
+    name = dataset_name(file_path)
+    if name not in DATASET_RULES:
+        raise KeyError(f"No validation rules for '{name}'. Known datasets: {sorted(DATASET_RULES)}")
+    return DATASET_RULES[name]
+
+
+# ============================================================================
+# Engine
+# ============================================================================
+
+class ValidationResult:
+    """Rows that pass, quarantined rows (with the rules they broke) and violations per rule"""
+
+    def __init__(self, valid, quarantine, summary):
+        self.valid = valid
+        self.quarantine = quarantine
+        self.summary = summary
+
+    @property
+    def n_quarantined(self):
+        return len(self.quarantine)
+
+    def write_quarantine(self, path):
+        """Write the quarantined rows as CSV (compressed when the path ends in .gz etc.)"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.quarantine.to_csv(path, index=False)
+        return path
+
+
+def _drop_unused_categories(df):
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].cat.remove_unused_categories()
+    return df
+
+
+def validate(df, rules):
+    """Check every rule that applies to the columns of `df` and split the rows into valid and quarantined"""
+    rules = [rule for rule in rules if rule.applies(df)]
+    violations = np.zeros((len(df), len(rules)), dtype=bool)
+    for position, rule in enumerate(rules):
+        violations[:, position] = rule.violations(df)
+
+    counts = violations.sum(axis=0)
+    summary = pd.DataFrame({
+        'Check': [rule.check for rule in rules],
+        'Violations': counts,
+        'Share': counts / max(len(df), 1),
+    }, index=pd.Index([rule.name for rule in rules], name='Rule'))
+
+    failed = violations.any(axis=1)
+    quarantine = df.loc[failed].copy()
+    # Names of the broken rules, joined column by column (only the quarantined rows)
+    labels = np.full(int(failed.sum()), '', dtype=object)
+    for position, rule in enumerate(rules):
+        broken = violations[failed, position]
+        labels = np.where(broken & (labels != ''), labels + '; ', labels)
+        labels = np.where(broken, labels + rule.name, labels)
+    quarantine[QUARANTINE_COLUMN] = labels
+    valid = _drop_unused_categories(df.loc[~failed].copy()) if failed.any() else df
+    return ValidationResult(valid, quarantine, summary)
+
+
+def format_summary(summary):
+    """Summary table with the share of rows as a percentage"""
+    return summary.to_string(formatters={'Share': '{:.2%}'.format})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate a course dataset and quarantine the rows that fail")
+    parser.add_argument('file', help="one of: " + ', '.join(sorted(DATASET_RULES)) + " (or a .gz copy)")
+    parser.add_argument('--quarantine', default=None, help="write the failing rows to this CSV")
+    args = parser.parse_args(argv)
+
+    from csv_loader import load_csv
+
+    try:
+        rules = rules_for(args.file)
+        df = load_csv(args.file)
+    except (KeyError, FileNotFoundError) as error:
+        print(f"❌ Error: {error}")
+        return 1
+
+    start = time.perf_counter()
+    result = validate(df, rules)
+    elapsed = time.perf_counter() - start
+    print(format_summary(result.summary))
+    print(f"\n✓ {len(df):,} rows checked against {len(result.summary)} rules in {elapsed * 1000:.1f} ms: "
+          f"{len(result.valid):,} valid, {result.n_quarantined:,} quarantined")
+    if args.quarantine:
+        print(f"✓ Quarantined rows written to {result.write_quarantine(args.quarantine)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
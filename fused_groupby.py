@@ -0,0 +1,212 @@
+"""
+Fused GroupBy Aggregation Engine
+================================
+
+Computes many (keys, metric) aggregations over the same frame in a single
+vectorized pass. Each key column is factorized into integer codes once,
+multi-column groupings combine those codes arithmetically, and the per-group
+row counts, sums and non-missing counts are accumulated with np.bincount.
+
+Compared with one df.groupby(...) call per report section, no key column is
+hashed more than once and every metric column is converted to a float array
+only once.
+
+Sums are kept exact. Each one is a pair of floats, '<metric>_sum' plus a
+small correction '<metric>_sum_lo', whose total is the exact sum of the rows
+(to about 100 bits). Partials from chunks, workers or runs are added with
+sum_partials(), which keeps the pairs exact. So a sum does not depend on
+how the rows were split or ordered, and every mode rounds the same exact
+value.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# Suffix of the low-order part of an exact sum column
+LOW_SUFFIX = '_lo'
+
+# Error-free extraction passes before the (tiny) remainder is summed directly
+EXTRACT_LEVELS = 3
+
+
+def _two_sum(a, b):
+    """a + b as (rounded sum, exact rounding error)"""
+    total = a + b
+    b_part = total - a
+    return total, (a - (total - b_part)) + (b - b_part)
+
+
+def _two_product(a, b):
+    """a * b as (rounded product, exact rounding error), by Dekker's splitting"""
+    product = a * b
+    split = 134217729.0  # 2**27 + 1
+    a_big = split * a
+    a_high = a_big - (a_big - a)
+    a_low = a - a_high
+    b_big = split * b
+    b_high = b_big - (b_big - b)
+    b_low = b - b_high
+    error = ((a_high * b_high - product) + a_high * b_low + a_low * b_high) + a_low * b_low
+    return product, error
+
+
+def exact_group_sums(codes, values, n_groups):
+    """
+    Per-group sums of `values` (group number in `codes`) as (high, low) arrays
+    whose total is the exact sum. The values are split into parts that are
+    multiples of one power of two, so np.bincount adds each part without rounding.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    high = np.zeros(n_groups)
+    low = np.zeros(n_groups)
+    bits = len(values).bit_length() + 1
+    for _ in range(EXTRACT_LEVELS):
+        largest = max(float(values.max()), -float(values.min())) if len(values) else 0.0
+        if largest == 0.0 or not np.isfinite(largest):
+            break
+        # Every part is a multiple of ulp(sigma) and their sums stay below sigma, so they are exact
+        sigma = np.ldexp(1.0, int(np.frexp(largest)[1]) + bits)
+        part = values + sigma
+        part -= sigma
+        values = values - part
+        high, error = _two_sum(high, np.bincount(codes, weights=part, minlength=n_groups))
+        low += error
+    low += np.bincount(codes, weights=values, minlength=n_groups)
+    return _two_sum(high, low)
+
+
+def exact_total(high, low):
+    """Exact (high, low) total of the exact sums of several groups"""
+    values = np.concatenate([np.asarray(high, dtype=np.float64), np.asarray(low, dtype=np.float64)])
+    total_high, total_low = exact_group_sums(np.zeros(len(values), dtype=np.int64), values, 1)
+    return total_high[0], total_low[0]
+
+
+def exact_sum(values):
+    """Exact sum of an array or Series (missing values skipped), rounded once to a float"""
+    values = np.asarray(pd.to_numeric(values, errors='coerce'), dtype=np.float64)
+    high, low = exact_total(values[~np.isnan(values)], [])
+    return float(high + low)
+
+
+def add_exact(left, right):
+    """Add two (high, low) exact sums (floats or arrays)"""
+    high, error = _two_sum(left[0], right[0])
+    return _two_sum(high, left[1] + right[1] + error)
+
+
+def add_exact_product(pair, count, value):
+    """Add `count` copies of `value` to a (high, low) exact sum"""
+    product, error = _two_product(np.asarray(count, dtype=np.float64), value)
+    return add_exact(pair, (product, error))
+
+
+def sum_partials(frame, by=None):
+    """
+    Add up the rows of a partial aggregate frame per group of `by` (index
+    levels; default: the whole index, to merge duplicate groups). Counts are
+    summed as integers and '<metric>_sum'/'_sumsq' columns with their '_lo'
+    parts stay exact. Missing keys are kept as their own group.
+    """
+    if by is None:
+        by = list(range(frame.index.nlevels))
+    grouped = frame.groupby(level=by, observed=True, dropna=False, sort=True)
+    codes = grouped.ngroup().to_numpy()
+    n_groups = grouped.ngroups
+    exact = [column for column in frame.columns if f'{column}{LOW_SUFFIX}' in frame.columns]
+    parts = [column for column in exact] + [f'{column}{LOW_SUFFIX}' for column in exact]
+    result = grouped[[column for column in frame.columns if column not in parts]].sum()
+    for column in exact:
+        # The high and low parts of every row go into one exact sum per group
+        high, low = exact_group_sums(np.concatenate([codes, codes]),
+                                     np.concatenate([frame[column].to_numpy(dtype=np.float64),
+                                                     frame[f'{column}{LOW_SUFFIX}'].to_numpy(dtype=np.float64)]),
+                                     n_groups)
+        result[column], result[f'{column}{LOW_SUFFIX}'] = high, low
+    return result[list(frame.columns)]
+
+
+class FusedGroupBy:
+    """Factorize key columns once and aggregate many groupings from the codes"""
+
+    def __init__(self, df, key_columns):
+        self.n_rows = len(df)
+        self.codes = {}
+        self.uniques = {}
+        for column in dict.fromkeys(key_columns):
+            # use_na_sentinel=False keeps missing keys as their own group
+            codes, uniques = pd.factorize(df[column], use_na_sentinel=False)
+            self.codes[column] = codes.astype(np.int64, copy=False)
+            self.uniques[column] = pd.Index(uniques, name=column)
+        self._metrics = {}
+        self._df = df
+
+    def _metric_arrays(self, metric):
+        """Return (values with NaN replaced by 0, non-missing mask as float) for a metric"""
+        if metric not in self._metrics:
+            values = pd.to_numeric(self._df[metric], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+            valid = ~np.isnan(values)
+            self._metrics[metric] = (np.where(valid, values, 0.0), valid.astype(np.float64))
+        return self._metrics[metric]
+
+    def group_codes(self, keys):
+        """Return (dense group code per row, number of groups, index builder) for a grouping"""
+        keys = list(keys)
+        sizes = [len(self.uniques[key]) for key in keys]
+        combined = np.zeros(self.n_rows, dtype=np.int64)
+        for key, size in zip(keys, sizes):
+            combined = combined * size + self.codes[key]
+        n_cells = int(np.prod(sizes, dtype=np.int64)) if sizes else 1
+
+        # A sparse cross product would make bincount allocate mostly-empty cells,
+        # so compress it to the observed combinations first
+        if n_cells > 4 * self.n_rows + 1024:
+            cell_codes, observed = pd.factorize(combined, sort=True)
+            return cell_codes.astype(np.int64), len(observed), (keys, sizes, observed)
+        return combined, n_cells, (keys, sizes, None)
+
+    def _build_index(self, cells, layout):
+        """Translate group cell numbers back into an Index/MultiIndex of key values"""
+        keys, sizes, observed = layout
+        if observed is not None:
+            cells = observed[cells]
+        per_key = np.unravel_index(cells, sizes) if sizes else ()
+        levels = [self.uniques[key].take(codes) for key, codes in zip(keys, per_key)]
+        if len(levels) == 1:
+            return levels[0].rename(keys[0])
+        return pd.MultiIndex.from_arrays(levels, names=keys)
+
+    def aggregate(self, keys, metrics, squares=False):
+        """
+        Return a frame indexed by the grouping with a 'rows' column plus
+        '<metric>_sum' (with its '<metric>_sum_lo' part) and '<metric>_count'
+        columns for every metric (and '<metric>_sumsq' with `squares`, for variances).
+        Only groups that occur in the data are returned.
+        """
+        codes, n_cells, layout = self.group_codes(keys)
+        rows = np.bincount(codes, minlength=n_cells)
+        present = np.flatnonzero(rows)
+
+        result = {'rows': rows[present]}
+        for metric in metrics:
+            values, valid = self._metric_arrays(metric)
+            sums = [('sum', values)] + ([('sumsq', values * values)] if squares else [])
+            for name, weights in sums:
+                high, low = exact_group_sums(codes, weights, n_cells)
+                result[f'{metric}_{name}'], result[f'{metric}_{name}{LOW_SUFFIX}'] = high[present], low[present]
+            result[f'{metric}_count'] = np.bincount(codes, weights=valid, minlength=n_cells)[present].astype(np.int64)
+        return pd.DataFrame(result, index=self._build_index(present, layout))
+
+
+def fused_aggregate(df, groupings, metrics, squares=False):
+    """
+    Compute sum/count (and with `squares`, sum-of-squares) partials for every
+    grouping in one pass over `df`.
+    Returns a dict mapping each grouping tuple to its partial frame.
+    """
+    groupings = [tuple(keys) for keys in groupings]
+    key_columns = [key for keys in groupings for key in keys]
+    engine = FusedGroupBy(df, key_columns)
+    return {keys: engine.aggregate(keys, metrics, squares) for keys in groupings}
+
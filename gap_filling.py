@@ -0,0 +1,137 @@
+"""
+Gap Filling Engine
+==================
+
+Fills missing values in a long-format time series (e.g. Date × Province
+prices) without any per-group Python:
+
+1. Rows are sorted once by (group, time), so the result no longer depends
+   on the order in which rows arrived.
+2. For every row the previous and next valid observation inside the same
+   group are found with cumulative max/min over row positions.
+3. Each strategy fills what the previous ones left:
+   - 'ffill':       carry the last known value forward
+   - 'bfill':       carry the next known value backward
+   - 'interpolate': linear in time between the surrounding values
+                    (interior gaps only)
+
+`limit` caps how many consecutive values a strategy may fill from its
+anchor (like pandas' limit=), and `max_gap` skips gaps longer than that
+many values entirely. fill_gaps() reports how many values each strategy
+filled and how many are still missing; fill_sorted() is the same engine
+for arrays already in (group, time) order, e.g. the columns of a
+rice_matrix.PriceMatrix.
+"""
+
+import numpy as np
+import pandas as pd
+
+FILL_STRATEGIES = ['ffill', 'bfill', 'interpolate']
+DEFAULT_STRATEGIES = ('ffill', 'bfill')
+
+
+def _group_bounds(sorted_codes):
+    """First and last row position of the group each (sorted) row belongs to"""
+    n = len(sorted_codes)
+    positions = np.arange(n)
+    is_start = np.ones(n, dtype=bool)
+    is_start[1:] = sorted_codes[1:] != sorted_codes[:-1]
+    is_end = np.ones(n, dtype=bool)
+    is_end[:-1] = is_start[1:]
+    group_start = np.maximum.accumulate(np.where(is_start, positions, 0))
+    group_end = np.minimum.accumulate(np.where(is_end, positions, n)[::-1])[::-1]
+    return group_start, group_end
+
+
+def _neighbours(valid, group_start, group_end):
+    """Position of the previous/next valid row in the same group (-1 / n when there is none)"""
+    n = len(valid)
+    positions = np.arange(n)
+    previous = np.maximum.accumulate(np.where(valid, positions, -1))
+    previous = np.where(previous >= group_start, previous, -1)
+    following = np.minimum.accumulate(np.where(valid, positions, n)[::-1])[::-1]
+    following = np.where(following <= group_end, following, n)
+    return previous, following
+
+
+def fill_sorted(values, times, codes, strategies=DEFAULT_STRATEGIES, limit=None, max_gap=None):
+    """
+    Fill the float64 `values` in place; they, `times` and the group `codes`
+    (-1: never filled) must already be sorted by (group, time). Returns the
+    number of values each strategy filled.
+    """
+    n = len(values)
+    positions = np.arange(n)
+    group_start, group_end = _group_bounds(codes)
+    fillable = codes >= 0
+    counts = {}
+
+    for strategy in strategies:
+        valid = ~np.isnan(values)
+        previous, following = _neighbours(valid, group_start, group_end)
+        missing = ~valid & fillable
+
+        # Extent of the gap each missing row sits in (bounded by its group)
+        gap_first = np.where(previous >= 0, previous + 1, group_start)
+        gap_last = np.where(following < n, following - 1, group_end)
+        within_gap = (gap_last - gap_first + 1) <= max_gap if max_gap is not None else True
+
+        if strategy == 'ffill':
+            target = missing & (previous >= 0) & within_gap
+            if limit is not None:
+                target &= positions - previous <= limit
+            filled = values[np.clip(previous, 0, None)]
+        elif strategy == 'bfill':
+            target = missing & (following < n) & within_gap
+            if limit is not None:
+                target &= following - positions <= limit
+            filled = values[np.clip(following, 0, n - 1)]
+        elif strategy == 'interpolate':
+            target = missing & (previous >= 0) & (following < n) & within_gap
+            if limit is not None:
+                target &= positions - previous <= limit
+            lo, hi = np.clip(previous, 0, None), np.clip(following, 0, n - 1)
+            span = times[hi] - times[lo]
+            # Duplicate timestamps fall back to row distance
+            weight = np.where(span != 0, (times - times[lo]) / np.where(span != 0, span, 1),
+                              (positions - lo) / np.maximum(hi - lo, 1))
+            filled = values[lo] + (values[hi] - values[lo]) * weight
+        else:
+            raise ValueError(f"Unknown fill strategy '{strategy}'. Choose from {FILL_STRATEGIES}")
+
+        values[target] = filled[target]
+        counts[strategy] = int(target.sum())
+    return counts
+
+
+def fill_gaps(df, value_column, group_column, time_column, strategies=DEFAULT_STRATEGIES,
+              limit=None, max_gap=None):
+    """
+    Fill missing `value_column` entries of `df` (in place) within each
+    `group_column` group, ordered by `time_column`.
+
+    Returns (df, report) where report maps each strategy to the number of
+    values it filled, plus 'remaining' for values still missing.
+    """
+    n = len(df)
+    codes = pd.factorize(df[group_column])[0].astype(np.int64)
+    times = pd.to_datetime(df[time_column]).to_numpy().view(np.int64) \
+        if not pd.api.types.is_numeric_dtype(df[time_column]) else df[time_column].to_numpy()
+    times = times.astype(np.float64)
+
+    # Sort once by (group, time); lexsort is stable so ties keep their input order
+    order = np.lexsort((times, codes))
+    values = df[value_column].to_numpy(dtype=np.float64, na_value=np.nan)[order].copy()
+    counts = fill_sorted(values, times[order], codes[order], strategies, limit, max_gap)
+
+    restored = np.empty(n, dtype=np.float64)
+    restored[order] = values
+    df[value_column] = restored
+    counts['remaining'] = int(np.isnan(restored).sum())
+    return df, counts
+
+
+def format_fill_report(report):
+    """One-line summary of a fill_gaps report"""
+    filled = ", ".join(f"{strategy}: {count}" for strategy, count in report.items() if strategy != 'remaining')
+    return f"{filled} (still missing: {report['remaining']})"
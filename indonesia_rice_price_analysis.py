@@ -3,14 +3,45 @@
 # GOAL: To analyze rice price data across Indonesian provinces with highly
 # explanatory logging, creating a self-documenting report of the findings.
 
+import argparse
+
 import pandas as pd
 import numpy as np
 from datetime import datetime
 
-def analyze_rice_prices(file_path):
+from columnar_cache import load_csv_cached
+from csv_loader import PARSE_ENGINES, load_csv
+from data_schemas import RICE_SCHEMA
+from data_validation import RICE_RULES, format_summary, validate as validate_rows
+from memory_optimizer import format_bytes, memory_summary, optimize_memory, plain_read_usage
+from gap_filling import DEFAULT_STRATEGIES, FILL_STRATEGIES, format_fill_report
+from instrumentation import Instrumentation
+from parallel_analysis import parallel_rice_analysis
+from rice_matrix import PriceMatrix
+from rice_statistics import PROVINCIAL_QUANTILE_COLUMNS, PROVINCIAL_STAT_COLUMNS, fill_missing_prices, \
+    national_average_daily, provincial_statistics
+from rice_timeseries import DEFAULT_WINDOWS, rolling_price_statistics
+
+def analyze_rice_prices(file_path, use_cache=True, workers=None, fill_strategies=DEFAULT_STRATEGIES, max_gap=None,
+                        profiler=None, matrix=False, date_range=None, provinces=None, engine='c',
+                        validate=False, quarantine_path=None, matrix_dir=None):
     """
     Loads, cleans, and analyzes rice price data, printing a detailed log of each step.
+    With `workers`, cleaning and aggregation run per province in a process pool.
+    Missing prices are filled per province in date order using `fill_strategies`
+    (ffill / bfill / interpolate); gaps longer than `max_gap` values are left as-is.
+    Pass an enabled Instrumentation as `profiler` to time each phase.
+    With `matrix`, phases 2-4 run on a dense Date x Province price matrix; with
+    `matrix_dir` the filled matrix is saved there and phases 3-4 run on it memory-mapped.
+    `date_range` (start, end) and `provinces` keep only those rows while the CSV is read;
+    `engine` is the csv_loader parse engine ('c', 'pyarrow' or 'auto').
+    With `validate`, rows that break data_validation.RICE_RULES (non-positive prices,
+    repeated Date/Province rows, day-over-day spikes) are quarantined before cleaning,
+    and written to `quarantine_path` when given.
     """
+    if profiler is None:
+        profiler = Instrumentation()
+
     # --- Report Header ---
     print("=" * 70)
     print("INDONESIAN RICE PRICE STABILITY ANALYSIS REPORT")
@@ -19,13 +50,27 @@ def analyze_rice_prices(file_path):
 
     try:
         # --- Step 1: Data Loading ---
+        profiler.start('PHASE 1: DATA LOADING AND PREPARATION')
         print("\n[PHASE 1: DATA LOADING AND PREPARATION]")
         print(f"--> Action: Loading dataset from the file '{file_path}'...")
-        df = pd.read_csv(file_path)
+        filters = {'Province': provinces} if provinces else None
+        if date_range is not None:
+            start, end = date_range
+            print(f"--> Action: Keeping only prices from {start or 'the first date'} to {end or 'the last date'}.")
+        if provinces:
+            print(f"--> Action: Keeping only the provinces: {', '.join(provinces)}.")
+        if use_cache:
+            # Typed columnar cache: only the first run pays for parsing the text CSV
+            df = load_csv_cached(file_path, RICE_SCHEMA, engine=engine, date_range=date_range, filters=filters)
+        else:
+            # Typed columns and parsed dates straight from the reader, only the requested rows kept
+            df = load_csv(file_path, RICE_SCHEMA, date_range=date_range, filters=filters, engine=engine)
+        profiler.set_rows(len(df))
         print(f"--> Success: Data loaded successfully. Found {df.shape[0]} rows and {df.shape[1]} columns.")
         print("-" * 70)
 
         # --- Step 2: Data Cleaning and Validation ---
+        profiler.start('PHASE 2: DATA CLEANING AND VALIDATION', rows=len(df))
         print("\n[PHASE 2: DATA CLEANING AND VALIDATION]")
         print("--> Goal: Ensure data is accurate and ready for time-series analysis.")
 
@@ -34,75 +79,141 @@ def analyze_rice_prices(file_path):
         df['Date'] = pd.to_datetime(df['Date'])
         print("--> Success: 'Date' column is now in datetime format.")
 
+        if validate:
+            print("--> Action: Checking every row against the data-quality rules (range, uniqueness, price spikes).")
+            print("--> Why: A wrong price would otherwise be carried into the gap filling and every average.")
+            validation = validate_rows(df, RICE_RULES)
+            print(format_summary(validation.summary))
+            df = validation.valid
+            print(f"--> Result: {len(df)} rows passed every rule, {validation.n_quarantined} quarantined.")
+            if quarantine_path:
+                print(f"--> Result: Quarantined rows written to '{validation.write_quarantine(quarantine_path)}'.")
+
+        if matrix:
+            print("--> Action: Building a dense Date x Province float32 price matrix.")
+            print("--> Why: Every later step becomes a NumPy reduction along one axis instead of a groupby over province names.")
+            prices = PriceMatrix.from_frame(df)
+
         # Check for missing values before cleaning
         missing_values = df['Price_per_Kg'].isnull().sum()
+        if workers:
+            print(f"--> Action: Cleaning and aggregating provinces in parallel across {workers} worker processes.")
+            print("--> Why: Each province is filled and summarized independently, so the work splits cleanly by province.")
+            df, fill_report, national_average, provincial_stats = parallel_rice_analysis(
+                df, workers, strategies=fill_strategies, max_gap=max_gap)
         print(f"--> Action: Checking for missing values in 'Price_per_Kg' column...")
         if missing_values > 0:
             print(f"--> Result: Found {missing_values} missing price entries. These must be handled.")
             # Handle missing values using a forward-fill strategy
-            print("--> Action: Handling missing values using a forward-fill method grouped by province.")
+            print(f"--> Action: Handling missing values per province in date order using: {', '.join(fill_strategies)}.")
             print("--> Why: This assumes a missing price is the same as the last known price for that specific province, preventing data from one region affecting another.")
-            df['Price_per_Kg'] = df.groupby('Province')['Price_per_Kg'].transform(
-                lambda x: x.ffill().bfill()
-            )
+            if matrix:
+                prices, fill_report = prices.fill_missing_prices(fill_strategies, max_gap=max_gap)
+            elif not workers:
+                df, fill_report = fill_missing_prices(df, fill_strategies, max_gap=max_gap)
+            print(f"--> Result: Values filled per strategy - {format_fill_report(fill_report)}.")
             # Verify that no missing values remain
-            if df['Price_per_Kg'].isnull().sum() == 0:
+            remaining = prices.missing() if matrix else df['Price_per_Kg'].isnull().sum()
+            if remaining == 0:
                 print("--> Success: All missing price values have been handled.")
             else:
                 print("--> Warning: Some missing values could not be filled.")
         else:
             print("--> Success: No missing values found in the price column.")
+
+        # Compact dtypes before the analysis phases
+        if matrix:
+            print(f"--> Result: Price matrix of {len(prices.dates)} dates x {len(prices.provinces)} provinces "
+                  f"uses {format_bytes(prices.nbytes)}.")
+            if matrix_dir:
+                print(f"--> Action: Saving the filled matrix to '{matrix_dir}' and opening it memory-mapped.")
+                print("--> Why: Phases 3-4 then read the .npy pages from disk, and other processes can open the same files without copying them.")
+                prices.save(matrix_dir)
+                prices = PriceMatrix.open(matrix_dir)
+        else:
+            print("--> Action: Converting columns to compact dtypes (categorical Province, downcast prices).")
+            df, memory_report = optimize_memory(df, RICE_SCHEMA, before=plain_read_usage(df))
+            print(f"--> Result: Memory usage {memory_summary(memory_report)}.")
         print("-" * 70)
 
 
         # --- Step 3: National Level Analysis ---
+        profiler.start('PHASE 3: NATIONAL LEVEL ANALYSIS', rows=len(df))
         print("\n[PHASE 3: NATIONAL LEVEL ANALYSIS]")
         print("--> Goal: Understand the overall price trend across the entire country.")
         print("--> Action: Grouping data by 'Date' to calculate the daily national average price.")
 
-        national_average_daily = df.groupby('Date')['Price_per_Kg'].mean().round(2)
-        overall_national_avg = national_average_daily.mean()
+        if matrix:
+            national_average = prices.national_average_daily()
+        elif not workers:
+            national_average = national_average_daily(df)
+        overall_national_avg = national_average.mean()
 
         print("--> Success: National average trend calculated.")
         print(f"--> Insight: The overall national average price during this period was: Rp {overall_national_avg:,.2f} per Kg.")
+
+        print(f"--> Action: Computing rolling {'/'.join(str(w) for w in DEFAULT_WINDOWS)}-day averages, volatility and returns for every province in one pass.")
+        rolling = rolling_price_statistics(prices if matrix else df)
+        national_change = rolling.national['Return_30d'].iloc[-1]
+        if pd.notna(national_change):
+            print(f"--> Insight: Over the last 30 days the national average price changed by {national_change:+.2%}.")
         print("-" * 70)
 
 
         # --- Step 4: Provincial Level Analysis for Volatility ---
+        profiler.start('PHASE 4: PROVINCIAL LEVEL ANALYSIS', rows=len(df))
         print("\n[PHASE 4: PROVINCIAL LEVEL ANALYSIS]")
         print("--> Goal: Identify price volatility and average costs at the regional level.")
         print("--> Why: National averages can hide regional extremes. This analysis pinpoints specific provinces that require attention.")
         print("--> Action: Grouping data by 'Province' and calculating key statistics (mean, std, min, max).")
         print("--> Key Metric: Standard Deviation ('std') is used to measure volatility. A higher value means less stable prices.")
 
-        provincial_stats = df.groupby('Province')['Price_per_Kg'].agg(['mean', 'std', 'min', 'max'])
-        provincial_stats.rename(columns={'mean': 'Average_Price', 'std': 'Volatility (Std_Dev)', 'min': 'Min_Price', 'max': 'Max_Price'}, inplace=True)
-        provincial_stats.fillna(0, inplace=True)
+        if matrix:
+            provincial_stats = prices.provincial_statistics()
+        elif not workers:
+            provincial_stats = provincial_statistics(df)
 
         print("--> Success: Provincial statistics calculated. Preparing final report...")
         print("-" * 70)
 
 
         # --- Step 5: Final Report Generation ---
+        profiler.start('PHASE 5: FINAL REPORT', rows=len(df))
         most_volatile = provincial_stats.sort_values(by='Volatility (Std_Dev)', ascending=False)
         most_expensive = provincial_stats.sort_values(by='Average_Price', ascending=False)
+        stat_columns = list(PROVINCIAL_STAT_COLUMNS.values())
+        quantile_columns = list(PROVINCIAL_QUANTILE_COLUMNS.values())
 
         print("\n" + "="*20 + " FINAL REPORT " + "="*20)
         print("\n[--- FINDING 1: MOST VOLATILE PROVINCES ---]")
         print("The following provinces exhibit the highest price instability. These regions may be")
         print("experiencing supply chain disruptions or other market pressures, making them a priority for review.")
-        print(most_volatile.head().to_string(formatters={'Average_Price':'Rp {:,.2f}'.format, 'Volatility (Std_Dev)':'{:.2f}'.format, 'Min_Price':'Rp {:,.2f}'.format, 'Max_Price':'Rp {:,.2f}'.format}))
+        print(most_volatile[stat_columns].head().to_string(formatters={'Average_Price':'Rp {:,.2f}'.format, 'Volatility (Std_Dev)':'{:.2f}'.format, 'Min_Price':'Rp {:,.2f}'.format, 'Max_Price':'Rp {:,.2f}'.format}))
 
         print("\n[--- FINDING 2: MOST EXPENSIVE PROVINCES ---]")
         print("The following provinces have the highest average rice prices, indicating a greater")
         print("financial burden on consumers for this essential food item.")
-        print(most_expensive.head().to_string(formatters={'Average_Price':'Rp {:,.2f}'.format, 'Volatility (Std_Dev)':'{:.2f}'.format, 'Min_Price':'Rp {:,.2f}'.format, 'Max_Price':'Rp {:,.2f}'.format}))
+        print(most_expensive[stat_columns].head().to_string(formatters={'Average_Price':'Rp {:,.2f}'.format, 'Volatility (Std_Dev)':'{:.2f}'.format, 'Min_Price':'Rp {:,.2f}'.format, 'Max_Price':'Rp {:,.2f}'.format}))
+
+        print("\n[--- FINDING 3: PRICE DISTRIBUTION IN THE MOST VOLATILE PROVINCES ---]")
+        print("Median (P50) and high-end (P90, P99) prices show how often the volatile provinces see")
+        print("price spikes. Quantiles are approximate, within 1% of the exact value.")
+        print(most_volatile[quantile_columns].head().to_string(float_format='Rp {:,.2f}'.format))
+
+        print("\n[--- FINDING 4: RECENT PRICE MOVEMENT ---]")
+        print(f"Rolling volatility and 30-day price change as of {rolling.dates[-1].date()}, most volatile (30 days) first.")
+        print("Whole-period statistics can hide a province that has only recently become unstable.")
+        recent = rolling.latest()[['Volatility_7d', 'Volatility_30d', 'Volatility_90d', 'Return_30d']]
+        recent = recent.sort_values('Volatility_30d', ascending=False)
+        print(recent.head().to_string(na_rep='-', formatters={'Volatility_7d': '{:.2f}'.format, 'Volatility_30d': '{:.2f}'.format,
+                                                               'Volatility_90d': '{:.2f}'.format, 'Return_30d': '{:+.2%}'.format}))
 
         print("\n" + "="*54)
         print("\n[--- SUMMARY ---]")
         print("This analysis has successfully identified key provinces based on rice price volatility and average cost.")
         print(f"The most volatile province was '{most_volatile.index[0]}', while the most expensive was '{most_expensive.index[0]}'.")
         print("These data-driven insights can be used to inform targeted economic policies and ensure food security.")
+        profiler.stop()
 
     except FileNotFoundError:
         print(f"\n[CRITICAL ERROR] File Not Found: The file '{file_path}' was not found.")
@@ -114,4 +225,49 @@ def analyze_rice_prices(file_path):
 if __name__ == "__main__":
     # Define the path to the dataset
     data_file = 'indonesia_rice_prices.csv'
-    analyze_rice_prices(data_file)
\ No newline at end of file
+
+    parser = argparse.ArgumentParser(description="Indonesian rice price stability analysis")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="clean and aggregate provinces in parallel with this many processes")
+    parser.add_argument('--fill', nargs='+', choices=FILL_STRATEGIES, default=list(DEFAULT_STRATEGIES),
+                        help="gap-filling strategies, applied in order")
+    parser.add_argument('--max-gap', type=int, default=None,
+                        help="leave gaps longer than this many consecutive values unfilled")
+    parser.add_argument('--matrix', action='store_true',
+                        help="run the cleaning and statistics on a dense Date x Province price matrix")
+    parser.add_argument('--matrix-dir', default=None,
+                        help="save the filled price matrix to this directory and analyze it memory-mapped "
+                             "(implies --matrix)")
+    parser.add_argument('--from', dest='date_from', default=None,
+                        help="only analyze prices on or after this date (YYYY-MM-DD)")
+    parser.add_argument('--to', dest='date_to', default=None,
+                        help="only analyze prices on or before this date (YYYY-MM-DD)")
+    parser.add_argument('--province', action='append', default=None,
+                        help="only analyze this province (repeat the option for several)")
+    parser.add_argument('--engine', choices=PARSE_ENGINES, default='c',
+                        help="CSV parser: c, pyarrow (multi-threaded) or auto (pyarrow when installed)")
+    parser.add_argument('--validate', action='store_true',
+                        help="check the rows against data-quality rules and leave out the ones that fail")
+    parser.add_argument('--quarantine', default=None,
+                        help="write the rows that fail validation to this CSV (implies --validate)")
+    parser.add_argument('--profile-json', default=None,
+                        help="write per-phase time, rows/s and memory measurements to this JSON file")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="also trace Python allocations per phase (tracemalloc)")
+    parser.add_argument('--profile-cpu', action='store_true',
+                        help="also record the most expensive functions per phase (cProfile)")
+    args = parser.parse_args()
+    args.matrix = args.matrix or args.matrix_dir is not None
+    if args.matrix and args.workers:
+        parser.error("--matrix cannot be combined with --workers")
+
+    profiler = Instrumentation(enabled=args.profile_json is not None, memory=args.profile_memory,
+                               cpu=args.profile_cpu, name='indonesia_rice_price_analysis')
+    date_range = (args.date_from, args.date_to) if args.date_from or args.date_to else None
+    analyze_rice_prices(data_file, workers=args.workers, fill_strategies=args.fill, max_gap=args.max_gap,
+                        profiler=profiler, matrix=args.matrix, date_range=date_range, provinces=args.province,
+                        engine=args.engine, validate=args.validate or args.quarantine is not None,
+                        quarantine_path=args.quarantine, matrix_dir=args.matrix_dir)
+    if profiler.enabled:
+        profile_path = profiler.write_json(args.profile_json or 'rice_profile.json')
+        print(f"\nPhase timings written to {profile_path}")
\ No newline at end of file
@@ -0,0 +1,202 @@
+"""
+Pipeline Instrumentation
+========================
+
+Records where time and memory go in each phase of a report pipeline.
+
+Every phase records wall and CPU time, the rows it processed, throughput
+(rows/s), and the process's peak resident memory (RSS). Two optional
+captures can be switched on:
+- memory: tracemalloc's Python allocation peak and net change per phase
+- cpu:    a cProfile of each top-level phase (the most expensive functions)
+
+The result is written as JSON, so a nightly run can be compared with the
+last good one. A disabled Instrumentation does nothing: phase() hands back
+one shared no-op object and start()/stop() return right away.
+
+Usage:
+    profiler = Instrumentation(enabled=True)
+    with profiler.phase('load') as phase:
+        df = pd.read_csv(path)
+        phase.rows = len(df)
+    profiler.write_json('profile.json')
+
+Scripts whose phases follow each other at the top level can use
+profiler.start(name) instead; each start() ends the phase before it.
+"""
+
+import cProfile
+import json
+import os
+import platform
+import pstats
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Functions listed per phase in a cProfile capture
+PROFILE_TOP_FUNCTIONS = 15
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None if unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def git_commit():
+    """Short hash of the checked-out commit ('unknown' outside a git checkout)"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def _top_functions(profile, limit=PROFILE_TOP_FUNCTIONS):
+    """The most expensive functions of a cProfile run, by cumulative time"""
+    stats = pstats.Stats(profile)
+    rows = []
+    for (filename, line, function), (_, calls, own, cumulative, _) in stats.stats.items():
+        rows.append({
+            'function': f"{os.path.basename(filename)}:{line}({function})",
+            'calls': calls,
+            'own_s': own,
+            'cumulative_s': cumulative,
+        })
+    rows.sort(key=lambda row: row['cumulative_s'], reverse=True)
+    return rows[:limit]
+
+
+class _NullPhase:
+    """Stand-in returned while instrumentation is disabled"""
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class Phase:
+    """Measurements of one pipeline phase; set `rows` once it is known"""
+
+    def __init__(self, owner, name, rows=None):
+        self.owner = owner
+        self.name = name
+        self.rows = rows
+        self.record = None
+        self._profile = None
+
+    def __enter__(self):
+        owner = self.owner
+        if owner.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self._traced_before = tracemalloc.get_traced_memory()[0]
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+        # Only one profiler can be active, so nested phases are covered by their parent's profile
+        if owner.cpu and owner._profiling is None:
+            self._profile = cProfile.Profile()
+            owner._profiling = self
+            self._profile.enable()
+        self._cpu_start = time.process_time()
+        self._wall_start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self._wall_start
+        cpu_seconds = time.process_time() - self._cpu_start
+        owner = self.owner
+        self.record = {
+            'phase': self.name,
+            'seconds': seconds,
+            'cpu_seconds': cpu_seconds,
+            'rows': self.rows,
+            'rows_per_s': self.rows / seconds if self.rows and seconds > 0 else None,
+            'peak_rss_mb': peak_rss_mb(),
+        }
+        if owner.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            self.record['python_peak_mb'] = peak / 2**20
+            self.record['python_net_mb'] = (current - self._traced_before) / 2**20
+        if self._profile is not None:
+            self._profile.disable()
+            owner._profiling = None
+            self.record['top_functions'] = _top_functions(self._profile)
+        owner.records.append(self.record)
+        return False
+
+
+class Instrumentation:
+    """Collects per-phase measurements of one pipeline run"""
+
+    def __init__(self, enabled=False, memory=False, cpu=False, name=None):
+        self.enabled = enabled or memory or cpu
+        self.memory = memory
+        self.cpu = cpu
+        self.name = name
+        self.records = []
+        self.current = None
+        self._profiling = None
+
+    def phase(self, name, rows=None):
+        """Context manager measuring one phase"""
+        if not self.enabled:
+            return _NULL_PHASE
+        return Phase(self, name, rows)
+
+    def start(self, name, rows=None):
+        """End the running phase (if any) and start the next one; returns it"""
+        if not self.enabled:
+            return _NULL_PHASE
+        self.stop()
+        self.current = Phase(self, name, rows).__enter__()
+        return self.current
+
+    def set_rows(self, rows):
+        """Record the rows processed by the phase started with start()"""
+        if self.current is not None:
+            self.current.rows = rows
+
+    def stop(self):
+        """End the phase started with start()"""
+        if self.current is not None:
+            self.current.__exit__(None, None, None)
+            self.current = None
+
+    def to_dict(self):
+        """Run metadata plus one record per phase"""
+        self.stop()
+        return {
+            'meta': {
+                'name': self.name,
+                'commit': git_commit(),
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+            },
+            'total_seconds': sum(record['seconds'] for record in self.records),
+            'phases': self.records,
+        }
+
+    def write_json(self, path):
+        """Write to_dict() to `path`"""
+        with open(path, 'w') as handle:
+            json.dump(self.to_dict(), handle, indent=2, default=str)
+        return path
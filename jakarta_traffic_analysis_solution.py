@@ -5,15 +5,31 @@ Jakarta Traffic Congestion Analysis - Solution
 This script analyzes Jakarta traffic data to identify patterns and provide insights
 for traffic management and urban planning decisions.
 
+The analysis itself lives in traffic_analysis.py (load / clean / analyze);
+this script prints the STEP 1-7 report from its results.
+
 Author: Data Analysis Course
 Date: 2024
 """
 
+import argparse
+import sys
+
 import pandas as pd
-import numpy as np
 
-def print_section_header(title):
-    """Helper function to print formatted section headers"""
+from csv_loader import PARSE_ENGINES
+from data_validation import format_summary
+from instrumentation import Instrumentation
+from memory_optimizer import memory_summary
+from parallel_analysis import TRAFFIC_PARTITION_KEYS
+from traffic_aggregates import DEFAULT_CHUNKSIZE
+from traffic_analysis import DATA_FILE, clean_traffic, load_traffic, road_type_performance, rush_hour_analysis, \
+    speed_percentiles, traffic_patterns, traffic_report, weather_impact
+
+def print_section_header(title, profiler=None, rows=None):
+    """Helper function to print formatted section headers (each one starts a profiled phase)"""
+    if profiler is not None:
+        profiler.start(title, rows=rows)
     print("\n" + "="*60)
     print(f" {title}")
     print("="*60)
@@ -22,343 +38,396 @@ def print_subsection(title):
     """Helper function to print formatted subsection headers"""
     print(f"\n--- {title} ---")
 
+def parse_args(argv=None):
+    """Helper function to read the command line options"""
+    parser = argparse.ArgumentParser(description="Jakarta traffic congestion analysis")
+    parser.add_argument('--stream', action='store_true',
+                        help="read the CSV in bounded-size chunks (memory depends on groups, not rows)")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                        help="rows per chunk in streaming mode")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only ingest rows appended since the last run (aggregate state is persisted)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="always re-parse the CSV instead of using the typed columnar cache")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="aggregate partitions of the data in parallel with this many processes")
+    parser.add_argument('--partition-by', choices=TRAFFIC_PARTITION_KEYS, default='Location',
+                        help="how rows are split between worker processes")
+    parser.add_argument('--from', dest='date_from', default=None,
+                        help="only analyze rows on or after this date (YYYY-MM-DD), dropped while reading")
+    parser.add_argument('--to', dest='date_to', default=None,
+                        help="only analyze rows on or before this date (YYYY-MM-DD)")
+    parser.add_argument('--location', action='append', default=None,
+                        help="only analyze this location (repeat the option for several)")
+    parser.add_argument('--engine', choices=PARSE_ENGINES, default='c',
+                        help="CSV parser: c, pyarrow (multi-threaded, whole file at once) or auto (pyarrow when "
+                             "installed, c with --stream)")
+    parser.add_argument('--lazy', action='store_true',
+                        help="compute STEPs 3-7 by running the report as optimized lazy plans (lazy_plan.py)")
+    parser.add_argument('--validate', action='store_true',
+                        help="check the rows against data-quality rules and leave out the ones that fail")
+    parser.add_argument('--quarantine', default=None,
+                        help="write the rows that fail validation to this CSV (implies --validate)")
+    parser.add_argument('--percentiles', action='store_true',
+                        help="also report approximate p50/p90/p99 speeds per location (not with --incremental)")
+    parser.add_argument('--profile-json', default=None,
+                        help="write per-step time, rows/s and memory measurements to this JSON file")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="also trace Python allocations per step (tracemalloc)")
+    parser.add_argument('--profile-cpu', action='store_true',
+                        help="also record the most expensive functions per step (cProfile)")
+    args = parser.parse_args(argv)
+    if args.percentiles and args.incremental:
+        parser.error("--percentiles cannot be combined with --incremental")
+    if args.incremental and (args.date_from or args.date_to or args.location):
+        parser.error("--from, --to and --location cannot be combined with --incremental")
+    if args.engine == 'pyarrow' and (args.stream or args.incremental):
+        parser.error("--engine pyarrow reads the whole file at once and cannot be combined with --stream "
+                     "or --incremental (use c or auto)")
+    if args.lazy and (args.stream or args.incremental or args.workers or args.percentiles):
+        parser.error("--lazy cannot be combined with --stream, --incremental, --workers or --percentiles")
+    args.validate = args.validate or args.quarantine is not None
+    if args.lazy and args.validate:
+        parser.error("--lazy cannot be combined with --validate or --quarantine")
+    if args.validate and (args.stream or args.incremental):
+        parser.error("--validate and --quarantine cannot be combined with --stream or --incremental")
+    return args
+
 # ============================================================================
 # STEP 1: DATA LOADING AND INITIAL EXPLORATION
 # ============================================================================
 
-print_section_header("STEP 1: DATA LOADING AND INITIAL EXPLORATION")
+def print_dataset_overview(data):
+    """STEP 1: how the data was loaded, a preview, shape, dtypes and missing values"""
+    if data.mode == 'incremental':
+        print(f"✓ Incrementally updated from {data.file_path}: {data.new_rows} new rows "
+              f"(watermark {data.watermark})")
+        if data.late_rows:
+            print(f"⚠️ The file was rewritten: skipped {data.late_rows} rows older than the watermark "
+                  f"(rows already ingested cannot be told apart from late ones)")
+        if data.pending_rows:
+            print("⚠️ The last row does not end in a newline: it is included in this report and read again "
+                  "on the next run")
+        elif data.pending_bytes:
+            print(f"⚠️ The last {data.pending_bytes} bytes are an unfinished row; it is read on the next run")
+    elif data.mode == 'stream':
+        print(f"✓ Successfully streamed {data.file_path} in chunks of {data.chunksize} rows")
+    elif data.mode == 'lazy':
+        print(f"✓ Successfully planned {data.file_path}: read once, filled, derived and aggregated by "
+              f"optimized lazy plans")
+    elif data.mode == 'parallel':
+        print(f"✓ Successfully loaded {data.file_path} and aggregated it with {data.workers} worker "
+              f"processes (partitioned by {data.partition_by})")
+    else:
+        print(f"✓ Successfully loaded {data.file_path}")
+    if data.date_range is not None:
+        start, end = data.date_range
+        print(f"✓ Kept only rows from {start or 'the first date'} to {end or 'the last date'} while reading")
+    if data.locations:
+        print(f"✓ Kept only rows for {', '.join(data.locations)} while reading")
 
-try:
-    # Load the CSV file
-    df = pd.read_csv('jakarta_traffic_data.csv')
-    print("✓ Successfully loaded jakarta_traffic_data.csv")
-    
     # Display first 5 rows
     print_subsection("First 5 rows of the dataset")
-    print(df.head())
-    
+    print(data.sample)
+
     # Basic dataset information
     print_subsection("Dataset Information")
-    print(f"Dataset shape: {df.shape[0]} rows × {df.shape[1]} columns")
-    print(f"Date range: {df['Date'].min()} to {df['Date'].max()}")
-    
+    print(f"Dataset shape: {data.n_rows} rows × {data.n_columns} columns")
+    print(f"Date range: {pd.Timestamp(data.date_min).date()} to {pd.Timestamp(data.date_max).date()}")
+
     print("\nColumn data types:")
-    print(df.dtypes)
-    
+    print(data.dtypes)
+
     # Check for missing values
     print_subsection("Missing Values Check")
-    missing_values = df.isnull().sum()
     print("Missing values per column:")
-    for column, missing_count in missing_values.items():
+    for column, missing_count in data.missing.items():
         if missing_count > 0:
             print(f"  {column}: {missing_count} missing values")
         else:
             print(f"  {column}: No missing values")
-    
-except FileNotFoundError:
-    print("❌ Error: jakarta_traffic_data.csv file not found!")
-    print("Please ensure the file is in the same directory as this script.")
-    exit()
+
+    if data.validation is not None:
+        print_validation_summary(data.validation)
+
+def print_validation_summary(validation):
+    """STEP 1: violations per data-quality rule and the quarantined rows"""
+    print_subsection("Data Quality Validation")
+    print(format_summary(validation.summary))
+    print(f"\n✓ {len(validation.valid)} rows passed every rule, {validation.n_quarantined} quarantined")
+    if validation.n_quarantined:
+        print(validation.quarantine.head())
 
 # ============================================================================
 # STEP 2: DATA CLEANING AND PREPARATION
 # ============================================================================
 
-print_section_header("STEP 2: DATA CLEANING AND PREPARATION")
-
-# Convert Date column to datetime
-df['Date'] = pd.to_datetime(df['Date'])
-print("✓ Date column converted to datetime format")
-
-# Handle missing values
-print_subsection("Handling Missing Values")
-
-# For numerical columns: fill with mean
-numerical_cols = ['Vehicle_Count', 'Average_Speed_kmh']
-for col in numerical_cols:
-    if df[col].isnull().sum() > 0:
-        mean_value = df[col].mean()
-        df[col].fillna(mean_value, inplace=True)
-        print(f"✓ Filled {col} missing values with mean: {mean_value:.1f}")
-
-# For categorical columns: fill with most frequent value
-categorical_cols = ['Weather_Condition', 'Is_Weekend']
-for col in categorical_cols:
-    if df[col].isnull().sum() > 0:
-        mode_value = df[col].mode()[0]
-        df[col].fillna(mode_value, inplace=True)
-        print(f"✓ Filled {col} missing values with mode: {mode_value}")
-
-# Create Day_of_Week column
-df['Day_of_Week'] = df['Date'].dt.day_name()
-print("✓ Created Day_of_Week column")
-
-# Create Time_Period column
-def categorize_time_period(hour):
-    """Categorize hours into time periods"""
-    if 7 <= hour <= 9:
-        return "Morning Rush"
-    elif 10 <= hour <= 15:
-        return "Midday"
-    elif 16 <= hour <= 19:
-        return "Evening Rush"
-    else:
-        return "Night"
+def print_cleaning_summary(data):
+    """STEP 2: the fills applied, the derived columns and the memory savings"""
+    print("✓ Date column converted to datetime format")
+    if data.mode == 'lazy':
+        print("✓ Applied by the lazy plans while computing the report (no cleaned frame is kept)")
+
+    # Handle missing values
+    # (in streaming mode the same fills are applied when the aggregates are finalized)
+    print_subsection("Handling Missing Values")
+    for column, method, value in data.fills:
+        if method == 'mean':
+            print(f"✓ Filled {column} missing values with mean: {value:.1f}")
+        else:
+            print(f"✓ Filled {column} missing values with mode: {value}")
+
+    print("✓ Created Day_of_Week column")
+    print("✓ Created Time_Period column")
 
-df['Time_Period'] = df['Hour'].apply(categorize_time_period)
-print("✓ Created Time_Period column")
+    # Compact dtypes: categoricals for the text columns, downcast numeric columns
+    if data.memory_report is not None:
+        print_subsection("Memory Optimization")
+        print(data.memory_report.to_string())
+        print(f"✓ Memory usage: {memory_summary(data.memory_report)}")
 
-print_subsection("Data Cleaning Summary")
-print(f"✓ All missing values handled")
-print(f"✓ New columns created: Day_of_Week, Time_Period")
-print(f"✓ Final dataset shape: {df.shape[0]} rows × {df.shape[1]} columns")
+    print_subsection("Data Cleaning Summary")
+    print(f"✓ All missing values handled")
+    print(f"✓ New columns created: Day_of_Week, Time_Period")
+    print(f"✓ Final dataset shape: {data.n_rows} rows × {data.n_columns + 2} columns")
 
 # ============================================================================
 # STEP 3: TRAFFIC PATTERN ANALYSIS
 # ============================================================================
 
-print_section_header("STEP 3: TRAFFIC PATTERN ANALYSIS")
-
-# Peak Hours Analysis
-print_subsection("Peak Hours Analysis")
-
-# Hour with highest average vehicle count
-hourly_vehicle_avg = df.groupby('Hour')['Vehicle_Count'].mean()
-peak_vehicle_hour = hourly_vehicle_avg.idxmax()
-peak_vehicle_count = hourly_vehicle_avg.max()
-
-print(f"🚗 Peak traffic hour: {peak_vehicle_hour}:00 with {peak_vehicle_count:.0f} vehicles on average")
-
-# Hour with lowest average speed
-hourly_speed_avg = df.groupby('Hour')['Average_Speed_kmh'].mean()
-slowest_hour = hourly_speed_avg.idxmin()
-slowest_speed = hourly_speed_avg.min()
-
-print(f"🐌 Slowest traffic hour: {slowest_hour}:00 with {slowest_speed:.1f} km/h average speed")
-
-# Location Comparison
-print_subsection("Location Comparison")
-
-location_stats = df.groupby('Location').agg({
-    'Vehicle_Count': 'mean',
-    'Average_Speed_kmh': 'mean'
-}).round(1)
-
-print("Average traffic metrics by location:")
-print(location_stats.sort_values('Vehicle_Count', ascending=False))
-
-# Top 3 most congested locations
-top_congested = location_stats.sort_values('Vehicle_Count', ascending=False).head(3)
-print(f"\n🚦 Top 3 most congested locations:")
-for i, (location, data) in enumerate(top_congested.iterrows(), 1):
-    print(f"  {i}. {location}: {data['Vehicle_Count']:.0f} vehicles/hour")
-
-# Location with slowest speed
-slowest_location = location_stats.sort_values('Average_Speed_kmh').index[0]
-slowest_location_speed = location_stats.loc[slowest_location, 'Average_Speed_kmh']
-print(f"\n🐢 Slowest location: {slowest_location} ({slowest_location_speed:.1f} km/h)")
+def print_traffic_patterns(patterns):
+    """STEP 3: peak hours, locations and the weekend effect"""
+    # Peak Hours Analysis
+    print_subsection("Peak Hours Analysis")
+    print(f"🚗 Peak traffic hour: {patterns.peak_vehicle_hour}:00 with {patterns.peak_vehicle_count:.0f} vehicles on average")
+    print(f"🐌 Slowest traffic hour: {patterns.slowest_hour}:00 with {patterns.slowest_speed:.1f} km/h average speed")
+
+    # Location Comparison
+    print_subsection("Location Comparison")
+    print("Average traffic metrics by location:")
+    print(patterns.location_stats.sort_values('Vehicle_Count', ascending=False))
+
+    # Top 3 most congested locations
+    print(f"\n🚦 Top 3 most congested locations:")
+    for i, (location, data) in enumerate(patterns.top_congested.iterrows(), 1):
+        print(f"  {i}. {location}: {data['Vehicle_Count']:.0f} vehicles/hour")
+
+    # Location with slowest speed
+    print(f"\n🐢 Slowest location: {patterns.slowest_location} ({patterns.slowest_location_speed:.1f} km/h)")
+
+    # Weekend vs Weekday Analysis
+    print_subsection("Weekend vs Weekday Analysis")
+    print("Weekend vs Weekday comparison:")
+    for label, vehicles, speed in [('Weekdays', patterns.weekday_vehicles, patterns.weekday_speed),
+                                   ('Weekends', patterns.weekend_vehicles, patterns.weekend_speed)]:
+        if vehicles is None:
+            print(f"  {label}: n/a (no rows in the selected data)")
+        else:
+            print(f"  {label}: {vehicles:.0f} vehicles/hour, {speed:.1f} km/h")
+    if patterns.vehicle_diff_pct is None:
+        return
 
-# Weekend vs Weekday Analysis
-print_subsection("Weekend vs Weekday Analysis")
+    print(f"\n📊 Analysis:")
+    print(f"  Vehicle count difference: {patterns.vehicle_diff_pct:+.1f}% on weekends")
+    print(f"  Speed difference: {patterns.speed_diff_pct:+.1f}% on weekends")
 
-weekend_comparison = df.groupby('Is_Weekend').agg({
-    'Vehicle_Count': 'mean',
-    'Average_Speed_kmh': 'mean'
-}).round(1)
+    if patterns.weekend_effect:
+        print("  ✓ Clear weekend effect: Less traffic and higher speeds on weekends")
+    else:
+        print("  ⚠️ Weekend effect is not clearly evident in this dataset")
 
-weekday_vehicles = weekend_comparison.loc[False, 'Vehicle_Count']
-weekend_vehicles = weekend_comparison.loc[True, 'Vehicle_Count']
-weekday_speed = weekend_comparison.loc[False, 'Average_Speed_kmh']
-weekend_speed = weekend_comparison.loc[True, 'Average_Speed_kmh']
+def print_speed_percentiles(percentiles):
+    """STEP 3 (optional): approximate speed distribution per location"""
+    print_subsection("Speed Percentiles by Location (approximate, ±1%)")
+    print(percentiles.sort_values('p50').round(1))
 
-print("Weekend vs Weekday comparison:")
-print(f"  Weekdays: {weekday_vehicles:.0f} vehicles/hour, {weekday_speed:.1f} km/h")
-print(f"  Weekends: {weekend_vehicles:.0f} vehicles/hour, {weekend_speed:.1f} km/h")
+# ============================================================================
+# STEP 4: WEATHER IMPACT ANALYSIS
+# ============================================================================
 
-vehicle_diff_pct = ((weekend_vehicles - weekday_vehicles) / weekday_vehicles) * 100
-speed_diff_pct = ((weekend_speed - weekday_speed) / weekday_speed) * 100
+def print_weather_impact(weather):
+    """STEP 4: speeds by weather condition"""
+    print("Traffic patterns by weather condition:")
+    print(weather.weather_stats.sort_values('Average_Speed_kmh'))
 
-print(f"\n📊 Analysis:")
-print(f"  Vehicle count difference: {vehicle_diff_pct:+.1f}% on weekends")
-print(f"  Speed difference: {speed_diff_pct:+.1f}% on weekends")
+    # Weather condition with most severe traffic (lowest speed)
+    print(f"\n🌧️ Most severe traffic weather: {weather.worst_weather} ({weather.worst_weather_speed:.1f} km/h)")
 
-if weekend_vehicles < weekday_vehicles and weekend_speed > weekday_speed:
-    print("  ✓ Clear weekend effect: Less traffic and higher speeds on weekends")
-else:
-    print("  ⚠️ Weekend effect is not clearly evident in this dataset")
+    # Compare sunny vs rainy conditions
+    if weather.speed_reduction is not None:
+        print(f"\n☀️ vs 🌧️ Speed comparison:")
+        print(f"  Sunny weather: {weather.sunny_speed:.1f} km/h")
+        print(f"  Rainy weather: {weather.rainy_speed:.1f} km/h")
+        print(f"  Speed reduction in rain: {weather.speed_reduction:.1f}%")
 
 # ============================================================================
-# STEP 4: WEATHER IMPACT ANALYSIS
+# STEP 5: ROAD TYPE PERFORMANCE
 # ============================================================================
 
-print_section_header("STEP 4: WEATHER IMPACT ANALYSIS")
+def print_road_type_performance(roads):
+    """STEP 5: volume and speed by road type"""
+    print("Traffic performance by road type:")
+    print(roads.road_stats.sort_values('Vehicle_Count', ascending=False))
 
-weather_stats = df.groupby('Weather_Condition').agg({
-    'Vehicle_Count': 'mean',
-    'Average_Speed_kmh': 'mean'
-}).round(1)
+    print(f"\n🛣️ Highest traffic volume: {roads.highest_volume_road} ({roads.highest_volume_count:.0f} vehicles/hour)")
+    print(f"🏃 Fastest road type: {roads.fastest_road} ({roads.fastest_road_speed:.1f} km/h)")
 
-print("Traffic patterns by weather condition:")
-print(weather_stats.sort_values('Average_Speed_kmh'))
+# ============================================================================
+# STEP 6: RUSH HOUR DEEP DIVE
+# ============================================================================
 
-# Weather condition with most severe traffic (lowest speed)
-worst_weather = weather_stats.sort_values('Average_Speed_kmh').index[0]
-worst_weather_speed = weather_stats.loc[worst_weather, 'Average_Speed_kmh']
+def print_rush_hour_analysis(rush_hour):
+    """STEP 6: rush-hour congestion by period, location and day"""
+    print_subsection("Rush Hour Analysis by Period")
+
+    for period, period_result in rush_hour.by_period.items():
+        print(f"\n{period}:")
+        print(f"  Most congested location: {period_result['most_congested_location']} "
+              f"({period_result['vehicles']:.0f} vehicles/hour)")
+        print(f"  Average speed: {period_result['average_speed']:.1f} km/h")
+
+    # Compare morning vs evening rush severity
+    print_subsection("Morning vs Evening Rush Comparison")
+    for label, vehicles, speed in [('Morning Rush', rush_hour.morning_avg_vehicles, rush_hour.morning_avg_speed),
+                                   ('Evening Rush', rush_hour.evening_avg_vehicles, rush_hour.evening_avg_speed)]:
+        if vehicles is None:
+            print(f"{label}: n/a (no rows in the selected data)")
+        else:
+            print(f"{label}: {vehicles:.0f} vehicles/hour, {speed:.1f} km/h")
 
-print(f"\n🌧️ Most severe traffic weather: {worst_weather} ({worst_weather_speed:.1f} km/h)")
+    if rush_hour.morning_avg_vehicles is not None and rush_hour.evening_avg_vehicles is not None:
+        if rush_hour.evening_more_congested:
+            print("🌆 Evening rush hour is more congested than morning rush")
+        else:
+            print("🌅 Morning rush hour is more congested than evening rush")
 
-# Compare sunny vs rainy conditions
-if 'Sunny' in weather_stats.index and 'Rainy' in weather_stats.index:
-    sunny_speed = weather_stats.loc['Sunny', 'Average_Speed_kmh']
-    rainy_speed = weather_stats.loc['Rainy', 'Average_Speed_kmh']
-    speed_reduction = ((sunny_speed - rainy_speed) / sunny_speed) * 100
-    
-    print(f"\n☀️ vs 🌧️ Speed comparison:")
-    print(f"  Sunny weather: {sunny_speed:.1f} km/h")
-    print(f"  Rainy weather: {rainy_speed:.1f} km/h")
-    print(f"  Speed reduction in rain: {speed_reduction:.1f}%")
+    # Worst day for evening rush hour
+    if rush_hour.worst_evening_day is not None:
+        print(f"\n📅 Worst evening rush day: {rush_hour.worst_evening_day} ({rush_hour.worst_evening_speed:.1f} km/h)")
 
 # ============================================================================
-# STEP 5: ROAD TYPE PERFORMANCE
+# STEP 7: INSIGHTS AND RECOMMENDATIONS
 # ============================================================================
 
-print_section_header("STEP 5: ROAD TYPE PERFORMANCE")
+def print_insights(report):
+    """STEP 7: key findings, recommendations and one surprising insight"""
+    patterns, weather, roads = report.patterns, report.weather, report.roads
 
-road_stats = df.groupby('Road_Type').agg({
-    'Vehicle_Count': 'mean',
-    'Average_Speed_kmh': 'mean'
-}).round(1)
+    print_subsection("🔍 THREE KEY FINDINGS")
 
-print("Traffic performance by road type:")
-print(road_stats.sort_values('Vehicle_Count', ascending=False))
+    print("1. PEAK CONGESTION PATTERNS:")
+    print(f"   • Hour {patterns.peak_vehicle_hour}:00 has the highest traffic volume ({patterns.peak_vehicle_count:.0f} vehicles)")
+    print(f"   • Hour {patterns.slowest_hour}:00 has the slowest speeds ({patterns.slowest_speed:.1f} km/h)")
+    print(f"   • {patterns.slowest_location} is consistently the most problematic location")
 
-# Road type with most traffic volume
-highest_volume_road = road_stats.sort_values('Vehicle_Count', ascending=False).index[0]
-highest_volume_count = road_stats.loc[highest_volume_road, 'Vehicle_Count']
+    print("\n2. WEATHER IMPACT:")
+    if weather.speed_reduction is not None:
+        print(f"   • Rainy weather reduces average speeds by {weather.speed_reduction:.1f}%")
+        print(f"   • Traffic moves {weather.speed_reduction:.1f}% slower during rain")
+    else:
+        print("   • Weather conditions significantly affect traffic flow patterns")
 
-print(f"\n🛣️ Highest traffic volume: {highest_volume_road} ({highest_volume_count:.0f} vehicles/hour)")
+    print("\n3. INFRASTRUCTURE PERFORMANCE:")
+    print(f"   • {roads.highest_volume_road}s handle the most traffic ({roads.highest_volume_count:.0f} vehicles/hour)")
+    print(f"   • {roads.fastest_road}s maintain the highest speeds ({roads.fastest_road_speed:.1f} km/h)")
+    if patterns.vehicle_diff_pct is not None:
+        print(f"   • Weekend traffic is {abs(patterns.vehicle_diff_pct):.1f}% {'lower' if patterns.vehicle_diff_pct < 0 else 'higher'} than weekdays")
 
-# Road type with highest speed
-fastest_road = road_stats.sort_values('Average_Speed_kmh', ascending=False).index[0]
-fastest_road_speed = road_stats.loc[fastest_road, 'Average_Speed_kmh']
+    print_subsection("💡 TWO DATA-DRIVEN RECOMMENDATIONS")
 
-print(f"🏃 Fastest road type: {fastest_road} ({fastest_road_speed:.1f} km/h)")
+    print("1. IMPLEMENT DYNAMIC TRAFFIC MANAGEMENT:")
+    print(f"   • Deploy additional traffic officers at {patterns.slowest_location} during hour {patterns.slowest_hour}:00")
+    print(f"   • Adjust traffic light timing during peak hours ({patterns.peak_vehicle_hour}:00)")
+    print("   • Consider congestion pricing during rush hours to distribute traffic")
 
-# ============================================================================
-# STEP 6: RUSH HOUR DEEP DIVE
-# ============================================================================
+    print("\n2. WEATHER-RESPONSIVE TRAFFIC SYSTEMS:")
+    if 'Rainy' in weather.weather_stats.index:
+        print("   • Activate rain-specific traffic protocols when weather forecasts predict rain")
+        print("   • Increase traffic light cycle times during rainy conditions")
+        print("   • Deploy emergency response teams proactively during rainy weather")
 
-print_section_header("STEP 6: RUSH HOUR DEEP DIVE")
-
-# Filter for rush hours only
-rush_hours = df[df['Time_Period'].isin(['Morning Rush', 'Evening Rush'])]
-
-print_subsection("Rush Hour Analysis by Period")
-
-for period in ['Morning Rush', 'Evening Rush']:
-    period_data = rush_hours[rush_hours['Time_Period'] == period]
-    
-    # Most congested location during this period
-    location_congestion = period_data.groupby('Location')['Vehicle_Count'].mean()
-    most_congested = location_congestion.idxmax()
-    congestion_level = location_congestion.max()
-    
-    # Average speed during this period
-    avg_speed = period_data['Average_Speed_kmh'].mean()
-    
-    print(f"\n{period}:")
-    print(f"  Most congested location: {most_congested} ({congestion_level:.0f} vehicles/hour)")
-    print(f"  Average speed: {avg_speed:.1f} km/h")
-
-# Compare morning vs evening rush severity
-morning_rush = rush_hours[rush_hours['Time_Period'] == 'Morning Rush']
-evening_rush = rush_hours[rush_hours['Time_Period'] == 'Evening Rush']
-
-morning_avg_speed = morning_rush['Average_Speed_kmh'].mean()
-evening_avg_speed = evening_rush['Average_Speed_kmh'].mean()
-morning_avg_vehicles = morning_rush['Vehicle_Count'].mean()
-evening_avg_vehicles = evening_rush['Vehicle_Count'].mean()
-
-print_subsection("Morning vs Evening Rush Comparison")
-print(f"Morning Rush: {morning_avg_vehicles:.0f} vehicles/hour, {morning_avg_speed:.1f} km/h")
-print(f"Evening Rush: {evening_avg_vehicles:.0f} vehicles/hour, {evening_avg_speed:.1f} km/h")
-
-if evening_avg_vehicles > morning_avg_vehicles:
-    print("🌆 Evening rush hour is more congested than morning rush")
-else:
-    print("🌅 Morning rush hour is more congested than evening rush")
-
-# Worst day for evening rush hour
-evening_by_day = evening_rush.groupby('Day_of_Week').agg({
-    'Vehicle_Count': 'mean',
-    'Average_Speed_kmh': 'mean'
-}).round(1)
-
-worst_evening_day = evening_by_day.sort_values('Average_Speed_kmh').index[0]
-worst_evening_speed = evening_by_day.loc[worst_evening_day, 'Average_Speed_kmh']
-
-print(f"\n📅 Worst evening rush day: {worst_evening_day} ({worst_evening_speed:.1f} km/h)")
+    print_subsection("🎯 ONE SURPRISING INSIGHT")
 
-# ============================================================================
-# STEP 7: INSIGHTS AND RECOMMENDATIONS
-# ============================================================================
+    print(f"UNEXPECTED TRAFFIC FLOW PATTERN:")
+    print(f"• {report.best_time} period has the best traffic flow ({report.best_time_speed:.1f} km/h average)")
+
+    if report.best_time == "Night":
+        print("• This suggests potential for promoting night-time business hours")
+        print("• Consider incentivizing 24-hour operations for non-essential services")
+    elif report.best_time == "Midday":
+        print("• This indicates good potential for flexible working hours")
+        print("• Businesses could benefit from staggered lunch breaks")
 
-print_section_header("STEP 7: INSIGHTS AND RECOMMENDATIONS")
-
-print_subsection("🔍 THREE KEY FINDINGS")
-
-print("1. PEAK CONGESTION PATTERNS:")
-print(f"   • Hour {peak_vehicle_hour}:00 has the highest traffic volume ({peak_vehicle_count:.0f} vehicles)")
-print(f"   • Hour {slowest_hour}:00 has the slowest speeds ({slowest_speed:.1f} km/h)")
-print(f"   • {slowest_location} is consistently the most problematic location")
-
-print("\n2. WEATHER IMPACT:")
-if 'Sunny' in weather_stats.index and 'Rainy' in weather_stats.index:
-    print(f"   • Rainy weather reduces average speeds by {speed_reduction:.1f}%")
-    print(f"   • Traffic moves {speed_reduction:.1f}% slower during rain")
-else:
-    print("   • Weather conditions significantly affect traffic flow patterns")
-
-print("\n3. INFRASTRUCTURE PERFORMANCE:")
-print(f"   • {highest_volume_road}s handle the most traffic ({highest_volume_count:.0f} vehicles/hour)")
-print(f"   • {fastest_road}s maintain the highest speeds ({fastest_road_speed:.1f} km/h)")
-print(f"   • Weekend traffic is {abs(vehicle_diff_pct):.1f}% {'lower' if vehicle_diff_pct < 0 else 'higher'} than weekdays")
-
-print_subsection("💡 TWO DATA-DRIVEN RECOMMENDATIONS")
-
-print("1. IMPLEMENT DYNAMIC TRAFFIC MANAGEMENT:")
-print(f"   • Deploy additional traffic officers at {slowest_location} during hour {slowest_hour}:00")
-print(f"   • Adjust traffic light timing during peak hours ({peak_vehicle_hour}:00)")
-print("   • Consider congestion pricing during rush hours to distribute traffic")
-
-print("\n2. WEATHER-RESPONSIVE TRAFFIC SYSTEMS:")
-if 'Rainy' in weather_stats.index:
-    print("   • Activate rain-specific traffic protocols when weather forecasts predict rain")
-    print("   • Increase traffic light cycle times during rainy conditions")
-    print("   • Deploy emergency response teams proactively during rainy weather")
-
-print_subsection("🎯 ONE SURPRISING INSIGHT")
-
-# Calculate the most surprising finding
-time_periods_performance = df.groupby('Time_Period')['Average_Speed_kmh'].mean().sort_values(ascending=False)
-best_time = time_periods_performance.index[0]
-best_time_speed = time_periods_performance.iloc[0]
-
-print(f"UNEXPECTED TRAFFIC FLOW PATTERN:")
-print(f"• {best_time} period has the best traffic flow ({best_time_speed:.1f} km/h average)")
-
-if best_time == "Night":
-    print("• This suggests potential for promoting night-time business hours")
-    print("• Consider incentivizing 24-hour operations for non-essential services")
-elif best_time == "Midday":
-    print("• This indicates good potential for flexible working hours")
-    print("• Businesses could benefit from staggered lunch breaks")
-
-print("\n" + "="*60)
-print(" ANALYSIS COMPLETE - JAKARTA TRAFFIC INSIGHTS GENERATED")
-print("="*60)
-print("\n📊 This analysis provides actionable insights for:")
-print("   • Traffic management optimization")
-print("   • Infrastructure planning decisions") 
-print("   • Public transportation scheduling")
-print("   • Urban development policies") 
\ No newline at end of file
+    print("\n" + "="*60)
+    print(" ANALYSIS COMPLETE - JAKARTA TRAFFIC INSIGHTS GENERATED")
+    print("="*60)
+    print("\n📊 This analysis provides actionable insights for:")
+    print("   • Traffic management optimization")
+    print("   • Infrastructure planning decisions")
+    print("   • Public transportation scheduling")
+    print("   • Urban development policies")
+
+def main(argv=None):
+    """Run the full STEP 1-7 report; returns the process exit code"""
+    args = parse_args(argv)
+
+    # Per-step instrumentation (does nothing unless one of the --profile options is given)
+    profiler = Instrumentation(enabled=args.profile_json is not None, memory=args.profile_memory,
+                               cpu=args.profile_cpu, name='jakarta_traffic_analysis')
+
+    print_section_header("STEP 1: DATA LOADING AND INITIAL EXPLORATION", profiler)
+    date_range = (args.date_from, args.date_to) if args.date_from or args.date_to else None
+    try:
+        data = load_traffic(DATA_FILE, stream=args.stream, incremental=args.incremental,
+                            chunksize=args.chunksize, use_cache=not args.no_cache,
+                            workers=args.workers, partition_by=args.partition_by, sketches=args.percentiles,
+                            date_range=date_range, locations=args.location, engine=args.engine,
+                            validate=args.validate, lazy=args.lazy)
+    except FileNotFoundError:
+        print(f"❌ Error: {DATA_FILE} file not found!")
+        print("Please ensure the file is in the same directory as this script.")
+        return 1
+    except ValueError as error:
+        print(f"❌ Error: {error}")
+        return 1
+    profiler.set_rows(data.n_rows)
+    print_dataset_overview(data)
+    if args.quarantine:
+        print(f"✓ Quarantined rows written to {data.validation.write_quarantine(args.quarantine)}")
+
+    print_section_header("STEP 2: DATA CLEANING AND PREPARATION", profiler, data.n_rows)
+    clean_traffic(data)
+    print_cleaning_summary(data)
+    stats = data.stats
+
+    print_section_header("STEP 3: TRAFFIC PATTERN ANALYSIS", profiler, data.n_rows)
+    patterns = traffic_patterns(stats)
+    print_traffic_patterns(patterns)
+    if args.percentiles:
+        print_speed_percentiles(speed_percentiles(stats))
+
+    print_section_header("STEP 4: WEATHER IMPACT ANALYSIS", profiler, data.n_rows)
+    weather = weather_impact(stats)
+    print_weather_impact(weather)
+
+    print_section_header("STEP 5: ROAD TYPE PERFORMANCE", profiler, data.n_rows)
+    roads = road_type_performance(stats)
+    print_road_type_performance(roads)
+
+    print_section_header("STEP 6: RUSH HOUR DEEP DIVE", profiler, data.n_rows)
+    rush_hour = rush_hour_analysis(stats)
+    print_rush_hour_analysis(rush_hour)
+
+    print_section_header("STEP 7: INSIGHTS AND RECOMMENDATIONS", profiler, data.n_rows)
+    report = traffic_report(patterns, weather, roads, rush_hour)
+    print_insights(report)
+
+    if profiler.enabled:
+        profiler.stop()
+        profile_path = args.profile_json or 'traffic_profile.json'
+        profiler.write_json(profile_path)
+        print(f"\n⏱️ Step timings written to {profile_path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,863 @@
+"""
+Lazy Query Plans
+================
+
+Describes an analysis as a plan of load, clean, derive, filter and
+aggregate steps and runs it only when the results are collected:
+
+    cleaned = scan_csv('jakarta_traffic_data.csv').fill_missing(TRAFFIC_FILLS).derive()
+    evening = cleaned.filter(col('Time_Period') == 'Evening Rush').filter(col('Location') == 'Thamrin-Sudirman')
+    evening.aggregate('Day_of_Week', METRICS).collect()
+
+Before execution every plan is rewritten:
+
+1. Predicate pushdown: consecutive filters become one predicate, which
+   moves below the steps that do not change its columns and into the CSV
+   scan, where the file is read in chunks and only matching rows are kept.
+   Row-wise steps (derived columns) are always passed. A per-group step
+   (e.g. gap filling per Province) is passed only by a filter on its group
+   columns. A mean/mode fill is passed by computing its fill values from a
+   separate pass over just the filled columns of the whole file, so the
+   values are the same as without the filter.
+2. Column pruning: each scan reads only the columns some step above it
+   uses, each fill fills only those columns and each derive computes only
+   those derived columns.
+3. Common-subexpression sharing: collect_all() optimizes several plans
+   together and runs identical steps once, e.g. the load, fill and derive
+   steps shared by every section of the traffic report.
+4. Copy elimination: a step whose input has no other consumer modifies it
+   in place, filters copy only the columns still needed, and
+   intermediate results are released as soon as their last consumer has
+   run.
+
+explain() prints the optimized plan. The traffic and rice reports are
+expressed as plans at the bottom of this module; run this file to see
+their plans and the results. The traffic report script runs entirely
+through these plans with --lazy (traffic_analysis.load_traffic(lazy=True)).
+"""
+
+import argparse
+import os
+
+import pandas as pd
+
+from csv_loader import iter_csv, load_csv
+from data_schemas import RICE_SCHEMA, TRAFFIC_SCHEMA, schema_for
+from fused_groupby import add_exact, exact_total
+from rice_statistics import fill_missing_prices, national_average_daily, provincial_statistics
+from traffic_aggregates import DEFAULT_CHUNKSIZE, METRICS, MODE_FILLED_COLUMNS, REPORT_GROUPINGS, \
+    _normalize_keys
+from traffic_features import DEFAULT_DERIVED_COLUMNS, DERIVED_COLUMNS, add_derived_columns
+
+TRAFFIC_FILE = 'jakarta_traffic_data.csv'
+RICE_FILE = 'indonesia_rice_prices.csv'
+
+# STEP 2 fills of the traffic report
+TRAFFIC_FILLS = {**{metric: 'mean' for metric in METRICS}, **{column: 'mode' for column in MODE_FILLED_COLUMNS}}
+
+# ============================================================================
+# Predicates
+# ============================================================================
+
+def _key(value):
+    """Hashable stand-in for a predicate argument"""
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(sorted((_key(item) for item in value), key=repr))
+    return value
+
+
+class Expr:
+    """A vectorized row predicate; build one with col() and combine with &, | and ~"""
+
+    def __init__(self, op, args, columns):
+        self.op = op
+        self.args = tuple(args)
+        self.columns = frozenset(columns)
+
+    @property
+    def key(self):
+        return (self.op,) + tuple(arg.key if isinstance(arg, Expr) else _key(arg) for arg in self.args)
+
+    def __and__(self, other):
+        return Expr('&', [self, other], self.columns | other.columns)
+
+    def __or__(self, other):
+        return Expr('|', [self, other], self.columns | other.columns)
+
+    def __invert__(self):
+        return Expr('~', [self], self.columns)
+
+    def evaluate(self, df):
+        """Boolean mask of the rows of `df` that satisfy the predicate (missing values never match)"""
+        if self.op == '&':
+            return self.args[0].evaluate(df) & self.args[1].evaluate(df)
+        if self.op == '|':
+            return self.args[0].evaluate(df) | self.args[1].evaluate(df)
+        if self.op == '~':
+            return ~self.args[0].evaluate(df)
+
+        column, value = self.args
+        series = df[column]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            value = pd.to_datetime(list(value)) if self.op in ('isin', 'between') else pd.Timestamp(value)
+        if self.op == 'isin':
+            result = series.isin(list(value))
+        elif self.op == 'between':
+            result = series.between(value[0], value[1])
+        elif self.op == 'notna':
+            result = series.notna()
+        else:
+            result = getattr(series, self.op)(value)
+        return result.to_numpy(dtype=bool, na_value=False)
+
+    def __repr__(self):
+        if self.op in ('&', '|'):
+            return f"({self.args[0]!r} {self.op} {self.args[1]!r})"
+        if self.op == '~':
+            return f"~{self.args[0]!r}"
+        column, value = self.args
+        symbols = {'eq': '==', 'ne': '!=', 'lt': '<', 'le': '<=', 'gt': '>', 'ge': '>='}
+        if self.op in symbols:
+            return f"{column} {symbols[self.op]} {value!r}"
+        return f"{column}.{self.op}({'' if value is None else repr(value)})"
+
+
+class Column:
+    """A column reference; comparing it builds an Expr"""
+
+    __hash__ = None
+
+    def __init__(self, name):
+        self.name = name
+
+    def _compare(self, op, value):
+        return Expr(op, [self.name, value], [self.name])
+
+    def __eq__(self, value):
+        return self._compare('eq', value)
+
+    def __ne__(self, value):
+        return self._compare('ne', value)
+
+    def __lt__(self, value):
+        return self._compare('lt', value)
+
+    def __le__(self, value):
+        return self._compare('le', value)
+
+    def __gt__(self, value):
+        return self._compare('gt', value)
+
+    def __ge__(self, value):
+        return self._compare('ge', value)
+
+    def isin(self, values):
+        return self._compare('isin', tuple(values))
+
+    def between(self, low, high):
+        """Inclusive range, like Series.between"""
+        return self._compare('between', (low, high))
+
+    def notna(self):
+        return self._compare('notna', None)
+
+
+def col(name):
+    """Refer to a column in a predicate, e.g. col('Hour') >= 7"""
+    return Column(name)
+
+
+# ============================================================================
+# Plan nodes
+# ============================================================================
+
+class PlanNode:
+    """One step of a plan; `key` identifies equal steps over equal inputs"""
+
+    kind = None
+    children = ()
+
+    def params(self):
+        return ()
+
+    @property
+    def key(self):
+        return (self.kind, self.params()) + tuple(child.key for child in self.children)
+
+    def replace(self, **changes):
+        node = object.__new__(type(self))
+        node.__dict__.update(self.__dict__, **changes)
+        return node
+
+    def with_children(self, children):
+        raise NotImplementedError
+
+    def describe(self, required):
+        raise NotImplementedError
+
+
+class Scan(PlanNode):
+    """Read a CSV with its typed schema (only `columns`, only rows matching `predicate`)"""
+
+    kind = 'scan'
+
+    def __init__(self, file_path, schema, chunksize, predicate=None):
+        self.file_path = file_path
+        self.schema = schema
+        self.chunksize = chunksize
+        self.predicate = predicate
+
+    def params(self):
+        return (os.path.abspath(self.file_path), tuple(self.schema.items()), self.chunksize,
+                None if self.predicate is None else self.predicate.key)
+
+    def with_children(self, children):
+        return self
+
+    def describe(self, required):
+        columns = 'all columns' if required is None else f"columns={required}"
+        predicate = '' if self.predicate is None else f" where {self.predicate!r}"
+        return f"Scan {os.path.basename(self.file_path)} {columns}{predicate}"
+
+
+class Filter(PlanNode):
+    kind = 'filter'
+
+    def __init__(self, child, predicate):
+        self.children = (child,)
+        self.predicate = predicate
+
+    def params(self):
+        return self.predicate.key
+
+    def with_children(self, children):
+        return self.replace(children=tuple(children))
+
+    def describe(self, required):
+        return f"Filter {self.predicate!r}"
+
+
+class Fill(PlanNode):
+    """
+    Fill missing values with the column mean or mode (or a constant). The fill
+    values come from `source` when a filter was pushed below this step.
+    """
+
+    kind = 'fill'
+
+    def __init__(self, child, strategies, source=None):
+        self.children = (child,) if source is None else (child, source)
+        self.strategies = dict(strategies)
+
+    @property
+    def source(self):
+        return self.children[1] if len(self.children) > 1 else None
+
+    def params(self):
+        return tuple((column, repr(method)) for column, method in self.strategies.items())
+
+    def with_children(self, children):
+        return self.replace(children=tuple(children))
+
+    def filled(self, required):
+        """The columns this step fills when the steps above need `required`"""
+        return [column for column in self.strategies if required is None or column in required]
+
+    def describe(self, required):
+        fills = ', '.join(f"{column}={self.strategies[column]}" for column in self.filled(required))
+        source = ' (fill values from the unfiltered input)' if self.source is not None else ''
+        return f"Fill {fills or 'nothing'}{source}"
+
+
+class Derive(PlanNode):
+    """Add registered derived columns (traffic_features), computed row by row"""
+
+    kind = 'derive'
+
+    def __init__(self, child, names):
+        self.children = (child,)
+        self.names = list(names)
+
+    @property
+    def produces(self):
+        return frozenset(self.names)
+
+    def requires(self, required):
+        return {column for name in self.derived(required) for column in DERIVED_COLUMNS[name][1]}
+
+    def derived(self, required):
+        return [name for name in self.names if required is None or name in required]
+
+    def params(self):
+        return tuple(self.names)
+
+    def with_children(self, children):
+        return self.replace(children=tuple(children))
+
+    def describe(self, required):
+        return f"Derive {', '.join(self.derived(required)) or 'nothing'}"
+
+
+class Transform(PlanNode):
+    """
+    Apply func(df) -> df, which reads `requires` and rewrites or adds `produces`.
+    With `partition_by` each group of those columns is transformed independently.
+    """
+
+    kind = 'transform'
+
+    def __init__(self, child, func, requires, produces, partition_by=()):
+        self.children = (child,)
+        self.func = func
+        self.requires = frozenset(requires)
+        self.produces = frozenset(produces)
+        self.partition_by = frozenset(partition_by)
+
+    def params(self):
+        return (self.func, tuple(sorted(self.requires)), tuple(sorted(self.produces)), tuple(sorted(self.partition_by)))
+
+    def with_children(self, children):
+        return self.replace(children=tuple(children))
+
+    def describe(self, required):
+        partition = f" per {', '.join(sorted(self.partition_by))}" if self.partition_by else ''
+        return f"Transform {getattr(self.func, '__name__', self.func)}{partition}"
+
+
+class Aggregate(PlanNode):
+    kind = 'aggregate'
+
+    def __init__(self, child, by, columns, how):
+        self.children = (child,)
+        self.by = list(_normalize_keys(by))
+        self.columns = list(_normalize_keys(columns))
+        self.how = how
+
+    def params(self):
+        return (tuple(self.by), tuple(self.columns), _key(self.how))
+
+    def with_children(self, children):
+        return self.replace(children=tuple(children))
+
+    def describe(self, required):
+        return f"Aggregate {self.how} of {', '.join(self.columns)} by {', '.join(self.by)}"
+
+
+class Apply(PlanNode):
+    """Call func(df) on the columns `requires`; the result ends the plan"""
+
+    kind = 'apply'
+
+    def __init__(self, child, func, requires):
+        self.children = (child,)
+        self.func = func
+        self.requires = frozenset(requires)
+
+    def params(self):
+        return (self.func, tuple(sorted(self.requires)))
+
+    def with_children(self, children):
+        return self.replace(children=tuple(children))
+
+    def describe(self, required):
+        return f"Apply {getattr(self.func, '__name__', self.func)}"
+
+
+# ============================================================================
+# Building plans
+# ============================================================================
+
+class LazyFrame:
+    """A plan under construction; nothing is read or computed until collect()"""
+
+    def __init__(self, node):
+        self.node = node
+
+    def filter(self, predicate):
+        return LazyFrame(Filter(self.node, predicate))
+
+    def fill_missing(self, strategies):
+        """Fill missing values per column: 'mean', 'mode' or a constant value"""
+        return LazyFrame(Fill(self.node, strategies))
+
+    def derive(self, names=None):
+        """Add derived columns registered in traffic_features (default: Day_of_Week and Time_Period)"""
+        names = list(names or DEFAULT_DERIVED_COLUMNS)
+        unknown = [name for name in names if name not in DERIVED_COLUMNS]
+        if unknown:
+            raise KeyError(f"Unknown derived columns {unknown}. Registered: {sorted(DERIVED_COLUMNS)}")
+        return LazyFrame(Derive(self.node, names))
+
+    def transform(self, func, requires, produces, partition_by=()):
+        return LazyFrame(Transform(self.node, func, requires, produces, partition_by))
+
+    def aggregate(self, by, columns, how='mean'):
+        """Group by `by` and aggregate `columns` (any groupby .agg() specification)"""
+        return LazyFrame(Aggregate(self.node, by, columns, how))
+
+    def apply(self, func, requires):
+        return LazyFrame(Apply(self.node, func, requires))
+
+    def collect(self):
+        return collect_all([self])[0]
+
+    def explain(self):
+        return explain_all([self])
+
+
+def scan_csv(file_path, schema=None, chunksize=DEFAULT_CHUNKSIZE):
+    """Start a plan from a CSV (schema defaults to the course dataset's schema)"""
+    if schema is None:
+        schema = schema_for(file_path)
+    return LazyFrame(Scan(file_path, schema, chunksize))
+
+
+# ============================================================================
+# Optimizer
+# ============================================================================
+
+def _conjuncts(predicate):
+    if predicate.op == '&':
+        return _conjuncts(predicate.args[0]) + _conjuncts(predicate.args[1])
+    return [predicate]
+
+
+def _and_filter(node, predicate):
+    """`node` filtered by `predicate`, fused with a filter directly below"""
+    if isinstance(node, Filter):
+        return node.replace(predicate=node.predicate & predicate)
+    return Filter(node, predicate)
+
+
+def _push_filter(node, predicate):
+    """`node` filtered by `predicate`, with every part of the filter moved as far down as it may go"""
+    parts = _conjuncts(predicate)
+    if len(parts) > 1:
+        for part in parts:
+            node = _push_filter(node, part)
+        return node
+
+    columns = predicate.columns
+    if isinstance(node, Filter):
+        # Filters commute: move below this one and keep whatever stays as one combined filter
+        return _and_filter(_push_filter(node.children[0], predicate), node.predicate)
+    if isinstance(node, Scan):
+        combined = predicate if node.predicate is None else node.predicate & predicate
+        return node.replace(predicate=combined)
+    if isinstance(node, Derive) and not columns & node.produces:
+        return node.with_children([_push_filter(node.children[0], predicate)])
+    if isinstance(node, Transform) and not columns & node.produces and columns <= node.partition_by:
+        return node.with_children([_push_filter(node.children[0], predicate)])
+    if isinstance(node, Fill) and not columns & set(node.strategies):
+        # The fill values must still come from every row, so they are taken from the unfiltered input
+        child = node.children[0]
+        source = node.source if node.source is not None else child
+        return node.with_children([_push_filter(child, predicate), source])
+    return _and_filter(node, predicate)
+
+
+def _push_down(node, done):
+    if id(node) not in done:
+        children = [_push_down(child, done) for child in node.children]
+        rewritten = node.with_children(children) if node.children else node
+        if isinstance(rewritten, Filter):
+            rewritten = _push_filter(rewritten.children[0], rewritten.predicate)
+        done[id(node)] = rewritten
+    return done[id(node)]
+
+
+def _share(node, shared):
+    """Replace every step by the first equal step seen (common-subexpression sharing)"""
+    if node.children:
+        node = node.with_children([_share(child, shared) for child in node.children])
+    return shared.setdefault(node.key, node)
+
+
+def _topological(roots):
+    """Every node once, each one before the nodes it reads from"""
+    order, seen = [], set()
+
+    def visit(node):
+        if id(node) in seen:
+            return
+        seen.add(id(node))
+        for child in node.children:
+            visit(child)
+        order.append(node)
+
+    for root in roots:
+        visit(root)
+    return order[::-1]
+
+
+def _union(current, columns):
+    if current is None or columns is None:
+        return None
+    return current | set(columns)
+
+
+def _child_requirements(node, required):
+    """Columns each child must provide when the steps above need `required` (None = all)"""
+    if isinstance(node, Aggregate):
+        return [set(node.by) | set(node.columns)]
+    if isinstance(node, Apply):
+        return [set(node.requires)]
+    if isinstance(node, Filter):
+        return [_union(required, node.predicate.columns)]
+    if isinstance(node, Fill):
+        child = required if required is None else set(required)
+        return [child] if node.source is None else [child, set(node.filled(required))]
+    if isinstance(node, Derive):
+        return [None if required is None else (required - node.produces) | node.requires(required)]
+    if isinstance(node, Transform):
+        return [None if required is None else (required - node.produces) | node.requires]
+    return []
+
+
+class OptimizedPlan:
+    """Optimized, shared steps of several plans plus the columns every step must output"""
+
+    def __init__(self, frames):
+        done, shared = {}, {}
+        self.roots = [_share(_push_down(frame.node, done), shared) for frame in frames]
+        self.order = _topological(self.roots)
+
+        # Union of what every consumer needs (roots return all their columns)
+        self.required = {id(root): None for root in self.roots}
+        self.consumers = {id(node): 0 for node in self.order}
+        for node in self.order:
+            required = self.required.get(id(node), set())
+            for child, needed in zip(node.children, _child_requirements(node, required)):
+                self.consumers[id(child)] += 1
+                self.required[id(child)] = needed if id(child) not in self.required \
+                    else _union(self.required[id(child)], needed)
+        for root in self.roots:
+            self.consumers[id(root)] += 1
+
+    def columns(self, node):
+        """Sorted list of the columns `node` must output (None = all)"""
+        required = self.required[id(node)]
+        return None if required is None else sorted(required)
+
+    def explain(self):
+        lines, shown = [], set()
+
+        def show(node, depth):
+            text = '  ' * depth + node.describe(self.columns(node))
+            if self.consumers[id(node)] > 1:
+                if id(node) in shown:
+                    lines.append(text + "  [shared, runs once: see above]")
+                    return
+                text += f"  [shared by {self.consumers[id(node)]}]"
+            shown.add(id(node))
+            lines.append(text)
+            for child in node.children:
+                show(child, depth + 1)
+
+        for number, root in enumerate(self.roots, 1):
+            lines.append(f"Plan {number}:")
+            show(root, 1)
+        return '\n'.join(lines)
+
+
+def explain_all(frames):
+    """Text description of the optimized plans of several LazyFrames"""
+    return OptimizedPlan(frames).explain()
+
+
+# ============================================================================
+# Execution
+# ============================================================================
+
+def _scan_options(scan, columns):
+    """csv_loader arguments of a scan: the columns to read (with the predicate's) and the row filter"""
+    predicate = scan.predicate
+    read = None if columns is None else set(columns) | (predicate.columns if predicate is not None else set())
+    return dict(schema=scan.schema, columns=read, where=None if predicate is None else predicate.evaluate,
+                chunksize=scan.chunksize)
+
+
+def _only(df, columns):
+    return df if columns is None else df[[column for column in df.columns if column in columns]]
+
+
+def _scan_chunks(scan, columns):
+    """Read the CSV in chunks: only `columns` (None = all) of the rows matching the scan predicate"""
+    for chunk in iter_csv(scan.file_path, **_scan_options(scan, columns)):
+        yield _only(chunk, columns)
+
+
+def _read_scan(scan, columns):
+    return _only(load_csv(scan.file_path, **_scan_options(scan, columns)), columns)
+
+
+def _mode(counts):
+    """Most frequent value, ties broken like Series.mode()[0]"""
+    counts = counts[counts > 0]
+    if not len(counts):
+        return None
+    return sorted(counts[counts == counts.max()].index)[0]
+
+
+def _fill_values(frames, strategies):
+    """Fill value of every column from an iterable of frames (means from sums and counts)"""
+    sums, counts, value_counts = {}, {}, {}
+    for frame in frames:
+        for column, method in strategies.items():
+            if method == 'mean':
+                # Exact sums, so the fill value is the same however the frames were chunked
+                values = pd.to_numeric(frame[column], errors='coerce').dropna()
+                sums[column] = add_exact(sums.get(column, (0.0, 0.0)), exact_total(values, []))
+                counts[column] = counts.get(column, 0) + int(frame[column].count())
+            elif method == 'mode':
+                frame_counts = frame[column].value_counts()
+                current = value_counts.get(column)
+                value_counts[column] = frame_counts if current is None else current.add(frame_counts, fill_value=0)
+    values = {}
+    for column, method in strategies.items():
+        if method == 'mean':
+            values[column] = float(sums[column][0] + sums[column][1]) / counts[column] if counts[column] \
+                else float('nan')
+        elif method == 'mode':
+            values[column] = _mode(value_counts[column])
+        else:
+            values[column] = method
+    return values
+
+
+class _Executor:
+    """Runs an OptimizedPlan; every shared step once, in place where nothing else reads its input"""
+
+    def __init__(self, plan):
+        self.plan = plan
+        self.results = {}
+        self.remaining = dict(plan.consumers)
+        self.roots = {id(root) for root in plan.roots}
+
+    def run(self):
+        return [self.value(root) for root in self.plan.roots]
+
+    def value(self, node):
+        if id(node) not in self.results:
+            self.results[id(node)] = self.execute(node)
+        result = self.results[id(node)]
+        self.remaining[id(node)] -= 1
+        if not self.remaining[id(node)]:
+            # Last consumer: release the intermediate result
+            del self.results[id(node)]
+        return result
+
+    def frames(self, node, columns):
+        """The result of `node` as a list of frames, streamed in chunks if it is a scan not otherwise needed yet"""
+        if isinstance(node, Scan) and id(node) not in self.results:
+            self.remaining[id(node)] -= 1
+            return _scan_chunks(node, columns)
+        return [self.value(node)]
+
+    def owned(self, child):
+        """The child's result, safe to modify: in place if this step is its only consumer"""
+        only_consumer = self.remaining[id(child)] == 1 and id(child) not in self.roots
+        df = self.value(child)
+        return df if only_consumer else df.copy(deep=False)
+
+    def execute(self, node):
+        columns = self.plan.columns(node)
+        if isinstance(node, Scan):
+            return _read_scan(node, columns)
+
+        if isinstance(node, Filter):
+            df = self.value(node.children[0])
+            mask = node.predicate.evaluate(df)
+            # Copy only the matching rows of the columns still needed
+            return df.loc[mask] if columns is None else df.loc[mask, [c for c in df.columns if c in columns]]
+
+        if isinstance(node, Fill):
+            strategies = {column: node.strategies[column] for column in node.filled(self.plan.required[id(node)])}
+            if node.source is None:
+                df = self.owned(node.children[0])
+                strategies = {column: method for column, method in strategies.items() if df[column].isnull().any()}
+                values = _fill_values([df], strategies)
+            else:
+                values = _fill_values(self.frames(node.source, list(strategies)), strategies) if strategies else {}
+                df = self.owned(node.children[0])
+            for column, value in values.items():
+                df[column] = df[column].fillna(value)
+            return df
+
+        if isinstance(node, Derive):
+            names = node.derived(self.plan.required[id(node)])
+            if not names:
+                return self.value(node.children[0])
+            return add_derived_columns(self.owned(node.children[0]), names)
+
+        if isinstance(node, Transform):
+            return node.func(self.owned(node.children[0]))
+
+        if isinstance(node, Aggregate):
+            df = self.value(node.children[0])
+            return df.groupby(node.by, observed=True)[node.columns].agg(node.how)
+
+        if isinstance(node, Apply):
+            return node.func(self.value(node.children[0]))
+        raise TypeError(f"Unknown plan step {node!r}")
+
+
+def collect_all(frames):
+    """Optimize several LazyFrames together and return their results in order"""
+    return _Executor(OptimizedPlan(frames)).run()
+
+
+# ============================================================================
+# The reports as plans
+# ============================================================================
+
+def traffic_rows(date_range=None, locations=None):
+    """Predicate for load_traffic's `date_range` (start, end; either may be None) and `locations`, or None"""
+    predicate = None
+    start, end = date_range if date_range is not None else (None, None)
+    for condition in (None if start is None else col('Date') >= start,
+                      None if end is None else col('Date') <= end,
+                      col('Location').isin(locations) if locations else None):
+        if condition is not None:
+            predicate = condition if predicate is None else predicate & condition
+    return predicate
+
+
+def filtered_traffic(file_path=TRAFFIC_FILE, chunksize=DEFAULT_CHUNKSIZE, date_range=None, locations=None):
+    """STEP 1 of the traffic report: the typed rows inside `date_range` and `locations`"""
+    plan = scan_csv(file_path, TRAFFIC_SCHEMA, chunksize)
+    predicate = traffic_rows(date_range, locations)
+    return plan if predicate is None else plan.filter(predicate)
+
+
+def cleaned_traffic(file_path=TRAFFIC_FILE, chunksize=DEFAULT_CHUNKSIZE, date_range=None, locations=None):
+    """
+    STEPs 1-2 of the traffic report: typed load, mean/mode fills and the derived
+    columns. Rows outside `date_range` and `locations` are dropped before the
+    fills, as load_traffic drops them while reading.
+    """
+    return filtered_traffic(file_path, chunksize, date_range, locations).fill_missing(TRAFFIC_FILLS).derive()
+
+
+def _traffic_profile(df):
+    """STEP 1 profile of the loaded rows and the STEP 2 fills the plans apply to them"""
+    strategies = {column: method for column, method in TRAFFIC_FILLS.items() if df[column].isnull().any()}
+    return {
+        'rows': len(df), 'columns': list(df.columns), 'sample': df.head(), 'dtypes': df.dtypes,
+        'missing': df.isnull().sum(), 'date_min': df['Date'].min(), 'date_max': df['Date'].max(),
+        'fills': [(column, strategies[column], value) for column, value in _fill_values([df], strategies).items()],
+    }
+
+
+def traffic_report_plans(file_path=TRAFFIC_FILE, groupings=REPORT_GROUPINGS, chunksize=DEFAULT_CHUNKSIZE,
+                         date_range=None, locations=None):
+    """Metric means of every report grouping, one plan each over the shared cleaned data"""
+    cleaned = cleaned_traffic(file_path, chunksize, date_range, locations)
+    return {_normalize_keys(keys): cleaned.aggregate(list(keys), METRICS) for keys in groupings}
+
+
+def rush_hour_plan(file_path=TRAFFIC_FILE, location=None, chunksize=DEFAULT_CHUNKSIZE):
+    """Rush-hour metric means per period and day, optionally for one location"""
+    plan = cleaned_traffic(file_path, chunksize).filter(col('Time_Period').isin(['Morning Rush', 'Evening Rush']))
+    if location is not None:
+        plan = plan.filter(col('Location') == location)
+    return plan.aggregate(['Time_Period', 'Day_of_Week'], METRICS)
+
+
+class PlanStats:
+    """
+    Collected report plans behind the same group_means() as TrafficAggregates,
+    plus (given a profile) the same STEP 1 attributes, so traffic_analysis can
+    wrap it in a TrafficData
+    """
+
+    def __init__(self, means, profile=None):
+        self.means = {_normalize_keys(keys): frame for keys, frame in means.items()}
+        if profile is not None:
+            self.rows, self.columns, self.sample = profile['rows'], profile['columns'], profile['sample']
+            self.dtypes, self.missing = profile['dtypes'], profile['missing']
+            self.date_min, self.date_max = profile['date_min'], profile['date_max']
+            self.fills = profile['fills']
+
+    def group_means(self, keys):
+        keys = _normalize_keys(keys)
+        if keys not in self.means:
+            raise KeyError(f"Grouping {keys} was not planned")
+        return self.means[keys]
+
+
+def traffic_plan_stats(file_path=TRAFFIC_FILE, chunksize=DEFAULT_CHUNKSIZE, date_range=None, locations=None):
+    """
+    Run the report plans and a STEP 1 profile as one optimized set and return
+    their PlanStats, which the STEP 3-6 functions of traffic_analysis accept in
+    place of TrafficData.stats. Raises ValueError if no row matches.
+    """
+    plans = traffic_report_plans(file_path, chunksize=chunksize, date_range=date_range, locations=locations)
+    # The profile shares the scan (and filter) with the report plans, so the CSV is read once
+    profile = filtered_traffic(file_path, chunksize, date_range, locations).apply(
+        _traffic_profile, requires=list(TRAFFIC_SCHEMA))
+    *means, profile = collect_all(list(plans.values()) + [profile])
+    if not profile['rows']:
+        raise ValueError(f"No rows of {file_path} match the date range and locations")
+    return PlanStats(dict(zip(plans, means)), profile)
+
+
+def analyze_traffic_plans(file_path=TRAFFIC_FILE, chunksize=DEFAULT_CHUNKSIZE, date_range=None, locations=None):
+    """STEPs 3-7 of the traffic report (a traffic_analysis.TrafficReport), run as one optimized set of plans"""
+    from traffic_analysis import road_type_performance, rush_hour_analysis, traffic_patterns, traffic_report, \
+        weather_impact
+
+    stats = traffic_plan_stats(file_path, chunksize, date_range, locations)
+    return traffic_report(traffic_patterns(stats), weather_impact(stats), road_type_performance(stats),
+                          rush_hour_analysis(stats))
+
+
+def _fill_rice_prices(df):
+    return fill_missing_prices(df)[0]
+
+
+def rice_report_plans(file_path=RICE_FILE, provinces=None, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    PHASE 2-4 of the rice report: the daily national average and the provincial
+    statistics, over the prices filled per province (optionally only `provinces`)
+    """
+    filled = scan_csv(file_path, RICE_SCHEMA, chunksize).transform(
+        _fill_rice_prices, requires=['Date', 'Province', 'Price_per_Kg'], produces=['Price_per_Kg'],
+        partition_by=['Province'])
+    if provinces is not None:
+        filled = filled.filter(col('Province').isin(provinces))
+    return {
+        'national_average': filled.apply(national_average_daily, requires=['Date', 'Price_per_Kg']),
+        'provincial_statistics': filled.apply(provincial_statistics, requires=['Province', 'Price_per_Kg']),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show and run the traffic and rice reports as optimized lazy plans")
+    parser.add_argument('--traffic', default=TRAFFIC_FILE, help="hourly traffic CSV")
+    parser.add_argument('--rice', default=RICE_FILE, help="rice price CSV")
+    parser.add_argument('--location', default=None, help="only this location in the rush-hour plan")
+    args = parser.parse_args(argv)
+
+    report_plans = list(traffic_report_plans(args.traffic).values())
+    print("=== Traffic report (STEPs 3-7) ===")
+    print(explain_all(report_plans))
+    report = analyze_traffic_plans(args.traffic)
+    print(f"\nBest time to travel: {report.best_time} ({report.best_time_speed:.1f} km/h)")
+
+    rush_hour = rush_hour_plan(args.traffic, args.location)
+    print("\n=== Rush hour by day ===")
+    print(rush_hour.explain())
+    print(rush_hour.collect().round(1))
+
+    rice_plans = rice_report_plans(args.rice)
+    print("\n=== Rice report (PHASE 2-4) ===")
+    print(explain_all(list(rice_plans.values())))
+    national_average, provincial_stats = collect_all(list(rice_plans.values()))
+    print(f"\nNational average price: Rp {national_average.mean():,.2f} per Kg")
+    print(provincial_stats.sort_values('Volatility (Std_Dev)', ascending=False).head().round(2))
+    return 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Memory Optimizer
+================
+
+Shrinks a DataFrame's resident memory using the dataset schemas from
+data_schemas.py:
+
+1. Declared columns are converted to their schema dtype (categoricals,
+   datetimes, small integers, booleans).
+2. Integer columns are downcast to the smallest integer type that holds
+   their range.
+3. Float columns are downcast to float32 only when every stored value
+   survives the round trip unchanged.
+4. Undeclared low-cardinality string columns become categoricals.
+
+Every call returns a per-column before/after memory_usage(deep=True)
+report so the savings can be checked on every run. Frames that the
+schema-aware loader has already typed are measured against
+plain_read_usage(): what the same rows take as a plain pd.read_csv parses
+them (strings for text and dates, object for booleans with missing values).
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+from data_schemas import apply_schema
+
+# A string column is made categorical when at most this share of its values are distinct
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+# Above this many distinct values plain_read_usage() builds a text column instead of measuring each value
+MAX_MEASURED_VALUES = 1000
+
+
+def _downcast_integer(series):
+    """Smallest integer dtype that holds the column's range"""
+    return pd.to_numeric(series, downcast='integer')
+
+
+def _downcast_float(series):
+    """float32 copy of the column, or the column itself if float32 would lose precision"""
+    if series.dtype == np.float32:
+        return series
+    values = series.to_numpy()
+    narrow = values.astype(np.float32)
+    if np.array_equal(narrow.astype(values.dtype), values, equal_nan=True):
+        return pd.Series(narrow, index=series.index, name=series.name)
+    return series
+
+
+def _is_string_column(series):
+    return pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+
+
+def _object_bytes(series):
+    """memory_usage(deep=True) of the column's values held as Python objects (NaN for missing)"""
+    counts = series.astype(object).value_counts(dropna=False)
+    sizes = [sys.getsizeof(np.nan if pd.isna(value) else value) for value in counts.index]
+    return 8 * len(series) + int(np.dot(counts.to_numpy(), sizes))
+
+
+def _text_bytes(uniques, codes):
+    """
+    memory_usage(deep=True) of a column holding uniques[codes] (-1: missing) in
+    read_csv's default string dtype. Without missing values the usage is a
+    fixed part plus a per-row cost that depends only on the value, so it is
+    measured once per distinct value instead of building the whole column
+    (which is still done for columns with missing or many distinct values).
+    """
+    text_dtype = pd.Series(['']).dtype
+    values = np.asarray(uniques, dtype=object)
+    if (codes < 0).any() or not len(values) or len(values) > MAX_MEASURED_VALUES:
+        column = pd.Series(values.take(codes), dtype=text_dtype)
+        column[codes < 0] = np.nan
+        return int(column.memory_usage(deep=True, index=False))
+    one = np.array([pd.Series([value], dtype=text_dtype).memory_usage(deep=True, index=False) for value in values])
+    two = np.array([pd.Series([value, value], dtype=text_dtype).memory_usage(deep=True, index=False)
+                    for value in values])
+    per_row = two - one
+    return int((one - per_row)[0] + np.dot(np.bincount(codes, minlength=len(values)), per_row))
+
+
+def plain_read_usage(df):
+    """
+    Per-column dtype and memory_usage(deep=True) the rows of `df` would have
+    as parsed by a plain pd.read_csv (no schema): returns a DataFrame with
+    'dtype' and 'bytes' columns. Strings are built once per distinct value.
+    """
+    text_dtype = str(pd.Series(['']).dtype)
+    dtypes, sizes = {}, {}
+    for column in df.columns:
+        series = df[column]
+        has_missing = bool(series.isna().any())
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            dtypes[column] = text_dtype
+            sizes[column] = _text_bytes(series.cat.categories, series.cat.codes.to_numpy())
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            codes, uniques = pd.factorize(series)
+            dates = pd.DatetimeIndex(uniques)
+            dtypes[column] = text_dtype
+            sizes[column] = _text_bytes(dates.strftime('%Y-%m-%d' if (dates == dates.normalize()).all()
+                                                       else '%Y-%m-%d %H:%M:%S'), codes)
+        elif pd.api.types.is_bool_dtype(series):
+            dtypes[column] = 'object' if has_missing else 'bool'
+            sizes[column] = _object_bytes(series) if has_missing else len(series)
+        elif pd.api.types.is_numeric_dtype(series):
+            # Integers without missing values are read as int64, everything else as float64
+            integer = pd.api.types.is_integer_dtype(series) and not has_missing
+            dtypes[column] = 'int64' if integer else 'float64'
+            sizes[column] = 8 * len(series)
+        else:
+            dtypes[column] = str(series.dtype)
+            sizes[column] = int(series.memory_usage(deep=True, index=False))
+    return pd.DataFrame({'dtype': pd.Series(dtypes), 'bytes': pd.Series(sizes)}).reindex(df.columns)
+
+
+def optimize_memory(df, schema=None, categorical=None, before=None):
+    """
+    Convert `df` to compact dtypes in place and return (df, report).
+
+    `schema` maps columns to declared dtypes (see data_schemas.py); columns
+    listed in `categorical` are always made categorical. `before` (e.g.
+    plain_read_usage(df)) gives the 'dtype'/'bytes' to report as the starting
+    point instead of `df` as passed in. The report is a DataFrame indexed by
+    column with before/after dtypes and bytes.
+    """
+    schema = dict(schema or {})
+    for column in categorical or []:
+        schema[column] = 'category'
+
+    if before is None:
+        before_dtypes = df.dtypes.astype(str)
+        before_bytes = df.memory_usage(deep=True, index=False)
+    else:
+        before_dtypes, before_bytes = before['dtype'].astype(str), before['bytes']
+
+    apply_schema(df, schema)
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_bool_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        if pd.api.types.is_integer_dtype(series) and not pd.api.types.is_extension_array_dtype(series):
+            df[column] = _downcast_integer(series)
+        elif pd.api.types.is_float_dtype(series):
+            df[column] = _downcast_float(series)
+        elif column not in schema and _is_string_column(series) and \
+                series.nunique() <= CATEGORY_MAX_UNIQUE_RATIO * len(series):
+            df[column] = series.astype('category')
+
+    report = pd.DataFrame({
+        'before_dtype': before_dtypes,
+        'after_dtype': df.dtypes.astype(str),
+        'before_bytes': before_bytes,
+        'after_bytes': df.memory_usage(deep=True, index=False),
+    })
+    return df, report
+
+
+def format_bytes(n_bytes):
+    """Human readable byte count"""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if abs(n_bytes) < 1024 or unit == 'GB':
+            return f"{n_bytes:,.1f} {unit}" if unit != 'B' else f"{n_bytes:,.0f} B"
+        n_bytes /= 1024
+
+
+def memory_summary(report):
+    """One-line before → after summary of a memory report"""
+    before = report['before_bytes'].sum()
+    after = report['after_bytes'].sum()
+    saved_pct = (1 - after / before) * 100 if before else 0.0
+    return f"{format_bytes(before)} → {format_bytes(after)} ({saved_pct:.1f}% smaller)"
@@ -0,0 +1,276 @@
+"""
+Parallel Partitioned Analysis
+=============================
+
+Runs the per-partition cleaning and aggregation of the traffic and rice
+analyses in a process pool.
+
+The parent process encodes the frame once into flat NumPy columns (text
+columns become integer codes), reorders the rows so that every partition
+is a contiguous slice, and places them in a single shared memory block.
+Workers attach to that block and read their slice without any DataFrame
+being pickled; only the small per-partition results travel back.
+
+- Traffic is partitioned by Location or by date range. Each worker builds
+  TrafficAggregates for its slice and the parent merges them (sums and
+  counts merge exactly, and the STEP 2 fills are applied after merging).
+- Rice is partitioned by Province, so the grouped ffill/bfill never crosses
+  a province boundary. Workers write the filled prices straight back into
+  shared memory and return their provincial statistics plus per-date
+  sums/counts for the national average.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from rice_statistics import PROVINCIAL_QUANTILE_COLUMNS, PROVINCIAL_STAT_COLUMNS, fill_missing_prices, provincial_statistics
+from traffic_aggregates import TrafficAggregates
+
+TRAFFIC_PARTITION_KEYS = ['Location', 'Date']
+
+
+# ----------------------------------------------------------------------------
+# Shared memory column store
+# ----------------------------------------------------------------------------
+
+class SharedFrame:
+    """A DataFrame's columns encoded as flat arrays inside one shared memory block"""
+
+    def __init__(self, df):
+        self.layout = []
+        arrays = []
+        offset = 0
+        for column in df.columns:
+            array, kind, extra = _encode_column(df[column])
+            self.layout.append((column, kind, extra, array.dtype.str, offset, len(array)))
+            arrays.append(array)
+            offset += array.nbytes
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for (_, _, _, _, start, _), array in zip(self.layout, arrays):
+            target = np.ndarray(array.shape, dtype=array.dtype, buffer=self.shm.buf, offset=start)
+            target[:] = array
+
+    @property
+    def spec(self):
+        """Picklable description workers use to attach"""
+        return self.shm.name, self.layout
+
+    def array(self, column):
+        """Writable view of an encoded column in the parent process"""
+        return _views(self.shm, self.layout)[column]
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _encode_column(series):
+    """Return (flat array, kind, decoding info) for a column"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.to_numpy().view(np.int64), 'datetime', str(series.dtype)
+    if series.dtype == np.bool_:
+        return series.to_numpy(), 'numeric', None
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        if series.isnull().any() or pd.api.types.is_extension_array_dtype(series):
+            return series.to_numpy(dtype=np.float64, na_value=np.nan), 'numeric', None
+        return series.to_numpy(), 'numeric', None
+    # Text, categorical and nullable boolean columns travel as integer codes
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Keep the declared categories (and their order) rather than the order of appearance
+        return series.cat.codes.to_numpy().astype(np.int32), 'codes', (list(series.cat.categories), 'category')
+    codes, uniques = pd.factorize(series)
+    return codes.astype(np.int32), 'codes', (list(uniques), str(series.dtype))
+
+
+def _decode_codes(codes, uniques, dtype):
+    """Rebuild a coded column with the dtype it had in the parent"""
+    if dtype == 'category':
+        return pd.Categorical.from_codes(codes, categories=uniques)
+    if dtype == 'boolean':
+        lookup = np.array(uniques, dtype=bool)
+        return pd.arrays.BooleanArray(lookup[np.clip(codes, 0, None)], codes < 0)
+    lookup = np.array(uniques + [np.nan], dtype=object)
+    return lookup[np.where(codes >= 0, codes, len(uniques))]
+
+
+def _views(shm, layout):
+    """NumPy views of every column in a shared memory block"""
+    return {
+        column: np.ndarray((length,), dtype=np.dtype(dtype), buffer=shm.buf, offset=start)
+        for column, _, _, dtype, start, length in layout
+    }
+
+
+def _attach(name):
+    """Attach to an existing block without handing its lifetime to this process"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no track=False; the creating process still unlinks the block
+        return shared_memory.SharedMemory(name=name)
+
+
+def _decode_slice(spec, start, stop):
+    """Rebuild rows [start, stop) of a SharedFrame as a DataFrame"""
+    name, layout = spec
+    shm = _attach(name)
+    views = _views(shm, layout)
+    columns = {}
+    for column, kind, extra, _, _, _ in layout:
+        values = views[column][start:stop]
+        if kind == 'datetime':
+            columns[column] = pd.Series(values.copy().view(extra))
+        elif kind == 'codes':
+            columns[column] = _decode_codes(values, *extra)
+        else:
+            columns[column] = values.copy()
+    return pd.DataFrame(columns), shm, views
+
+
+# ----------------------------------------------------------------------------
+# Partitioning
+# ----------------------------------------------------------------------------
+
+def _balanced_buckets(keys, n_buckets):
+    """Assign every key value to one of n_buckets so that row counts are balanced"""
+    codes, uniques = pd.factorize(keys)
+    sizes = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    loads = np.zeros(n_buckets, dtype=np.int64)
+    bucket_of_key = np.empty(len(uniques), dtype=np.int64)
+    for key in np.argsort(-sizes, kind='stable'):
+        bucket = int(np.argmin(loads))
+        bucket_of_key[key] = bucket
+        loads[bucket] += sizes[key]
+    # Rows with a missing key are spread evenly (they cannot share a key group anyway)
+    missing = np.arange(len(codes)) % n_buckets
+    return np.where(codes >= 0, bucket_of_key[np.clip(codes, 0, None)], missing)
+
+
+def _partition_order(bucket_ids, n_buckets):
+    """Row order grouping each bucket contiguously, plus the (start, stop) of every bucket"""
+    order = np.argsort(bucket_ids, kind='stable')
+    bounds = np.searchsorted(bucket_ids[order], np.arange(n_buckets + 1))
+    return order, [(int(bounds[i]), int(bounds[i + 1])) for i in range(n_buckets) if bounds[i + 1] > bounds[i]]
+
+
+def _default_workers(workers):
+    return workers or os.cpu_count() or 1
+
+
+# ----------------------------------------------------------------------------
+# Traffic
+# ----------------------------------------------------------------------------
+
+def _traffic_worker(spec, start, stop, groupings, sketches):
+    frame, shm, views = _decode_slice(spec, start, stop)
+    try:
+        return TrafficAggregates(groupings, sketches).update(frame)
+    finally:
+        del frame, views
+        shm.close()
+
+
+def parallel_traffic_aggregates(df, partition_by='Location', workers=None, groupings=None, sketches=False):
+    """
+    Build TrafficAggregates for a raw (uncleaned) traffic frame with a process pool.
+    `partition_by` is the column to split on: 'Location' or 'Date' (contiguous date ranges); the
+    optional quantile/distinct sketches are merged like the sums.
+    """
+    if partition_by not in TRAFFIC_PARTITION_KEYS:
+        raise ValueError(f"partition_by must be one of {TRAFFIC_PARTITION_KEYS}, got '{partition_by}'")
+    workers = _default_workers(workers)
+
+    if partition_by == 'Location':
+        bucket_ids = _balanced_buckets(df['Location'], workers)
+    else:
+        # Equal-sized contiguous date ranges
+        dates = pd.to_datetime(df['Date']).to_numpy()
+        rank = np.argsort(np.argsort(dates, kind='stable'), kind='stable')
+        bucket_ids = rank * workers // max(len(df), 1)
+    order, slices = _partition_order(bucket_ids, workers)
+
+    shared = SharedFrame(df.iloc[order])
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_traffic_worker, shared.spec, start, stop, groupings, sketches)
+                       for start, stop in slices]
+            merged = TrafficAggregates(groupings, sketches)
+            for future in futures:
+                merged.merge(future.result())
+    finally:
+        shared.close()
+
+    # STEP 1 preview and dtypes should describe the file, not the first partition
+    merged.sample = df.head().copy()
+    merged.dtypes = df.dtypes.copy()
+    return merged
+
+
+# ----------------------------------------------------------------------------
+# Rice
+# ----------------------------------------------------------------------------
+
+def _rice_worker(spec, start, stop, fill_options):
+    frame, shm, views = _decode_slice(spec, start, stop)
+    try:
+        frame, fill_report = fill_missing_prices(frame, **fill_options)
+        # Write the filled prices back into shared memory for the parent
+        views['Price_per_Kg'][start:stop] = frame['Price_per_Kg'].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        provincial_stats = provincial_statistics(frame)
+        provincial_stats.index = provincial_stats.index.astype(object)
+        daily = frame.groupby('Date')['Price_per_Kg'].agg(['sum', 'count'])
+        return provincial_stats, daily, fill_report
+    finally:
+        del frame, views
+        shm.close()
+
+
+def parallel_rice_analysis(df, workers=None, **fill_options):
+    """
+    Clean and aggregate a rice price frame with one process-pool task per group of provinces.
+    `fill_options` are passed to fill_missing_prices (strategies, limit, max_gap).
+    Returns (filled frame, fill report, national_average_daily, provincial_stats),
+    exactly like the serial steps.
+    """
+    workers = _default_workers(workers)
+    bucket_ids = _balanced_buckets(df['Province'], workers)
+    order, slices = _partition_order(bucket_ids, workers)
+
+    ordered = df.iloc[order].reset_index(drop=True)
+    ordered['Price_per_Kg'] = ordered['Price_per_Kg'].astype(np.float64)
+    shared = SharedFrame(ordered[['Date', 'Province', 'Price_per_Kg']])
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_rice_worker, shared.spec, start, stop, fill_options) for start, stop in slices]
+            results = [future.result() for future in futures]
+        filled_prices = shared.array('Price_per_Kg').copy()
+    finally:
+        shared.close()
+
+    # Restore the original row order
+    filled = df.copy()
+    restored = np.empty_like(filled_prices)
+    restored[order] = filled_prices
+    filled['Price_per_Kg'] = restored
+
+    fill_report = {}
+    for _, _, report in results:
+        for strategy, count in report.items():
+            fill_report[strategy] = fill_report.get(strategy, 0) + count
+
+    provincial_stats = pd.concat([stats for stats, _, _ in results]).sort_index()
+    provincial_stats.index.name = 'Province'
+    provincial_stats = provincial_stats[list(PROVINCIAL_STAT_COLUMNS.values())
+                                        + list(PROVINCIAL_QUANTILE_COLUMNS.values())]
+
+    daily = pd.concat([daily for _, daily, _ in results]).groupby(level=0).sum()
+    national_average_daily = (daily['sum'] / daily['count']).round(2)
+    national_average_daily.index.name = 'Date'
+    national_average_daily.name = 'Price_per_Kg'
+    return filled, fill_report, national_average_daily, provincial_stats
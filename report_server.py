@@ -0,0 +1,372 @@
+"""
+Report Server
+=============
+
+An asyncio HTTP/JSON service that keeps the cleaned traffic, rice and
+student data in memory and answers questions about them:
+
+    GET /traffic                    every STEP 3-7 result of the traffic report
+    GET /traffic/<step>             patterns | weather | roads | rush-hour
+    GET /traffic/query              e.g. ?Time_Period=Evening Rush&by=Location&agg=mean
+    GET /rice/volatile?top=5        provinces ranked by price volatility
+    GET /rice/expensive?top=5       provinces ranked by average price
+    GET /students/subjects          average score per subject
+    GET /students/top?subject=Math  top student in a subject
+    GET /stats                      request counts and latency percentiles per route
+    GET /health
+
+The event loop only parses requests and writes responses. Every
+aggregation runs in a thread pool (pandas and NumPy release the GIL in
+their heavy kernels), so a slow query never blocks other clients. Identical
+requests that arrive while the same one is still running are coalesced:
+they wait for the first one's result instead of computing it again.
+
+Usage:
+    python report_server.py --port 8000 --workers 4
+    curl 'http://127.0.0.1:8000/traffic/query?by=Location&Weather_Condition=Rainy'
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from columnar_cache import load_csv_cached
+from data_schemas import RICE_SCHEMA
+from rice_statistics import fill_missing_prices, provincial_statistics
+from traffic_analysis import DATA_FILE as TRAFFIC_FILE, analyze_traffic, load_traffic
+from traffic_query import QUERY_AGGREGATIONS, TrafficQueryEngine
+from what_we_will_achieve import average_score_by_subject, fill_missing_scores, load_students, top_student
+
+RICE_FILE = 'indonesia_rice_prices.csv'
+STUDENT_FILE = 'sample_student_data.csv'
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8000
+DEFAULT_WORKERS = 4
+
+# Latencies kept per route for the percentiles on /stats
+LATENCY_WINDOW = 10_000
+
+TRAFFIC_STEPS = {'patterns': 'patterns', 'weather': 'weather', 'roads': 'roads', 'rush-hour': 'rush_hour'}
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class RequestError(Exception):
+    """A client error, answered with `status` and the message"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_safe(value):
+    """Nested result values as JSON-serializable Python objects (NaN becomes null)"""
+    if isinstance(value, dict):
+        return {str(key): _json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value
+
+
+def _records(frame):
+    """A result frame as a list of row objects, index levels included"""
+    return _json_safe(frame.reset_index().to_dict(orient='records'))
+
+
+def _split(value):
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+
+class LatencyStats:
+    """Request counts and a sliding window of latencies per route"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.latencies = defaultdict(lambda: deque(maxlen=window))
+        self.requests = Counter()
+        self.errors = Counter()
+        self.coalesced = Counter()
+
+    def record(self, route, seconds, status, coalesced=False):
+        self.latencies[route].append(seconds)
+        self.requests[route] += 1
+        if status >= 400:
+            self.errors[route] += 1
+        if coalesced:
+            self.coalesced[route] += 1
+
+    @staticmethod
+    def _percentiles(latencies):
+        if not latencies:
+            return {'p50_ms': None, 'p90_ms': None, 'p99_ms': None, 'max_ms': None}
+        milliseconds = np.asarray(latencies) * 1000
+        p50, p90, p99 = np.percentile(milliseconds, [50, 90, 99])
+        return {'p50_ms': round(p50, 3), 'p90_ms': round(p90, 3), 'p99_ms': round(p99, 3),
+                'max_ms': round(float(milliseconds.max()), 3)}
+
+    def summary(self):
+        routes = {}
+        for route in sorted(self.requests):
+            routes[route] = {'requests': self.requests[route], 'errors': self.errors[route],
+                             'coalesced': self.coalesced[route], **self._percentiles(self.latencies[route])}
+        everything = [latency for latencies in self.latencies.values() for latency in latencies]
+        overall = {'requests': sum(self.requests.values()), 'errors': sum(self.errors.values()),
+                   'coalesced': sum(self.coalesced.values()), **self._percentiles(everything)}
+        return {'overall': overall, 'routes': routes}
+
+
+class ReportServer:
+    """Resident datasets, route handlers, worker pool and request coalescing"""
+
+    def __init__(self, traffic_path=TRAFFIC_FILE, rice_path=RICE_FILE, student_path=STUDENT_FILE,
+                 host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS):
+        self.traffic_path, self.rice_path, self.student_path = traffic_path, rice_path, student_path
+        self.host, self.port = host, port
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='report-worker')
+        self.stats = LatencyStats()
+        self.inflight = {}
+        self.server = None
+        self.ready = False
+        self.routes = {
+            '/health': self.health,
+            '/traffic': self.traffic_report,
+            '/traffic/query': self.traffic_query,
+            '/rice/volatile': self.rice_volatile,
+            '/rice/expensive': self.rice_expensive,
+            '/students/subjects': self.student_subjects,
+            '/students/top': self.student_top,
+        }
+        for step in TRAFFIC_STEPS:
+            self.routes[f'/traffic/{step}'] = self.traffic_step
+
+    # ------------------------------------------------------------------
+    # Data (loaded once, in the worker pool)
+    # ------------------------------------------------------------------
+
+    def load(self):
+        """Load and clean every dataset; runs before the server accepts connections"""
+        self.traffic = load_traffic(self.traffic_path)
+        # The data is static, so the report is computed once and served as is
+        report = analyze_traffic(self.traffic)
+        self.traffic_summary = _json_safe(report.to_dict())
+        self.traffic_steps = {name: _json_safe(getattr(report, step).to_dict()) for name, step in TRAFFIC_STEPS.items()}
+        self.query_engine = TrafficQueryEngine(self.traffic.df, cube=self.traffic.aggregates)
+
+        rice = load_csv_cached(self.rice_path, RICE_SCHEMA)
+        rice['Date'] = pd.to_datetime(rice['Date'])
+        rice, _ = fill_missing_prices(rice)
+        self.provincial_stats = provincial_statistics(rice)
+
+        self.students = fill_missing_scores(load_students(self.student_path))
+        self.ready = True
+        return self
+
+    # ------------------------------------------------------------------
+    # Route handlers (run in the worker pool; `path` and `params` are parsed)
+    # ------------------------------------------------------------------
+
+    def health(self, path, params):
+        return {'status': 'ok' if self.ready else 'loading'}
+
+    def traffic_report(self, path, params):
+        return self.traffic_summary
+
+    def traffic_step(self, path, params):
+        return self.traffic_steps[path.rsplit('/', 1)[1]]
+
+    def _filter_values(self, column, raw):
+        """Query-string values converted to the column's type"""
+        df = self.traffic.df
+        if column not in df.columns:
+            raise RequestError(400, f"Unknown filter column '{column}'")
+        values = _split(raw)
+        dtype = df[column].dtype
+        if pd.api.types.is_bool_dtype(dtype):
+            return [value.lower() in ('true', '1', 'yes') for value in values]
+        if pd.api.types.is_numeric_dtype(dtype):
+            try:
+                return [float(value) if '.' in value else int(value) for value in values]
+            except ValueError:
+                raise RequestError(400, f"'{column}' values must be numbers, got '{raw}'")
+        return values
+
+    def traffic_query(self, path, params):
+        params = dict(params)
+        by = _split(params.pop('by', ''))
+        metrics = _split(params.pop('metrics', '')) or None
+        agg = params.pop('agg', 'mean')
+        if agg not in QUERY_AGGREGATIONS:
+            raise RequestError(400, f"agg must be one of {QUERY_AGGREGATIONS}")
+        unknown = [column for column in by if column not in self.traffic.df.columns]
+        if unknown:
+            raise RequestError(400, f"Unknown group columns {unknown}")
+        filters = {column: self._filter_values(column, raw) for column, raw in params.items()}
+        try:
+            result = self.query_engine.query(filters=filters, by=by, metrics=metrics, agg=agg)
+        except ValueError as error:
+            raise RequestError(400, str(error))
+        return {'filters': filters, 'by': by, 'agg': agg, 'rows': _records(result)}
+
+    def _top(self, params):
+        try:
+            top = int(params.get('top', 5))
+        except ValueError:
+            raise RequestError(400, "top must be an integer")
+        if top < 1:
+            raise RequestError(400, "top must be at least 1")
+        return top
+
+    def rice_volatile(self, path, params):
+        ranking = self.provincial_stats.sort_values(by='Volatility (Std_Dev)', ascending=False)
+        return _records(ranking.head(self._top(params)))
+
+    def rice_expensive(self, path, params):
+        ranking = self.provincial_stats.sort_values(by='Average_Price', ascending=False)
+        return _records(ranking.head(self._top(params)))
+
+    def student_subjects(self, path, params):
+        return _json_safe(average_score_by_subject(self.students).to_dict())
+
+    def student_top(self, path, params):
+        subject = params.get('subject', 'Math')
+        if not (self.students['Subject'] == subject).any():
+            raise RequestError(404, f"No students in subject '{subject}'")
+        return _json_safe(top_student(self.students, subject).to_dict())
+
+    # ------------------------------------------------------------------
+    # Dispatch
+    # ------------------------------------------------------------------
+
+    async def dispatch(self, method, target):
+        """Route one request; returns (status, payload, route, coalesced)"""
+        url = urlsplit(target)
+        path = url.path.rstrip('/') or '/'
+        if path == '/stats':
+            return 200, self.stats.summary(), path, False
+        handler = self.routes.get(path)
+        if handler is None:
+            return 404, {'error': f"No route {path}", 'routes': sorted(self.routes) + ['/stats']}, 'unknown', False
+        if method != 'GET':
+            return 405, {'error': "Only GET is supported"}, path, False
+        if not self.ready and path != '/health':
+            return 503, {'error': "Datasets are still loading"}, path, False
+
+        params = dict(parse_qsl(url.query, keep_blank_values=True))
+        key = (path, tuple(sorted(params.items())))
+        future = self.inflight.get(key)
+        coalesced = future is not None
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, handler, path, params)
+            self.inflight[key] = future
+            future.add_done_callback(lambda _: self.inflight.pop(key, None))
+        try:
+            # shield: a client that disconnects must not cancel the shared computation
+            return 200, await asyncio.shield(future), path, coalesced
+        except RequestError as error:
+            return error.status, {'error': str(error)}, path, coalesced
+        except Exception as error:
+            return 500, {'error': f"{type(error).__name__}: {error}"}, path, coalesced
+
+    async def handle_connection(self, reader, writer):
+        """Serve one HTTP/1.1 request per connection"""
+        started = time.perf_counter()
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            if len(request_line) < 2:
+                status, payload, route, coalesced = 400, {'error': "Malformed request"}, 'unknown', False
+            else:
+                status, payload, route, coalesced = await self.dispatch(request_line[0], request_line[1])
+
+            body = json.dumps(payload).encode('utf-8')
+            head = (f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                    f"Connection: close\r\n\r\n")
+            writer.write(head.encode('latin-1') + body)
+            await writer.drain()
+            self.stats.record(route, time.perf_counter() - started, status, coalesced)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def start(self):
+        """Load the datasets in the pool, then start listening (port 0 picks a free port)"""
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.load)
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown(wait=False)
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"Serving reports on http://{self.host}:{self.port} (routes: {', '.join(sorted(self.routes))}, /stats)")
+        async with self.server:
+            await self.server.serve_forever()
+
+
+async def fetch_json(host, port, path):
+    """Minimal client: GET `path` and return (status, decoded JSON body)"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode('latin-1'))
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    status = int(head.split()[1])
+    return status, json.loads(body)
+
+
+def parse_args(argv=None):
+    """Helper function to read the command line options"""
+    parser = argparse.ArgumentParser(description="HTTP/JSON server for the traffic, rice and student reports")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="threads that run the aggregations")
+    parser.add_argument('--traffic', default=TRAFFIC_FILE, help="traffic CSV")
+    parser.add_argument('--rice', default=RICE_FILE, help="rice price CSV")
+    parser.add_argument('--students', default=STUDENT_FILE, help="student scores CSV")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = ReportServer(args.traffic, args.rice, args.students, args.host, args.port, args.workers)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
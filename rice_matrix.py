@@ -0,0 +1,186 @@
+"""
+Indonesian Rice Price Analysis - Dense Price Matrix
+===================================================
+
+An optional wide representation of the long (Date, Province, Price_per_Kg)
+rows: a float32 2-D array with one row per day and one column per
+province, plus the Date and Province index maps. Every step of the report
+becomes a NumPy reduction along an axis instead of a groupby over strings:
+
+- national average per day:  mean along the provinces (axis 1)
+- provincial statistics:      mean/std/min/max along the dates (axis 0)
+- gap filling:                each column is already one province in date order
+- rolling windows:            RollingPriceEngine accepts a PriceMatrix directly
+
+A cell without a price is NaN. If some provinces have no row at all for a
+day, an `observed` mask tells those cells apart from rows whose price is
+missing, so gap filling only fills the latter, exactly like the long format.
+Prices are stored as float32, which is exact for whole-rupiah prices.
+
+save() writes the arrays as .npy files in a directory; PriceMatrix.open()
+memory-maps them, so a multi-year history opens instantly and processes
+that open the same directory share the pages without copying.
+"""
+
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from gap_filling import DEFAULT_STRATEGIES, fill_sorted
+from rice_statistics import PROVINCIAL_QUANTILE_COLUMNS, PROVINCIAL_STAT_COLUMNS
+from sketches import DEFAULT_QUANTILES, QuantileSketch
+
+MATRIX_DTYPE = np.float32
+
+
+def _sorted_codes(values):
+    """Factorize `values` with the uniques in sorted order (missing values get -1)"""
+    codes, uniques = pd.factorize(values)
+    uniques = np.asarray(uniques, dtype=object)
+    order = np.argsort(uniques, kind='stable')
+    rank = np.empty(len(uniques), dtype=np.int64)
+    rank[order] = np.arange(len(uniques))
+    return np.where(codes >= 0, rank[np.clip(codes, 0, None)], -1), uniques[order]
+
+
+class PriceMatrix:
+    """Dense Date x Province price matrix with its index maps"""
+
+    def __init__(self, values, dates, provinces, observed=None):
+        self.values = values
+        self.dates = pd.DatetimeIndex(dates, name='Date')
+        self.provinces = pd.Index(provinces, dtype=object, name='Province')
+        # None when every (date, province) cell has a row
+        self.observed = observed
+        if values.shape != (len(self.dates), len(self.provinces)):
+            raise ValueError(f"values shape {values.shape} does not match "
+                             f"{len(self.dates)} dates x {len(self.provinces)} provinces")
+
+    @classmethod
+    def from_frame(cls, df, value_column='Price_per_Kg'):
+        """Build the matrix from long-format rows (several prices for one province and day are averaged)"""
+        dates = pd.to_datetime(df['Date']).dt.normalize()
+        date_codes, date_values = pd.factorize(dates, sort=True)
+        province_codes, provinces = _sorted_codes(df['Province'])
+        prices = pd.to_numeric(df[value_column], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+
+        n_dates, n_provinces = len(date_values), len(provinces)
+        valid = (date_codes >= 0) & (province_codes >= 0)
+        cells = date_codes[valid] * n_provinces + province_codes[valid]
+        priced = ~np.isnan(prices[valid])
+        size = n_dates * n_provinces
+        sums = np.bincount(cells[priced], weights=prices[valid][priced], minlength=size)
+        counts = np.bincount(cells[priced], minlength=size)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = np.where(counts > 0, sums / counts, np.nan).astype(MATRIX_DTYPE)
+
+        present = np.bincount(cells, minlength=size) > 0
+        observed = None if present.all() else present.reshape(n_dates, n_provinces)
+        return cls(values.reshape(n_dates, n_provinces), date_values, provinces, observed)
+
+    def to_frame(self, value_column='Price_per_Kg'):
+        """Long-format (Date, Province, price) rows of the observed cells, in date order"""
+        observed = np.ones(self.values.shape, dtype=bool) if self.observed is None else self.observed
+        date_rows, province_columns = np.nonzero(observed)
+        return pd.DataFrame({
+            'Date': self.dates[date_rows],
+            'Province': pd.Categorical.from_codes(province_columns, self.provinces),
+            value_column: self.values[date_rows, province_columns].astype(np.float64),
+        })
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + (0 if self.observed is None else self.observed.nbytes)
+
+    def price(self, date, province):
+        """Price of one province on one day (NaN if there is none)"""
+        return float(self.values[self.dates.get_loc(pd.Timestamp(date)), self.provinces.get_loc(province)])
+
+    def missing(self):
+        """Number of observed cells without a price"""
+        missing = np.isnan(self.values)
+        if self.observed is not None:
+            missing &= self.observed
+        return int(missing.sum())
+
+    # ------------------------------------------------------------------
+    # Report steps
+    # ------------------------------------------------------------------
+
+    def fill_missing_prices(self, strategies=DEFAULT_STRATEGIES, limit=None, max_gap=None):
+        """
+        Same as rice_statistics.fill_missing_prices, on a copy of the matrix.
+        Returns (matrix, report) with the number of values each strategy filled.
+        """
+        # Column-major order lists every province's cells in date order, as the fill engine expects
+        order = np.flatnonzero(np.ones(self.values.shape, dtype=bool).T if self.observed is None else self.observed.T)
+        values = self.values.T.reshape(-1)[order].astype(np.float64)
+        codes = order // len(self.dates)
+        times = self.dates.asi8.astype(np.float64)[order % len(self.dates)]
+        report = fill_sorted(values, times, codes, strategies, limit, max_gap)
+
+        filled = self.values.T.copy()
+        filled.reshape(-1)[order] = values
+        report['remaining'] = int(np.isnan(values).sum())
+        return PriceMatrix(np.ascontiguousarray(filled.T), self.dates, self.provinces, self.observed), report
+
+    def national_average_daily(self):
+        """Daily national average price (same as rice_statistics.national_average_daily)"""
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            means = np.nanmean(self.values, axis=1, dtype=np.float64)
+        return pd.Series(means, index=self.dates, name='Price_per_Kg').round(2)
+
+    def provincial_statistics(self):
+        """Mean, std, min, max and P50/P90/P99 price per province (same as rice_statistics.provincial_statistics)"""
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            columns = {
+                'mean': np.nanmean(self.values, axis=0, dtype=np.float64),
+                'std': np.nanstd(self.values, axis=0, dtype=np.float64, ddof=1),
+                'min': np.nanmin(self.values, axis=0).astype(np.float64),
+                'max': np.nanmax(self.values, axis=0).astype(np.float64),
+            }
+        priced = ~np.isnan(self.values)
+        provincial_stats = pd.DataFrame(columns, index=self.provinces).rename(columns=PROVINCIAL_STAT_COLUMNS).fillna(0)
+
+        # The same quantile sketch as the long format, fed straight from the matrix cells
+        date_rows, province_columns = np.nonzero(priced)
+        cells = pd.DataFrame({'Province': pd.Categorical.from_codes(province_columns, self.provinces),
+                              'Price_per_Kg': self.values[date_rows, province_columns].astype(np.float64)})
+        quantiles = QuantileSketch('Province').update(cells, 'Price_per_Kg').quantiles(DEFAULT_QUANTILES)
+        quantiles = quantiles.rename(columns=PROVINCIAL_QUANTILE_COLUMNS).reindex(provincial_stats.index)
+        return provincial_stats.join(quantiles)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def save(self, directory):
+        """Write the matrix as .npy arrays plus the index maps into `directory`"""
+        os.makedirs(directory, exist_ok=True)
+        arrays = {'values': np.ascontiguousarray(self.values)}
+        if self.observed is not None:
+            arrays['observed'] = np.ascontiguousarray(self.observed)
+        for name, array in arrays.items():
+            temp_path = os.path.join(directory, name + '.tmp.npy')
+            np.save(temp_path, array)
+            os.replace(temp_path, os.path.join(directory, name + '.npy'))
+        observed_path = os.path.join(directory, 'observed.npy')
+        if self.observed is None and os.path.exists(observed_path):
+            os.remove(observed_path)
+        # The index is written last, so a complete index always describes complete arrays
+        temp_path = os.path.join(directory, 'index.tmp.pkl')
+        pd.to_pickle({'dates': self.dates, 'provinces': self.provinces}, temp_path)
+        os.replace(temp_path, os.path.join(directory, 'index.pkl'))
+
+    @classmethod
+    def open(cls, directory, mmap_mode='r'):
+        """Open a saved matrix; the arrays are memory-mapped (mmap_mode=None reads them into memory)"""
+        index = pd.read_pickle(os.path.join(directory, 'index.pkl'))
+        values = np.load(os.path.join(directory, 'values.npy'), mmap_mode=mmap_mode)
+        observed_path = os.path.join(directory, 'observed.npy')
+        observed = np.load(observed_path, mmap_mode=mmap_mode) if os.path.exists(observed_path) else None
+        return cls(values, index['dates'], index['provinces'], observed)
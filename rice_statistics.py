@@ -0,0 +1,58 @@
+"""
+Indonesian Rice Price Analysis - Statistics
+===========================================
+
+The cleaning and aggregation steps behind analyze_rice_prices(), kept as
+plain functions so the report, the parallel executor and other tools all
+compute exactly the same numbers.
+"""
+
+from gap_filling import DEFAULT_STRATEGIES, fill_gaps
+from sketches import DEFAULT_QUANTILES, QuantileSketch
+
+# Column names used in the provincial statistics table of the report
+PROVINCIAL_STAT_COLUMNS = {
+    'mean': 'Average_Price',
+    'std': 'Volatility (Std_Dev)',
+    'min': 'Min_Price',
+    'max': 'Max_Price',
+}
+
+# Approximate price quantiles per province (1 % relative accuracy, see sketches.py)
+PROVINCIAL_QUANTILE_COLUMNS = {
+    'p50': 'P50_Price',
+    'p90': 'P90_Price',
+    'p99': 'P99_Price',
+}
+
+
+def fill_missing_prices(df, strategies=DEFAULT_STRATEGIES, limit=None, max_gap=None):
+    """
+    Fill missing prices within each province in date order (default: forward-fill,
+    then back-fill). Returns (df, report) with the number of values each strategy filled.
+    """
+    return fill_gaps(df, 'Price_per_Kg', 'Province', 'Date', strategies, limit=limit, max_gap=max_gap)
+
+
+def national_average_daily(df):
+    """Daily national average price"""
+    return df.groupby('Date')['Price_per_Kg'].mean().round(2)
+
+
+def provincial_quantiles(df):
+    """Sketch of the price distribution per province; merge sketches of different chunks with .merge()"""
+    return QuantileSketch('Province').update(df, 'Price_per_Kg')
+
+
+def provincial_statistics(df):
+    """
+    Mean, std, min and max price per province (single-observation std reported as 0),
+    followed by the approximate P50/P90/P99 prices.
+    """
+    provincial_stats = df.groupby('Province', observed=True)['Price_per_Kg'].agg(list(PROVINCIAL_STAT_COLUMNS))
+    provincial_stats.rename(columns=PROVINCIAL_STAT_COLUMNS, inplace=True)
+    provincial_stats.fillna(0, inplace=True)
+
+    quantiles = provincial_quantiles(df).quantiles(DEFAULT_QUANTILES)
+    quantiles = quantiles.rename(columns=PROVINCIAL_QUANTILE_COLUMNS).reindex(provincial_stats.index)
+    return provincial_stats.join(quantiles)
@@ -0,0 +1,256 @@
+"""
+Indonesian Rice Price Analysis - Rolling Windows
+================================================
+
+Rolling 7/30/90-day statistics for every province at once, for daily
+monitoring on top of the whole-period provincial statistics:
+
+- Average_Price_<w>d:  mean price over the trailing w calendar days
+- Volatility_<w>d:     sample standard deviation over the same days
+- Return_<w>d:         change of the latest known price against the latest
+                       known price w days earlier (0.05 = +5%)
+
+and the same mean/return for the daily national average price.
+
+The prices (a PriceMatrix, or long rows converted to one) are laid out over
+a continuous daily calendar (days without a price are empty). Cumulative sums of the prices,
+their squares and their counts turn every trailing-window total into one
+subtraction, cumsum[t] - cumsum[t - w], so all windows of all provinces
+are computed in a few vectorized passes, with no per-province loop. Prices
+are centred on a fixed reference price per province first, which keeps
+the sum-of-squares variance numerically stable over long histories.
+
+RollingPriceEngine keeps only the last max(windows) days, so when a new
+day of prices arrives, update() computes the statistics of that day alone
+and gives the same numbers as a full recompute.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from rice_matrix import PriceMatrix
+
+DEFAULT_WINDOWS = (7, 30, 90)
+
+
+def _window_columns(window):
+    return f'Average_Price_{window}d', f'Volatility_{window}d', f'Return_{window}d'
+
+
+def _trailing_totals(cumulative, first, window):
+    """Totals of the trailing `window` rows for rows first.. (`cumulative` has a leading zero row)"""
+    end = np.arange(first, len(cumulative) - 1) + 1
+    start = np.maximum(end - window, 0)
+    return cumulative[end] - cumulative[start]
+
+
+def _carry_forward(values):
+    """Last non-missing value at or before every row (forward fill along the dates)"""
+    rows = np.arange(len(values)).reshape((-1,) + (1,) * (values.ndim - 1))
+    last = np.maximum.accumulate(np.where(np.isnan(values), -1, rows), axis=0)
+    filled = np.take_along_axis(values, np.clip(last, 0, None), axis=0)
+    return np.where(last >= 0, filled, np.nan)
+
+
+def _lagged_return(prices, first, window):
+    """prices[t] / prices[t - window] - 1 for rows first.. (NaN without a price w days earlier)"""
+    rows = np.arange(first, len(prices))
+    lagged = np.full((len(rows),) + prices.shape[1:], np.nan)
+    has_lag = rows >= window
+    lagged[has_lag] = prices[rows[has_lag] - window]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return prices[first:] / lagged - 1
+
+
+def _cumulative(values):
+    """Cumulative sum along the dates with a leading zero row"""
+    return np.concatenate([np.zeros((1,) + values.shape[1:]), np.cumsum(values, axis=0)])
+
+
+class RollingPriceStats:
+    """Rolling statistics per province (one Date x Province frame per column) and for the national average"""
+
+    def __init__(self, provincial, national):
+        self.provincial = provincial
+        self.national = national
+
+    @property
+    def dates(self):
+        return self.national.index
+
+    def latest(self):
+        """Province x statistic table for the most recent day"""
+        if not len(self.dates):
+            return pd.DataFrame(columns=list(self.provincial))
+        return pd.DataFrame({name: frame.iloc[-1] for name, frame in self.provincial.items()})
+
+    def append(self, other):
+        """Statistics of this period followed by those of a later one (e.g. from the next update)"""
+        provincial = {name: pd.concat([frame, other.provincial[name]]) for name, frame in self.provincial.items()}
+        return RollingPriceStats(provincial, pd.concat([self.national, other.national]))
+
+
+class RollingPriceEngine:
+    """Incremental rolling-window statistics over (Date, Province, Price_per_Kg) rows"""
+
+    def __init__(self, windows=DEFAULT_WINDOWS):
+        self.windows = tuple(sorted(set(windows)))
+        if not self.windows or self.windows[0] < 1:
+            raise ValueError("windows must be positive numbers of days")
+        self.last_date = None
+        self.provinces = pd.Index([], name='Province')
+        # Centring price per province, fixed when the province is first seen
+        self.reference = pd.Series(dtype=np.float64)
+        # The last max(windows) days of centred sums, squared sums, counts and carried-forward prices
+        self.history = None
+
+    def _daily_matrices(self, prices):
+        """Centred price sums, squared sums and counts per (day, province) for a new PriceMatrix"""
+        values = np.asarray(prices.values, dtype=np.float64)
+        priced = ~np.isnan(values)
+
+        # Reference price of a new province: its first price in date order
+        seen = priced.any(axis=0)
+        first_prices = pd.Series(values[priced.argmax(axis=0)[seen], np.flatnonzero(seen)],
+                                 index=prices.provinces[seen])
+        self.reference = pd.concat([self.reference, first_prices[~first_prices.index.isin(self.reference.index)]])
+        self.provinces = self.provinces.union(prices.provinces).sort_values().rename('Province')
+
+        start = prices.dates[0] if self.last_date is None else self.last_date + pd.Timedelta(days=1)
+        calendar = pd.date_range(start, prices.dates[-1], freq='D', name='Date')
+        cells = np.ix_(calendar.get_indexer(prices.dates), self.provinces.get_indexer(prices.provinces))
+        reference = self.reference.reindex(prices.provinces).to_numpy(dtype=np.float64)
+        centred = np.where(priced, values - reference, 0.0)
+
+        matrices = {}
+        for name, daily in [('sums', centred), ('squares', centred ** 2), ('counts', priced.astype(np.float64))]:
+            matrices[name] = np.zeros((len(calendar), len(self.provinces)))
+            matrices[name][cells] = daily
+        return calendar, matrices
+
+    def update(self, prices):
+        """
+        Add the prices of days after the last day seen so far and return the rolling
+        statistics of those days. `prices` is a PriceMatrix or long-format rows;
+        pass filled prices (e.g. from fill_missing_prices).
+        """
+        if not isinstance(prices, PriceMatrix):
+            prices = PriceMatrix.from_frame(prices)
+        if not len(prices.dates):
+            return self._empty_stats()
+        if self.last_date is not None and prices.dates[0] <= self.last_date:
+            raise ValueError(f"Rows up to {self.last_date.date()} were already processed; "
+                             "build a new engine to revise past prices")
+
+        calendar, new = self._daily_matrices(prices)
+        kept = 0
+        if self.history is not None:
+            # Provinces first seen today get empty history columns
+            previous = self.history['provinces']
+            columns = previous.get_indexer(self.provinces)
+            for name in ('sums', 'squares', 'counts', 'carried'):
+                old = np.full((len(self.history['dates']), len(self.provinces)), np.nan if name == 'carried' else 0.0)
+                old[:, columns >= 0] = self.history[name][:, columns[columns >= 0]]
+                new[name] = old if name == 'carried' else np.concatenate([old, new[name]])
+            new['national'] = self.history['national']
+            new['national_carried'] = self.history['national_carried']
+            kept = len(self.history['dates'])
+            calendar = self.history['dates'].append(calendar)
+
+        stats, carried, national_carried = self._statistics(calendar, new, kept)
+
+        keep = max(self.windows)
+        self.history = {name: new[name][-keep:] for name in ('sums', 'squares', 'counts')}
+        self.history['national'] = np.concatenate([new.get('national', np.empty(0)),
+                                                   stats.national['Average_Price'].to_numpy()])[-keep:]
+        self.history['carried'] = carried[-keep:]
+        self.history['national_carried'] = national_carried[-keep:]
+        self.history['dates'] = calendar[-keep:]
+        self.history['provinces'] = self.provinces
+        self.last_date = calendar[-1]
+        return stats
+
+    def _statistics(self, calendar, matrices, first):
+        """
+        Rolling statistics of the rows first.. of the block `calendar`, plus the carried-forward
+        provincial and national prices of the whole block (the earlier rows come from the history)
+        """
+        sums, squares, counts = matrices['sums'], matrices['squares'], matrices['counts']
+        reference = self.reference.reindex(self.provinces).to_numpy(dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            prices = sums / counts + reference
+        if first:
+            prices[:first] = matrices['carried']
+        carried = _carry_forward(prices)
+
+        # Daily national average of every price observed that day
+        national_sums = (sums + counts * reference).sum(axis=1)
+        national_counts = counts.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            new_national = national_sums[first:] / national_counts[first:]
+        national_prices = np.concatenate([matrices.get('national', np.empty(0)), new_national])
+        national_valid = ~np.isnan(national_prices)
+        national_carried = _carry_forward(np.concatenate([matrices.get('national_carried', np.empty(0)),
+                                                          new_national]))
+
+        cumulative_sums, cumulative_squares = _cumulative(sums), _cumulative(squares)
+        cumulative_counts = _cumulative(counts)
+        cumulative_national = _cumulative(np.where(national_valid, national_prices, 0))
+        cumulative_national_days = _cumulative(national_valid.astype(np.float64))
+
+        dates = calendar[first:]
+        provincial = {}
+        national = pd.DataFrame({'Average_Price': new_national}, index=dates)
+        for window in self.windows:
+            mean_column, volatility_column, return_column = _window_columns(window)
+            n = _trailing_totals(cumulative_counts, first, window)
+            total = _trailing_totals(cumulative_sums, first, window)
+            total_squares = _trailing_totals(cumulative_squares, first, window)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                mean = total / n
+                variance = (total_squares - total * mean) / (n - 1)
+            variance = np.where(n > 1, np.clip(variance, 0, None), np.nan)
+
+            provincial[mean_column] = pd.DataFrame(mean + reference, index=dates, columns=self.provinces)
+            provincial[volatility_column] = pd.DataFrame(np.sqrt(variance), index=dates, columns=self.provinces)
+            provincial[return_column] = pd.DataFrame(_lagged_return(carried, first, window),
+                                                     index=dates, columns=self.provinces)
+
+            days = _trailing_totals(cumulative_national_days, first, window)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                national[mean_column] = _trailing_totals(cumulative_national, first, window) / days
+            national[return_column] = _lagged_return(national_carried, first, window)
+        return RollingPriceStats(provincial, national), carried, national_carried
+
+    def _empty_stats(self):
+        dates = pd.DatetimeIndex([], name='Date')
+        provincial, national = {}, pd.DataFrame({'Average_Price': []}, index=dates)
+        for window in self.windows:
+            mean_column, volatility_column, return_column = _window_columns(window)
+            for column in (mean_column, volatility_column, return_column):
+                provincial[column] = pd.DataFrame(index=dates, columns=self.provinces, dtype=np.float64)
+            national[mean_column] = np.empty(0)
+            national[return_column] = np.empty(0)
+        return RollingPriceStats(provincial, national)
+
+    @classmethod
+    def load(cls, state_path, windows=DEFAULT_WINDOWS):
+        """Load a saved engine, or start an empty one if there is none yet"""
+        if os.path.exists(state_path):
+            return pd.read_pickle(state_path)
+        return cls(windows)
+
+    def save(self, state_path):
+        """Atomically write the engine state (a few windows of days, not the full history)"""
+        directory = os.path.dirname(os.path.abspath(state_path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = state_path + '.tmp'
+        pd.to_pickle(self, temp_path)
+        os.replace(temp_path, state_path)
+
+
+def rolling_price_statistics(prices, windows=DEFAULT_WINDOWS):
+    """Rolling statistics of every province and of the national average over a whole frame or PriceMatrix"""
+    return RollingPriceEngine(windows).update(prices)
@@ -0,0 +1,236 @@
+"""
+Mergeable Streaming Sketches
+============================
+
+Approximate per-group quantiles and distinct counts that are built in one
+pass, chunk by chunk, and merged across chunks or worker processes without
+revisiting any rows. Both sketches are updated with whole columns at once
+(no per-row Python) and are plain picklable objects.
+
+QuantileSketch (log-bucket quantile sketch, as in DDSketch)
+    Every value is counted in a bucket whose bounds grow geometrically by
+    gamma = (1 + a) / (1 - a), where a is the relative accuracy. Merging
+    adds bucket counts, so it is exact: merged sketches equal a sketch of
+    the combined data, in any order. Coarser groupings are answered by
+    summing the buckets of finer groups.
+
+    Error bound: a returned q-quantile x' is within a relative error a of
+    the true q-quantile x (lower-rank definition, as
+    numpy.quantile(method='lower')): |x' - x| <= a * |x|. This holds for
+    every quantile and every data distribution. Memory per group is the
+    number of occupied buckets, about ln(max/min) / (2a) in the worst case
+    (roughly 350 buckets for a 1 % sketch of values between 0.1 and 1000).
+
+DistinctCountSketch (HyperLogLog)
+    Each value is hashed to 64 bits; the first p bits select one of m = 2^p
+    registers, which keeps the longest run of leading zeros seen in the
+    remaining bits. Merging takes the register-wise maximum.
+
+    Error bound: relative standard error 1.04 / sqrt(m) (1.6 % for the
+    default p = 12), so about 95 % of estimates are within 3.3 %. Small
+    counts use linear counting and are close to exact. Memory is m bytes
+    per group (4 KB by default).
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+DEFAULT_PRECISION = 12
+
+# Bucket codes: 0 is exact zero, positive values map to POSITIVE + k and
+# negative values to -(POSITIVE + k), so codes sort in value order
+_BUCKET_OFFSET = 2 ** 32
+
+
+def _as_tuple(keys):
+    if keys is None:
+        return ()
+    if isinstance(keys, str):
+        return (keys,)
+    return tuple(keys)
+
+
+def quantile_label(q):
+    """Column name for a quantile, e.g. 0.9 -> 'p90'"""
+    return f"p{q * 100:g}"
+
+
+class QuantileSketch:
+    """Per-group mergeable quantile sketch with a guaranteed relative accuracy"""
+
+    def __init__(self, keys=(), relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.keys = _as_tuple(keys)
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+        # Count per (keys..., bucket); None until the first update
+        self.counts = None
+
+    def _bucket_codes(self, values):
+        magnitude = np.abs(values)
+        with np.errstate(divide='ignore'):
+            k = np.ceil(np.log(magnitude) / self._log_gamma)
+        k = np.where(magnitude > 0, k, 0).astype(np.int64) + 2 * _BUCKET_OFFSET
+        return np.where(values > 0, k, np.where(values < 0, -k, 0))
+
+    def _bucket_values(self, codes):
+        k = np.abs(codes) - 2 * _BUCKET_OFFSET
+        # Midpoint (in relative terms) of the bucket (gamma^(k-1), gamma^k]
+        values = 2 * np.power(self.gamma, k.astype(np.float64)) / (self.gamma + 1)
+        return np.where(codes > 0, values, np.where(codes < 0, -values, 0.0))
+
+    def update(self, df, value_column):
+        """Add the non-missing values of `value_column`, grouped by the sketch keys"""
+        values = pd.to_numeric(df[value_column], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~np.isnan(values)
+        frame = df.loc[valid, list(self.keys)].copy() if self.keys else pd.DataFrame(index=df.index[valid])
+        frame['bucket'] = self._bucket_codes(values[valid])
+        counts = frame.groupby(list(self.keys) + ['bucket'], observed=True).size()
+        return self._add_counts(counts)
+
+    def _add_counts(self, counts):
+        if len(counts):
+            self.counts = counts if self.counts is None else self.counts.add(counts, fill_value=0).astype(np.int64)
+        return self
+
+    def merge(self, other):
+        """Fold another sketch with the same keys and accuracy into this one (exact)"""
+        if other.keys != self.keys or other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Only sketches with the same keys and relative accuracy can be merged")
+        if other.counts is not None:
+            self._add_counts(other.counts)
+        return self
+
+    def count(self, by=None):
+        """Number of values counted per group"""
+        by = self.keys if by is None else _as_tuple(by)
+        if self.counts is None:
+            return pd.Series(dtype=np.int64)
+        if not by:
+            return pd.Series([int(self.counts.sum())], index=['all'])
+        return self.counts.groupby(level=list(by), observed=True).sum()
+
+    def quantiles(self, quantiles=DEFAULT_QUANTILES, by=None):
+        """
+        Approximate quantiles per group of `by` (default: the sketch keys; any
+        subset of them rolls the finer groups up). Returns a frame with one
+        column per quantile ('p50', 'p90', ...).
+        """
+        by = self.keys if by is None else _as_tuple(by)
+        unknown = [key for key in by if key not in self.keys]
+        if unknown:
+            raise KeyError(f"{unknown} are not keys of this sketch {self.keys}")
+        labels = [quantile_label(q) for q in quantiles]
+        if self.counts is None:
+            return pd.DataFrame(columns=labels)
+
+        counts = self.counts.groupby(level=list(by) + ['bucket'], observed=True).sum().sort_index()
+        n = counts.to_numpy()
+        cumulative = np.cumsum(n)
+        if by:
+            # Rows are sorted by group, so every group is one contiguous run
+            group_index = counts.index.droplevel('bucket')
+            group_codes = pd.factorize(group_index)[0]
+            starts = np.flatnonzero(np.r_[True, group_codes[1:] != group_codes[:-1]])
+            groups = group_index[starts]
+        else:
+            groups, starts = pd.Index(['all']), np.array([0])
+        before = np.r_[0, cumulative[starts[1:] - 1]]
+        totals = np.r_[cumulative[starts[1:] - 1], cumulative[-1]] - before
+
+        bucket_values = self._bucket_values(counts.index.get_level_values('bucket').to_numpy())
+        result = {}
+        for q, label in zip(quantiles, labels):
+            rank = np.floor(q * (totals - 1))
+            # First bucket whose running count passes the rank
+            position = np.searchsorted(cumulative, before + rank, side='right')
+            result[label] = bucket_values[position]
+        return pd.DataFrame(result, index=groups)
+
+
+class DistinctCountSketch:
+    """Per-group HyperLogLog distinct-value counter"""
+
+    def __init__(self, keys=(), precision=DEFAULT_PRECISION):
+        # p >= 11 keeps the hash tail below 2^53, where float conversion is exact
+        if not 11 <= precision <= 18:
+            raise ValueError("precision must be between 11 and 18")
+        self.keys = _as_tuple(keys)
+        self.precision = precision
+        self.m = 1 << precision
+        self.groups = None
+        self.registers = np.zeros((0, self.m), dtype=np.uint8)
+
+    def _group_index(self, df):
+        if not self.keys:
+            return pd.Index(['all'] * len(df))
+        if len(self.keys) == 1:
+            return pd.Index(df[self.keys[0]], name=self.keys[0])
+        return pd.MultiIndex.from_frame(df[list(self.keys)])
+
+    def _register_groups(self, groups):
+        """Row of the register matrix for every group label, adding rows for new groups"""
+        if self.groups is None:
+            self.groups = groups.unique()
+            self.registers = np.zeros((len(self.groups), self.m), dtype=np.uint8)
+        else:
+            new = groups.unique().difference(self.groups, sort=False)
+            if len(new):
+                self.groups = self.groups.append(new)
+                self.registers = np.vstack([self.registers, np.zeros((len(new), self.m), dtype=np.uint8)])
+        return self.groups.get_indexer(groups)
+
+    def update(self, df, value_columns):
+        """Add the distinct (combinations of) `value_columns` of every row, per group"""
+        columns = [value_columns] if isinstance(value_columns, str) else list(value_columns)
+        values = df[columns]
+        present = values.notna().all(axis=1).to_numpy()
+        if self.keys:
+            present = present & df[list(self.keys)].notna().all(axis=1).to_numpy()
+        if not present.any():
+            return self
+        hashes = pd.util.hash_pandas_object(values[present], index=False).to_numpy(dtype=np.uint64)
+        rows = self._register_groups(self._group_index(df[present]))
+
+        tail_bits = 64 - self.precision
+        register = (hashes >> np.uint64(tail_bits)).astype(np.int64)
+        tail = hashes & np.uint64((1 << tail_bits) - 1)
+        # Position of the first 1-bit in the tail (tail < 2^53, so the float conversion is exact)
+        rank = (tail_bits - np.frexp(tail.astype(np.float64))[1] + 1).astype(np.uint8)
+
+        cells = rows.astype(np.int64) * self.m + register
+        order = np.argsort(cells, kind='stable')
+        unique_cells, starts = np.unique(cells[order], return_index=True)
+        best = np.maximum.reduceat(rank[order], starts)
+        flat = self.registers.reshape(-1)
+        flat[unique_cells] = np.maximum(flat[unique_cells], best)
+        return self
+
+    def merge(self, other):
+        """Fold another sketch with the same keys and precision into this one"""
+        if other.keys != self.keys or other.precision != self.precision:
+            raise ValueError("Only sketches with the same keys and precision can be merged")
+        if other.groups is None:
+            return self
+        rows = self._register_groups(other.groups)
+        self.registers[rows] = np.maximum(self.registers[rows], other.registers)
+        return self
+
+    def estimate(self):
+        """Estimated number of distinct values per group"""
+        if self.groups is None:
+            return pd.Series(dtype=np.float64)
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        harmonic = np.power(2.0, -self.registers.astype(np.float64)).sum(axis=1)
+        raw = alpha * m * m / harmonic
+        zeros = (self.registers == 0).sum(axis=1)
+        # Linear counting is more accurate while many registers are still empty
+        with np.errstate(divide='ignore'):
+            linear = m * np.log(m / np.maximum(zeros, 1))
+        estimate = np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+        return pd.Series(estimate, index=self.groups).sort_index()
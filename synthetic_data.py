@@ -0,0 +1,194 @@
+"""
+Synthetic Dataset Generator
+===========================
+
+Seeded generators for datasets with exactly the same columns as
+jakarta_traffic_data.csv, indonesia_rice_prices.csv and jakarta_aqi_data.csv,
+from 10^4 up to 10^8 rows.
+
+Data is produced in chunks, so even the largest sizes are written to CSV
+with bounded memory, and the same (kind, n_rows, seed, chunk size) always
+produces the same file. The values follow the patterns of the course data: rush-hour
+peaks, rain and weekend effects on traffic, per-province random-walk rice
+prices with occasional missing values, and seasonal pollution levels.
+
+Usage:
+    python synthetic_data.py traffic 1000000 --output traffic_1m.csv
+"""
+
+import argparse
+import math
+
+import numpy as np
+import pandas as pd
+
+from data_schemas import ROAD_TYPES, WEATHER_CONDITIONS
+
+START_DATE = pd.Timestamp('2024-01-01')
+
+# Dates wrap after ~200 years so every size stays inside pandas' Timestamp range
+MAX_DAYS = 365 * 200
+
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+TRAFFIC_LOCATIONS = ['Thamrin-Sudirman', 'Gatot_Subroto', 'Kuningan_Area', 'Senayan_Circle']
+WEATHER_PROBABILITIES = [0.5, 0.3, 0.2]
+RICE_PROVINCES = ['DKI Jakarta', 'West Java', 'Central Java', 'North Sumatra', 'South Sulawesi', 'Papua']
+
+# Share of values blanked out in columns that have missing values in the real data
+MISSING_RATE = 0.001
+
+# Relative traffic volume by hour of day (peaks at 8:00 and 18:00)
+HOUR_PROFILE = np.array([
+    0.15, 0.10, 0.08, 0.08, 0.12, 0.30, 0.60, 1.10, 1.30, 1.10, 0.80, 0.75,
+    0.80, 0.78, 0.75, 0.85, 1.10, 1.25, 1.35, 1.15, 0.80, 0.55, 0.40, 0.25,
+])
+
+
+def _rng(seed, chunk_index):
+    """Independent, reproducible random stream for every chunk"""
+    return np.random.default_rng([seed, chunk_index])
+
+
+def _blank(rng, values, rate=MISSING_RATE):
+    """Replace a random share of values with missing values"""
+    values = pd.Series(values)
+    return values.mask(rng.random(len(values)) < rate)
+
+
+def _names(known, count, prefix):
+    """The real names first, then generated ones when more are needed"""
+    return known[:count] + [f"{prefix}_{i:04d}" for i in range(len(known), count)]
+
+
+def _chunk_bounds(n_rows, chunk_rows):
+    for index, start in enumerate(range(0, n_rows, chunk_rows)):
+        yield index, start, min(start + chunk_rows, n_rows)
+
+
+def _traffic_locations(n_rows, n_locations):
+    return max(n_locations, math.ceil(n_rows / (24 * MAX_DAYS)))
+
+
+def traffic_days(n_rows, n_locations=50):
+    """Number of days the traffic dataset of n_rows spans (e.g. the AQI rows that cover it)"""
+    return min(MAX_DAYS, math.ceil(n_rows / (_traffic_locations(n_rows, n_locations) * 24)))
+
+
+def iter_traffic_chunks(n_rows, seed=0, chunk_rows=DEFAULT_CHUNK_ROWS, n_locations=50):
+    """Yield traffic DataFrames (date-major, then hour, then location) totalling n_rows"""
+    n_locations = _traffic_locations(n_rows, n_locations)
+    locations = np.array(_names(TRAFFIC_LOCATIONS, n_locations, 'Sensor'), dtype=object)
+    setup = np.random.default_rng([seed, 7])
+    base_volume = setup.uniform(300, 1800, n_locations)
+    road_of_location = np.array(ROAD_TYPES, dtype=object)[np.arange(n_locations) % len(ROAD_TYPES)]
+
+    # One weather draw per day, shared by every location and hour
+    n_days = traffic_days(n_rows, n_locations)
+    weather_by_day = setup.choice(len(WEATHER_CONDITIONS), max(n_days, 1), p=WEATHER_PROBABILITIES)
+
+    for index, start, stop in _chunk_bounds(n_rows, chunk_rows):
+        rng = _rng(seed, index)
+        row = np.arange(start, stop)
+        location = row % n_locations
+        hour = (row // n_locations) % 24
+        day = (row // (n_locations * 24)) % MAX_DAYS
+        dates = START_DATE + pd.to_timedelta(day, unit='D')
+        weekend = dates.dayofweek >= 5
+        weather = weather_by_day[day]
+        rainy = weather == WEATHER_CONDITIONS.index('Rainy')
+
+        volume = base_volume[location] * HOUR_PROFILE[hour]
+        volume *= np.where(weekend, 0.68, 1.0) * np.where(rainy, 1.05, 1.0)
+        volume *= rng.normal(1.0, 0.08, len(row))
+        speed = 60.0 / (1.0 + volume / 350.0) * np.where(rainy, 0.8, 1.0) * rng.normal(1.0, 0.05, len(row))
+
+        yield pd.DataFrame({
+            'Date': dates.strftime('%Y-%m-%d'),
+            'Location': locations[location],
+            'Hour': hour,
+            'Vehicle_Count': _blank(rng, np.maximum(np.round(volume), 0)).astype('Int64'),
+            'Average_Speed_kmh': _blank(rng, np.round(np.clip(speed, 3, 120), 1)),
+            'Weather_Condition': _blank(rng, np.array(WEATHER_CONDITIONS, dtype=object)[weather]),
+            'Is_Weekend': _blank(rng, weekend),
+            'Road_Type': road_of_location[location],
+        })
+
+
+def iter_rice_chunks(n_rows, seed=0, chunk_rows=DEFAULT_CHUNK_ROWS, n_provinces=34):
+    """Yield rice price DataFrames (one row per date and province) totalling n_rows"""
+    n_provinces = max(n_provinces, math.ceil(n_rows / MAX_DAYS))
+    provinces = np.array(_names(RICE_PROVINCES, n_provinces, 'Regency'), dtype=object)
+    setup = np.random.default_rng([seed, 11])
+    level = np.log(setup.uniform(12_500, 19_500, n_provinces))
+    volatility = setup.uniform(0.002, 0.012, n_provinces)
+
+    # Whole days per chunk so every province advances its random walk together
+    days_per_chunk = max(1, chunk_rows // n_provinces)
+    n_days = math.ceil(n_rows / n_provinces)
+    for index, first_day in enumerate(range(0, n_days, days_per_chunk)):
+        rng = _rng(seed, index)
+        days = np.arange(first_day, min(first_day + days_per_chunk, n_days))
+        steps = rng.normal(0.0, 1.0, (len(days), n_provinces)) * volatility
+        walk = level + np.cumsum(steps, axis=0)
+        level = walk[-1]
+
+        prices = np.round(np.exp(walk) / 50) * 50
+        frame = pd.DataFrame({
+            'Date': np.repeat((START_DATE + pd.to_timedelta(days % MAX_DAYS, unit='D')).strftime('%Y-%m-%d'),
+                              n_provinces),
+            'Province': np.tile(provinces, len(days)),
+            'Price_per_Kg': _blank(rng, prices.ravel(), rate=0.01),
+        })
+        remaining = n_rows - first_day * n_provinces
+        yield frame.iloc[:remaining]
+
+
+def iter_aqi_chunks(n_rows, seed=0, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yield daily air quality DataFrames totalling n_rows (dates wrap after MAX_DAYS)"""
+    for index, start, stop in _chunk_bounds(n_rows, chunk_rows):
+        rng = _rng(seed, index)
+        day = np.arange(start, stop) % MAX_DAYS
+        season = np.sin(2 * np.pi * day / 365.25)
+        pm25 = 55 + 15 * season + rng.normal(0, 8, len(day))
+        yield pd.DataFrame({
+            'Date': (START_DATE + pd.to_timedelta(day, unit='D')).strftime('%Y-%m-%d'),
+            'PM2.5': _blank(rng, np.round(np.clip(pm25, 5, None), 1)),
+            'O3': np.round(np.clip(45 - 10 * season + rng.normal(0, 6, len(day)), 2, None), 1),
+            'CO': np.round(np.clip(1.0 + 0.3 * season + rng.normal(0, 0.2, len(day)), 0.1, None), 1),
+        })
+
+
+GENERATORS = {
+    'traffic': iter_traffic_chunks,
+    'rice': iter_rice_chunks,
+    'aqi': iter_aqi_chunks,
+}
+
+
+def generate(kind, n_rows, seed=0, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Return a whole synthetic dataset as one DataFrame"""
+    chunks = list(GENERATORS[kind](n_rows, seed=seed, chunk_rows=chunk_rows))
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+
+def write_csv(kind, path, n_rows, seed=0, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Write a synthetic dataset to CSV chunk by chunk (bounded memory)"""
+    header = True
+    with open(path, 'w', newline='') as handle:
+        for chunk in GENERATORS[kind](n_rows, seed=seed, chunk_rows=chunk_rows):
+            chunk.to_csv(handle, index=False, header=header)
+            header = False
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic course datasets")
+    parser.add_argument('kind', choices=sorted(GENERATORS))
+    parser.add_argument('rows', type=int)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help="CSV path (default: synthetic_<kind>_<rows>.csv)")
+    args = parser.parse_args()
+    output = args.output or f"synthetic_{args.kind}_{args.rows}.csv"
+    write_csv(args.kind, output, args.rows, seed=args.seed)
+    print(f"✓ Wrote {args.rows:,} synthetic {args.kind} rows to {output}")
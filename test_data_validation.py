@@ -0,0 +1,44 @@
+"""
+Checks of the data-quality rules on small hand-made frames
+"""
+
+import numpy as np
+import pandas as pd
+
+from data_validation import RICE_RULES, SpikeRule, validate
+
+
+def rice_prices(prices, provinces=None):
+    return pd.DataFrame({
+        'Date': pd.date_range('2025-01-01', periods=len(prices)),
+        'Province': provinces or ['West Java'] * len(prices),
+        'Price_per_Kg': prices,
+    })
+
+
+def spikes(prices, provinces=None):
+    return SpikeRule('Price_per_Kg', by='Province').violations(rice_prices(prices, provinces)).tolist()
+
+
+def test_one_outlier_between_two_normal_readings_is_the_only_spike():
+    assert spikes([14000, 14100, 140000, 14050, 14000]) == [False, False, True, False, False]
+
+
+def test_spike_at_the_start_or_end_of_a_group():
+    assert spikes([140000, 14100, 14000]) == [True, False, False]
+    assert spikes([14000, 14100, 14000, 140000]) == [False, False, False, True]
+
+
+def test_lasting_change_of_level_is_not_a_spike():
+    assert spikes([14000, 14100, 28000, 28100, 28000]) == [False] * 5
+
+
+def test_missing_prices_are_skipped_and_groups_are_separate():
+    assert spikes([14000, np.nan, 140000, np.nan, 14050]) == [False, False, True, False, False]
+    assert spikes([14000, 140000, 14000, 140000], ['A', 'A', 'B', 'B']) == [False] * 4
+
+
+def test_validate_quarantines_only_the_spike():
+    result = validate(rice_prices([14000, 14100, 140000, 14050, 14000]), RICE_RULES)
+    assert result.quarantine['Price_per_Kg'].tolist() == [140000]
+    assert len(result.valid) == 4
@@ -0,0 +1,33 @@
+"""
+The memory report's starting point: plain_read_usage() against a real plain pd.read_csv
+"""
+
+import pandas as pd
+import pytest
+
+import memory_optimizer
+from csv_loader import load_csv
+from data_schemas import RICE_SCHEMA, TRAFFIC_SCHEMA
+from memory_optimizer import optimize_memory, plain_read_usage
+from traffic_analysis import DATA_FILE
+
+RICE_FILE = 'indonesia_rice_prices.csv'
+
+
+@pytest.mark.parametrize('max_measured', [memory_optimizer.MAX_MEASURED_VALUES, 0])
+@pytest.mark.parametrize('file_path, schema', [(DATA_FILE, TRAFFIC_SCHEMA), (RICE_FILE, RICE_SCHEMA)])
+def test_plain_read_usage_matches_read_csv(monkeypatch, file_path, schema, max_measured):
+    # max_measured=0 builds every text column instead of measuring each distinct value
+    monkeypatch.setattr(memory_optimizer, 'MAX_MEASURED_VALUES', max_measured)
+    plain = pd.read_csv(file_path)
+    usage = plain_read_usage(load_csv(file_path, schema))
+    assert usage['bytes'].to_dict() == plain.memory_usage(deep=True, index=False).to_dict()
+    assert usage['dtype'].to_dict() == plain.dtypes.astype(str).to_dict()
+
+
+def test_report_starts_from_the_plain_read():
+    df = load_csv(DATA_FILE, TRAFFIC_SCHEMA)
+    before = plain_read_usage(df)
+    _, report = optimize_memory(df, TRAFFIC_SCHEMA, before=before)
+    assert report['before_bytes'].to_dict() == before['bytes'].to_dict()
+    assert report['before_bytes'].sum() > 2 * report['after_bytes'].sum()
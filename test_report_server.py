@@ -0,0 +1,107 @@
+"""
+The report server on a free port, queried over HTTP with fetch_json
+"""
+
+import asyncio
+import threading
+from urllib.parse import quote
+
+import pytest
+
+from report_server import TRAFFIC_STEPS, ReportServer, _json_safe, fetch_json
+from traffic_analysis import DATA_FILE, analyze_traffic, load_traffic
+
+
+def serve(scenario):
+    """Start a server on port 0, run scenario(server, get) and close it; returns the scenario's result"""
+
+    async def run():
+        server = await ReportServer(port=0, workers=2).start()
+
+        def get(path):
+            return fetch_json(server.host, server.port, path)
+
+        try:
+            return await scenario(server, get)
+        finally:
+            await server.close()
+
+    return asyncio.run(run())
+
+
+@pytest.fixture(scope='module')
+def report():
+    return analyze_traffic(load_traffic(DATA_FILE))
+
+
+@pytest.mark.parametrize('name', sorted(TRAFFIC_STEPS))
+def test_traffic_step_matches_analyze_traffic(report, name):
+    async def scenario(server, get):
+        return await get(f'/traffic/{name}')
+
+    status, body = serve(scenario)
+    assert status == 200
+    assert body == _json_safe(getattr(report, TRAFFIC_STEPS[name]).to_dict())
+
+
+@pytest.mark.parametrize('path, message', [
+    ('/traffic/query?agg=median', "agg must be one of"),
+    ('/rice/volatile?top=five', "top must be an integer"),
+    ('/rice/expensive?top=0', "top must be at least 1"),
+    ('/traffic/query?Weather=Rainy', "Unknown filter column 'Weather'"),
+])
+def test_bad_parameters_are_400(path, message):
+    async def scenario(server, get):
+        return await get(path)
+
+    status, body = serve(scenario)
+    assert status == 400
+    assert message in body['error']
+
+
+def test_concurrent_identical_queries_are_coalesced():
+    path = '/traffic/query?by=Location&Time_Period=' + quote('Evening Rush')
+
+    async def scenario(server, get):
+        # The first query blocks in the worker pool until both requests have been dispatched
+        release, dispatched = threading.Event(), []
+        query, dispatch = server.query_engine.query, server.dispatch
+
+        def blocked_query(*args, **kwargs):
+            release.wait(timeout=10)
+            return query(*args, **kwargs)
+
+        async def counted_dispatch(method, target):
+            dispatched.append(target)
+            return await dispatch(method, target)
+
+        server.query_engine.query, server.dispatch = blocked_query, counted_dispatch
+        requests = asyncio.gather(get(path), get(path))
+        while len(dispatched) < 2:
+            await asyncio.sleep(0.01)
+        release.set()
+        responses = await requests
+        return responses, (await get('/stats'))[1]
+
+    (first, second), stats = serve(scenario)
+    assert first == second
+    assert first[0] == 200 and len(first[1]['rows']) == 4
+    assert stats['routes']['/traffic/query']['requests'] == 2
+    assert stats['routes']['/traffic/query']['coalesced'] == 1
+
+
+def test_stats_report_latency_percentiles():
+    async def scenario(server, get):
+        for _ in range(5):
+            await get('/health')
+        await get('/traffic/query?agg=median')
+        return await get('/stats')
+
+    status, stats = serve(scenario)
+    assert status == 200
+    health = stats['routes']['/health']
+    assert health['requests'] == 5 and health['errors'] == 0
+    assert 0 < health['p50_ms'] <= health['p90_ms'] <= health['p99_ms'] <= health['max_ms']
+    assert stats['routes']['/traffic/query']['errors'] == 1
+    assert stats['overall']['requests'] == 6
+    assert stats['overall']['p99_ms'] is not None
@@ -0,0 +1,37 @@
+"""
+A saved price matrix, memory-mapped back, against the long-format rice statistics
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from csv_loader import load_csv
+from data_schemas import RICE_SCHEMA
+from rice_matrix import PriceMatrix
+from rice_statistics import fill_missing_prices, national_average_daily, provincial_statistics
+
+RICE_FILE = 'indonesia_rice_prices.csv'
+
+
+@pytest.fixture(scope='module')
+def rows():
+    df = load_csv(RICE_FILE, RICE_SCHEMA)
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df
+
+
+@pytest.mark.parametrize('strategies', [('ffill', 'bfill'), ('interpolate', 'ffill')])
+def test_memory_mapped_matrix_matches_the_long_format(rows, tmp_path, strategies):
+    prices, matrix_report = PriceMatrix.from_frame(rows).fill_missing_prices(strategies)
+    df, report = fill_missing_prices(rows.copy(), strategies)
+    assert matrix_report == report
+
+    prices.save(str(tmp_path))
+    opened = PriceMatrix.open(str(tmp_path))
+    assert isinstance(opened.values, np.memmap)
+
+    pd.testing.assert_series_equal(opened.national_average_daily(), national_average_daily(df),
+                                   check_index_type=False, check_freq=False)
+    pd.testing.assert_frame_equal(opened.provincial_statistics(), provincial_statistics(df),
+                                  check_index_type=False, check_categorical=False)
@@ -0,0 +1,71 @@
+"""
+The as-of join and lagged correlations on small synthetic traffic and AQI frames that overlap in time
+"""
+
+import numpy as np
+import pandas as pd
+
+from traffic_air_quality import POLLUTANTS, asof_positions, lagged_correlations, strongest_lags
+
+DAYS = pd.date_range('2025-03-01', periods=40)
+
+
+def daily_traffic(seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Date': DAYS,
+        'Location': 'Kuningan_Area',
+        'Road_Type': 'Main_Road',
+        'Vehicle_Count': rng.uniform(800, 2000, len(DAYS)),
+        'Average_Speed_kmh': rng.uniform(10, 40, len(DAYS)),
+    })
+
+
+def air_quality(daily, lag=2):
+    """PM2.5 follows Vehicle_Count `lag` days later exactly (0.02 per vehicle); O3 and CO are noise"""
+    rng = np.random.default_rng(1)
+    dates = pd.date_range(DAYS[0], DAYS[-1] + pd.Timedelta(days=lag))
+    pm25 = np.full(len(dates), np.nan)
+    pm25[lag:] = 10 + 0.02 * daily['Vehicle_Count'].to_numpy()
+    return pd.DataFrame({'Date': dates, 'PM2.5': pm25, 'O3': rng.uniform(20, 60, len(dates)),
+                         'CO': rng.uniform(0.5, 1.5, len(dates))})
+
+
+def cell(correlations, pollutant, lag, metric='Vehicle_Count'):
+    """Days, Correlation and Slope of one metric, pollutant and lag (single group)"""
+    return correlations.xs((metric, pollutant, lag), level=['Traffic_Metric', 'Pollutant', 'Lag_Days']).iloc[0]
+
+
+def test_asof_positions_match_the_latest_reading_within_the_tolerance():
+    reference = pd.to_datetime(['2025-03-01', '2025-03-03', '2025-03-06'])
+    dates = pd.date_range('2025-02-28', '2025-03-07')
+    assert asof_positions(dates, reference).tolist() == [-1, 0, -1, 1, -1, -1, 2, -1]
+    assert asof_positions(dates, reference, tolerance_days=1).tolist() == [-1, 0, 0, 1, 1, -1, 2, 2]
+    assert asof_positions(dates, reference, tolerance_days=2).tolist() == [-1, 0, 0, 1, 1, 1, 2, 2]
+
+
+def test_known_lag_is_the_strongest_correlation():
+    daily = daily_traffic()
+    correlations = lagged_correlations(daily, air_quality(daily, lag=2), max_lag=3)
+    lag2 = cell(correlations, 'PM2.5', 2)
+    assert lag2['Days'] == len(DAYS)
+    assert np.isclose(lag2['Correlation'], 1.0) and np.isclose(lag2['Slope'], 0.02)
+    # At lag 0 the first two days meet missing PM2.5 readings; at lag 3 the last day has no reading
+    assert cell(correlations, 'PM2.5', 0)['Days'] == len(DAYS) - 2
+    assert cell(correlations, 'PM2.5', 3)['Days'] == len(DAYS) - 1
+    best = strongest_lags(correlations).xs(('Vehicle_Count', 'PM2.5'), level=['Traffic_Metric', 'Pollutant'])
+    assert best['Lag_Days'].tolist() == [2]
+
+
+def test_tolerance_fills_days_without_a_reading():
+    daily = daily_traffic()
+    # Readings on every other day only
+    aqi = air_quality(daily, lag=0).iloc[::2].reset_index(drop=True)
+    exact = lagged_correlations(daily, aqi, max_lag=0)
+    tolerant = lagged_correlations(daily, aqi, max_lag=0, tolerance_days=1)
+    for pollutant in POLLUTANTS:
+        assert cell(exact, pollutant, 0)['Days'] == len(DAYS) // 2
+        assert cell(tolerant, pollutant, 0)['Days'] == len(DAYS)
+    # Only the days with their own reading follow it exactly; the others get the previous day's
+    assert np.isclose(cell(exact, 'PM2.5', 0)['Correlation'], 1.0)
+    assert cell(tolerant, 'PM2.5', 0)['Correlation'] < 0.99
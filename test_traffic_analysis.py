@@ -0,0 +1,100 @@
+"""
+Regression runs of the traffic report (filtered subsets, every load mode) and its exact sums
+"""
+
+import math
+
+import numpy as np
+
+import lazy_plan
+import traffic_analysis
+from csv_loader import load_csv
+from fused_groupby import exact_group_sums
+from jakarta_traffic_analysis_solution import main
+from traffic_aggregates import METRICS
+from traffic_analysis import DATA_FILE, analyze_traffic, clean_traffic, load_traffic
+
+
+def test_weekday_only_range_has_no_weekend_comparison():
+    report = analyze_traffic(load_traffic(DATA_FILE, date_range=('2024-01-03', '2024-01-05')))
+    assert report.patterns.weekday_vehicles is not None
+    assert report.patterns.weekend_vehicles is None
+    assert report.patterns.vehicle_diff_pct is None
+    assert report.patterns.weekend_effect is False
+
+
+def test_weekend_only_range_has_no_rush_hours():
+    report = analyze_traffic(load_traffic(DATA_FILE, date_range=('2024-01-06', '2024-01-07')))
+    assert report.patterns.weekday_vehicles is None
+    assert report.rush_hour.morning_avg_vehicles is None
+    assert report.rush_hour.worst_evening_day is None
+
+
+def test_report_runs_on_a_weekday_only_range(capsys):
+    assert main(['--from', '2024-01-03', '--to', '2024-01-05']) == 0
+    assert "Weekends: n/a" in capsys.readouterr().out
+
+
+def test_report_runs_on_a_weekend_only_range(capsys):
+    assert main(['--stream', '--from', '2024-01-06', '--to', '2024-01-07']) == 0
+    output = capsys.readouterr().out
+    assert "Weekdays: n/a" in output
+    assert "Morning Rush: n/a" in output
+
+
+def test_group_means_are_not_rounded():
+    data = clean_traffic(load_traffic(DATA_FILE, date_range=('2024-01-05', '2024-01-10'),
+                                      locations=['Kuningan_Area']))
+    expected = data.df.groupby(['Time_Period', 'Day_of_Week'], observed=True)[METRICS].mean()
+    means = data.aggregates.group_means(['Time_Period', 'Day_of_Week'])
+    assert means.loc[('Evening Rush', 'Wednesday'), 'Average_Speed_kmh'] == \
+        expected.loc[('Evening Rush', 'Wednesday'), 'Average_Speed_kmh']
+    assert analyze_traffic(data).rush_hour.worst_evening_speed == 18.5
+
+
+def _section(output, start, end=None):
+    return output[output.index(start):output.index(end) if end else None]
+
+
+def test_lazy_report_matches_the_eager_report(capsys):
+    for options in ([], ['--from', '2024-01-05', '--to', '2024-01-10', '--location', 'Kuningan_Area']):
+        assert main(options) == 0
+        eager = capsys.readouterr().out
+        assert main(options + ['--lazy']) == 0
+        lazy = capsys.readouterr().out
+        # The same preview, dtypes and missing values, and the same STEP 3-7 results
+        assert _section(lazy, "--- First 5 rows", "STEP 2:") == _section(eager, "--- First 5 rows", "STEP 2:")
+        assert _section(lazy, "STEP 3:") == _section(eager, "STEP 3:")
+
+
+def test_lazy_mode_reads_the_csv_once(monkeypatch):
+    expected = analyze_traffic(load_traffic(DATA_FILE, use_cache=False)).to_dict()
+    reads = []
+
+    def counting_load_csv(*args, **kwargs):
+        reads.append(args[0])
+        return load_csv(*args, **kwargs)
+
+    monkeypatch.setattr(lazy_plan, 'load_csv', counting_load_csv)
+    monkeypatch.setattr(lazy_plan, 'iter_csv', None)
+    # The eager loaders must not run at all
+    monkeypatch.setattr(traffic_analysis, 'load_csv_cached', None)
+    monkeypatch.setattr(traffic_analysis, 'load_csv', None)
+    data = load_traffic(DATA_FILE, lazy=True)
+    assert analyze_traffic(data).to_dict() == expected
+    assert reads == [DATA_FILE]
+
+
+def test_chunked_and_parallel_reports_equal_the_in_memory_report():
+    expected = analyze_traffic(load_traffic(DATA_FILE, use_cache=False)).to_dict()
+    for options in ({'stream': True, 'chunksize': 7}, {'stream': True, 'chunksize': 50},
+                    {'workers': 2, 'partition_by': 'Date'}):
+        assert analyze_traffic(load_traffic(DATA_FILE, **options)).to_dict() == expected
+
+
+def test_exact_group_sums_do_not_depend_on_row_order():
+    values = np.array([0.1] * 10 + [1e16, 1.0, -1e16, 2.2, 15.2, 30.25])
+    codes = np.array([0] * 10 + [1] * 6)
+    for order in (np.arange(len(values)), np.arange(len(values))[::-1]):
+        high, low = exact_group_sums(codes[order], values[order], 2)
+        assert list(high + low) == [math.fsum(values[:10]), math.fsum(values[10:])]
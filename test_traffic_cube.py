@@ -0,0 +1,49 @@
+"""
+The traffic cube's roll-ups against a raw groupby, and its save/load round trip
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from traffic_aggregates import METRICS
+from traffic_analysis import DATA_FILE, clean_traffic, load_traffic
+from traffic_cube import TrafficCube
+
+GROUPINGS = [('Location',), ('Time_Period', 'Day_of_Week'), ('Road_Type', 'Is_Weekend', 'Hour')]
+
+
+@pytest.fixture(scope='module')
+def data():
+    return clean_traffic(load_traffic(DATA_FILE))
+
+
+@pytest.mark.parametrize('keys', GROUPINGS)
+def test_group_means_and_stds_match_a_raw_groupby(data, keys):
+    grouped = data.df.groupby(list(keys), observed=True)[METRICS]
+    pd.testing.assert_frame_equal(data.aggregates.group_means(keys), grouped.mean(), check_index_type=False)
+    pd.testing.assert_frame_equal(data.aggregates.group_stds(keys), grouped.std(), check_index_type=False)
+
+
+def test_save_and_load_round_trip_with_downcast_counts(data, tmp_path):
+    cube = data.aggregates
+    path = str(tmp_path / 'cube.pkl')
+    cube.save(path)
+    # Stored with the smallest integer counts, while the cube in memory keeps int64
+    stored = pd.read_pickle(path)
+    assert stored.partials[stored.dimensions]['rows'].dtype == np.int8
+    assert cube.partials[cube.dimensions]['rows'].dtype == np.int64
+
+    loaded = TrafficCube.load(path)
+    counts = [column for column in loaded.partials[loaded.dimensions] if column == 'rows' or
+              column.endswith('_count')]
+    assert all(loaded.partials[loaded.dimensions][column].dtype == np.int64 for column in counts)
+    pd.testing.assert_frame_equal(loaded.partials[loaded.dimensions], cube.partials[cube.dimensions])
+    for keys in GROUPINGS:
+        pd.testing.assert_frame_equal(loaded.group_means(keys), cube.group_means(keys))
+        pd.testing.assert_frame_equal(loaded.group_stds(keys), cube.group_stds(keys))
+
+    # A loaded cube keeps merging like the one it was saved from
+    loaded.merge(TrafficCube().update(data.df))
+    assert loaded.rows == 2 * cube.rows
+    pd.testing.assert_frame_equal(loaded.group_means('Location'), cube.group_means('Location'))
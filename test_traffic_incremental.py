@@ -0,0 +1,69 @@
+"""
+Incremental runs over a growing copy of the bundled traffic CSV, compared with a full recompute
+"""
+
+import os
+
+from traffic_analysis import DATA_FILE, analyze_traffic, load_traffic
+
+
+def _full_report(path):
+    return analyze_traffic(load_traffic(path, use_cache=False)).to_dict()
+
+
+def _incremental(path, tmp_path):
+    data = load_traffic(path, incremental=True, state_path=str(tmp_path / 'state.pkl'))
+    return data, analyze_traffic(data).to_dict()
+
+
+def _source_bytes():
+    with open(DATA_FILE, 'rb') as handle:
+        return handle.read()
+
+
+def test_last_row_without_newline_is_included(tmp_path):
+    path = tmp_path / 'traffic.csv'
+    path.write_bytes(_source_bytes())
+    assert not _source_bytes().endswith(b'\n')
+
+    data, report = _incremental(path, tmp_path)
+    assert data.n_rows == 288 and data.pending_rows == 1
+    assert report == _full_report(path)
+
+    # A re-run without new data ingests nothing and still reports every row
+    data, report = _incremental(path, tmp_path)
+    assert data.new_rows == 0 and data.n_rows == 288
+    assert report == _full_report(path)
+
+
+def test_append_between_runs_equals_full_recompute(tmp_path):
+    source = _source_bytes()
+    path = tmp_path / 'traffic.csv'
+    # Stop the first run in the middle of a row, as if the writer had not finished it
+    split = source.index(b'\n', len(source) // 2) + 20
+    path.write_bytes(source[:split])
+    data, report = _incremental(path, tmp_path)
+    assert data.pending_bytes == 19 and data.pending_rows == 0
+
+    with open(path, 'ab') as handle:
+        handle.write(source[split:] + b'\n')
+    data, report = _incremental(path, tmp_path)
+    assert data.late_rows == 0 and data.pending_bytes == 0
+    assert data.n_rows == 288
+    assert report == _full_report(path)
+
+
+def test_replaced_file_is_rescanned_from_the_watermark(tmp_path):
+    source = _source_bytes()
+    path = tmp_path / 'traffic.csv'
+    # Rows are ordered by day (then location), so only a day boundary is a clean watermark
+    path.write_bytes(source[:source.index(b'\n2024-01-09') + 1])
+    _incremental(path, tmp_path)
+
+    # A rewritten copy (new inode) with the same rows plus the rest is rescanned, not resumed
+    replacement = tmp_path / 'replacement.csv'
+    replacement.write_bytes(source)
+    os.replace(replacement, path)
+    data, report = _incremental(path, tmp_path)
+    assert data.late_rows > 0
+    assert report == _full_report(path)
@@ -0,0 +1,63 @@
+"""
+The query engine's roll-ups against a direct groupby, its LRU memory budget and data versions
+"""
+
+import pandas as pd
+import pytest
+
+from traffic_aggregates import METRICS
+from traffic_analysis import DATA_FILE, clean_traffic, load_traffic
+from traffic_query import TrafficQueryEngine
+
+
+@pytest.fixture(scope='module')
+def data():
+    return clean_traffic(load_traffic(DATA_FILE))
+
+
+def test_rollup_equals_a_direct_groupby(data):
+    df = data.df
+    engine = TrafficQueryEngine(df, cube=data.aggregates)
+    rows = df[(df['Time_Period'] == 'Evening Rush') & df['Day_of_Week'].isin(['Monday', 'Friday'])]
+    for agg in ['mean', 'sum', 'count']:
+        result = engine.query(filters={'Day_of_Week': ['Friday', 'Monday'], 'Time_Period': 'Evening Rush'},
+                              by='Location', agg=agg)
+        expected = rows.groupby('Location', observed=True)[METRICS].agg(agg)
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_index_type=False)
+    # One query is one lookup, however many cubes and roll-ups it uses internally
+    assert engine.cache_stats()['misses'] == 3
+    engine.query(filters={'Time_Period': 'Evening Rush', 'Day_of_Week': ['Monday', 'Friday']}, by='Location')
+    assert engine.cache_stats()['hits'] == 1 and engine.cache_stats()['misses'] == 3
+
+
+def test_columns_outside_the_cube_get_their_own_cube(data):
+    engine = TrafficQueryEngine(data.df, cube=data.aggregates)
+    expected = data.df.groupby('Date')[METRICS].mean()
+    pd.testing.assert_frame_equal(engine.query(by='Date'), expected, check_index_type=False)
+    assert ('cube', ('Date',)) in engine.cache.keys()
+
+
+def test_lru_eviction_keeps_the_cache_under_its_budget(data):
+    engine = TrafficQueryEngine(data.df)
+    engine.query(filters={'Hour': 0}, by='Location')
+    # Room for the cube with its (Hour, Location) roll-up and about three results
+    budget = engine.cache.memory_budget = engine.cache.bytes + 1_000
+    for hour in range(24):
+        engine.query(filters={'Hour': hour}, by='Location')
+        assert engine.cache.bytes <= budget
+    stats = engine.cache_stats()
+    assert stats['evictions'] > 0
+    # The least recently used entries went first: the newest result is still cached
+    assert engine.cache.keys()[-1][1] == (('Hour', (23,)),)
+    assert ('result', (('Hour', (0,)),), ('Location',), tuple(METRICS), 'mean') not in engine.cache.keys()
+
+
+def test_set_data_drops_the_previous_version(data):
+    engine = TrafficQueryEngine(data.df, cube=data.aggregates)
+    before = engine.query(by='Road_Type')
+    doubled = data.df.assign(Vehicle_Count=data.df['Vehicle_Count'] * 2)
+    engine.set_data(doubled)
+    assert engine.cache_stats()['version'] == 1 and engine.cache_stats()['entries'] == 0
+    after = engine.query(by='Road_Type')
+    pd.testing.assert_series_equal(after['Vehicle_Count'], before['Vehicle_Count'] * 2)
+    pd.testing.assert_series_equal(after['Average_Speed_kmh'], before['Average_Speed_kmh'])
@@ -0,0 +1,269 @@
+"""
+Jakarta Traffic Analysis - Streaming Aggregation Engine
+=======================================================
+
+Reads the traffic CSV in bounded-size chunks and reduces every chunk into
+mergeable partial aggregates (row count, sum and non-missing count per
+metric, for every report grouping). Peak memory therefore depends on the
+number of groups, not on the number of rows.
+
+The STEP 2 cleaning rules are applied when the partials are finalized:
+missing metric values contribute the global column mean, and missing
+Weather_Condition / Is_Weekend keys are folded into the column mode, so
+the results match the in-memory run exactly.
+"""
+
+import pandas as pd
+
+from csv_loader import iter_csv
+from fused_groupby import LOW_SUFFIX, add_exact, add_exact_product, exact_total, fused_aggregate, sum_partials
+from sketches import DEFAULT_QUANTILES, DistinctCountSketch, QuantileSketch
+from traffic_features import add_derived_columns
+
+# Metrics averaged by the report
+METRICS = ['Vehicle_Count', 'Average_Speed_kmh']
+
+# Every grouping used by STEPs 3-7 of the report
+REPORT_GROUPINGS = [
+    ('Hour',),
+    ('Location',),
+    ('Is_Weekend',),
+    ('Weather_Condition',),
+    ('Road_Type',),
+    ('Time_Period',),
+    ('Time_Period', 'Location'),
+    ('Time_Period', 'Day_of_Week'),
+]
+
+# Categorical columns whose missing values are filled with the mode in STEP 2
+MODE_FILLED_COLUMNS = ['Weather_Condition', 'Is_Weekend']
+
+DEFAULT_CHUNKSIZE = 100_000
+
+# Rows kept for the STEP 1 preview
+SAMPLE_ROWS = 5
+
+# Finest grouping of the optional quantile sketches (coarser ones are rolled up)
+SKETCH_KEYS = ('Location', 'Hour')
+
+
+def _normalize_keys(keys):
+    """Return a grouping as a tuple of column names"""
+    if isinstance(keys, str):
+        return (keys,)
+    return tuple(keys)
+
+
+class TrafficAggregates:
+    """Mergeable sum/count state behind every traffic report statistic"""
+
+    # Also accumulate per-group sums of squares (see traffic_cube.TrafficCube)
+    track_squares = False
+
+    def __init__(self, groupings=None, sketches=False):
+        self.groupings = [_normalize_keys(keys) for keys in (groupings or REPORT_GROUPINGS)]
+        self.partials = {keys: None for keys in self.groupings}
+        self.rows = 0
+        self.columns = []
+        self.sample = None
+        self.dtypes = None
+        self.missing = None
+        # Exact (high, low) sums of the non-missing values (see fused_groupby)
+        self.metric_sums = {metric: (0.0, 0.0) for metric in METRICS}
+        self.metric_counts = {metric: 0 for metric in METRICS}
+        self.value_counts = {column: None for column in MODE_FILLED_COLUMNS}
+        self.date_min = None
+        self.date_max = None
+
+        # Optional mergeable sketches: metric quantiles per Location/Hour, distinct days per Location
+        self.quantile_sketches = {metric: QuantileSketch(SKETCH_KEYS) for metric in METRICS} if sketches else None
+        self.distinct_days = DistinctCountSketch('Location') if sketches else None
+
+    # ------------------------------------------------------------------
+    # Building partials
+    # ------------------------------------------------------------------
+
+    def update(self, chunk):
+        """Fold a raw chunk (as read from the CSV) into the running aggregates"""
+        if len(chunk) == 0:
+            return self
+
+        if self.sample is None:
+            self.columns = list(chunk.columns)
+            self.sample = chunk.head(SAMPLE_ROWS).copy()
+            self.dtypes = chunk.dtypes.copy()
+        elif len(self.sample) < SAMPLE_ROWS:
+            self.sample = pd.concat([self.sample, chunk.head(SAMPLE_ROWS - len(self.sample))])
+
+        self.rows += len(chunk)
+        missing = chunk.isnull().sum()
+        self.missing = missing if self.missing is None else self.missing.add(missing, fill_value=0)
+
+        dates = chunk['Date'].dropna()
+        if len(dates):
+            self.date_min = dates.min() if self.date_min is None else min(self.date_min, dates.min())
+            self.date_max = dates.max() if self.date_max is None else max(self.date_max, dates.max())
+
+        for metric in METRICS:
+            self.metric_counts[metric] += int(chunk[metric].count())
+
+        for column in MODE_FILLED_COLUMNS:
+            counts = chunk[column].value_counts()
+            current = self.value_counts[column]
+            self.value_counts[column] = counts if current is None else current.add(counts, fill_value=0)
+
+        if self.quantile_sketches is not None:
+            for metric, sketch in self.quantile_sketches.items():
+                sketch.update(chunk, metric)
+            self.distinct_days.update(chunk, 'Date')
+
+        if 'Time_Period' not in chunk.columns or 'Day_of_Week' not in chunk.columns:
+            chunk = add_derived_columns(chunk.copy())
+
+        # One fused pass computes the partials of every grouping
+        partials = fused_aggregate(chunk, self.groupings, METRICS, self.track_squares)
+        for metric in METRICS:
+            # Every grouping covers all rows, so the first one's group sums add up to the column sum
+            partial = partials[self.groupings[0]]
+            self.metric_sums[metric] = add_exact(self.metric_sums[metric], exact_total(
+                partial[f'{metric}_sum'], partial[f'{metric}_sum{LOW_SUFFIX}']))
+        for keys, partial in partials.items():
+            self._add_partial(keys, partial)
+        return self
+
+    @classmethod
+    def from_frame(cls, df, groupings=None):
+        """Aggregate an in-memory traffic frame in a single pass"""
+        return cls(groupings).update(df)
+
+    def _add_partial(self, keys, partial):
+        """Add a partial aggregate frame into the stored state for a grouping"""
+        current = self.partials[keys]
+        self.partials[keys] = partial if current is None else sum_partials(pd.concat([current, partial]))
+
+    def merge(self, other):
+        """Merge another TrafficAggregates (e.g. from another chunk range) into this one"""
+        if other.sample is None:
+            return self
+        if self.sample is None:
+            self.columns = other.columns
+            self.sample = other.sample
+            self.dtypes = other.dtypes
+
+        self.rows += other.rows
+        self.missing = other.missing if self.missing is None else self.missing.add(other.missing, fill_value=0)
+        for bound, pick in (('date_min', min), ('date_max', max)):
+            mine, theirs = getattr(self, bound), getattr(other, bound)
+            setattr(self, bound, theirs if mine is None else (mine if theirs is None else pick(mine, theirs)))
+        for metric in METRICS:
+            self.metric_sums[metric] = add_exact(self.metric_sums[metric], other.metric_sums[metric])
+            self.metric_counts[metric] += other.metric_counts[metric]
+        for column in MODE_FILLED_COLUMNS:
+            counts, current = other.value_counts[column], self.value_counts[column]
+            if counts is not None:
+                self.value_counts[column] = counts if current is None else current.add(counts, fill_value=0)
+        for keys in self.groupings:
+            if other.partials.get(keys) is not None:
+                self._add_partial(keys, other.partials[keys])
+        if self.quantile_sketches is not None and other.quantile_sketches is not None:
+            for metric, sketch in self.quantile_sketches.items():
+                sketch.merge(other.quantile_sketches[metric])
+            self.distinct_days.merge(other.distinct_days)
+        return self
+
+    # ------------------------------------------------------------------
+    # Finalized statistics (STEP 2 cleaning rules applied)
+    # ------------------------------------------------------------------
+
+    def global_mean(self, metric):
+        """Column mean over the non-missing values (the STEP 2 fill value)"""
+        count = self.metric_counts[metric]
+        high, low = self.metric_sums[metric]
+        return float(high + low) / count if count else float('nan')
+
+    def mode(self, column):
+        """Most frequent value of a column, ties broken like Series.mode()[0]"""
+        counts = self.value_counts[column]
+        if counts is None or len(counts) == 0:
+            return None
+        top = counts[counts == counts.max()].index
+        return sorted(top)[0]
+
+    def partial(self, keys):
+        """The raw partial aggregate frame of a grouping (None before any data)"""
+        keys = _normalize_keys(keys)
+        if keys not in self.partials:
+            raise KeyError(f"Grouping {keys} was not aggregated")
+        return self.partials[keys]
+
+    def group_totals(self, keys):
+        """Per-group rows and metric sums (and sums of squares, if tracked) with missing values imputed"""
+        keys = _normalize_keys(keys)
+        partial = self.partial(keys)
+        if partial is None:
+            return pd.DataFrame(columns=['rows'] + METRICS)
+
+        partial = partial.reset_index()
+        for column in keys:
+            if column in MODE_FILLED_COLUMNS:
+                partial[column] = partial[column].where(partial[column].notna(), self.mode(column))
+        partial = partial.dropna(subset=list(keys))
+
+        # Missing values contribute the global mean; the exact sums absorb those products exactly
+        totals = pd.DataFrame({'rows': partial['rows']})
+        for metric in METRICS:
+            filled = partial['rows'] - partial[f'{metric}_count']
+            mean = self.global_mean(metric)
+            for name, fill in (('sum', mean), ('sumsq', mean * mean)):
+                column = f'{metric}_{name}'
+                if column in partial:
+                    totals[column], totals[f'{column}{LOW_SUFFIX}'] = add_exact_product(
+                        (partial[column].to_numpy(), partial[f'{column}{LOW_SUFFIX}'].to_numpy()),
+                        filled.to_numpy(), fill)
+        totals[list(keys)] = partial[list(keys)]
+        totals = sum_partials(totals.set_index(list(keys)))
+
+        # Each exact sum is rounded once
+        result = pd.DataFrame({'rows': totals['rows']}, index=totals.index)
+        for metric in METRICS:
+            result[metric] = totals[f'{metric}_sum'] + totals[f'{metric}_sum{LOW_SUFFIX}']
+            if f'{metric}_sumsq' in totals:
+                result[f'{metric}_sumsq'] = totals[f'{metric}_sumsq'] + totals[f'{metric}_sumsq{LOW_SUFFIX}']
+        return result
+
+    def group_quantiles(self, keys, metric='Average_Speed_kmh', quantiles=DEFAULT_QUANTILES):
+        """
+        Approximate quantiles of a metric per group of `keys` (any subset of
+        SKETCH_KEYS, or () for overall), within 1% relative error. Missing values
+        are left out rather than imputed. Requires sketches=True.
+        """
+        if self.quantile_sketches is None:
+            raise ValueError("Quantiles need the aggregates to be built with sketches=True")
+        return self.quantile_sketches[metric].quantiles(quantiles, by=_normalize_keys(keys))
+
+    def days_observed(self):
+        """Approximate number of distinct dates per Location (HyperLogLog). Requires sketches=True."""
+        if self.distinct_days is None:
+            raise ValueError("Distinct counts need the aggregates to be built with sketches=True")
+        return self.distinct_days.estimate()
+
+    def group_means(self, keys):
+        """Per-group metric means, equivalent to df.groupby(keys)[METRICS].mean()"""
+        totals = self.group_totals(keys)
+        return totals[METRICS].div(totals['rows'], axis=0)
+
+
+def stream_traffic_aggregates(file_path, chunksize=DEFAULT_CHUNKSIZE, groupings=None, aggregates=None,
+                              sketches=False, date_range=None, filters=None, engine='c'):
+    """
+    Build TrafficAggregates by reading the CSV in chunks of `chunksize` rows
+    (or fold the chunks into `aggregates`, e.g. an empty TrafficCube). Only rows
+    inside `date_range` and matching `filters` (see csv_loader) are aggregated.
+    `engine` is the csv_loader parse engine ('pyarrow' cannot read in chunks).
+    """
+    if aggregates is None:
+        aggregates = TrafficAggregates(groupings, sketches)
+    for chunk in iter_csv(file_path, schema={}, date_range=date_range, filters=filters, chunksize=chunksize,
+                          engine=engine):
+        aggregates.update(chunk)
+    return aggregates
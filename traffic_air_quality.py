@@ -0,0 +1,218 @@
+"""
+Jakarta Traffic and Air Quality
+===============================
+
+Relates congestion in jakarta_traffic_data.csv to pollution in
+jakarta_aqi_data.csv (daily PM2.5, O3 and CO), per Location and Road_Type:
+
+1. The hourly traffic rows are streamed in chunks into daily aggregates per
+   (Date, Location, Road_Type). These are the same mergeable sums and counts,
+   with the same STEP 2 fills, as the traffic report, so memory depends on
+   days x locations and never on the number of rows.
+2. Every daily cell is matched to the air quality of day + lag with a
+   sorted-index as-of join. This is a binary search over the sorted AQI
+   dates for the latest reading at or before that day, within
+   `tolerance_days`. It runs for every lag from 0 to max_lag, without a
+   hash table and without building the row-level join.
+3. For every group, lag, traffic metric and pollutant, the sums n, Sx, Sy,
+   Sxy, Sxx and Syy give the Pearson correlation and the least-squares slope
+   (change in the pollutant per unit of the traffic metric).
+
+A positive lag compares today's traffic with the pollution `lag` days later.
+
+Usage:
+    python traffic_air_quality.py --traffic traffic.csv --aqi aqi.csv --max-lag 3
+"""
+
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from columnar_cache import load_csv_cached
+from csv_loader import load_csv
+from data_schemas import AQI_SCHEMA
+from traffic_aggregates import DEFAULT_CHUNKSIZE, METRICS, TrafficAggregates, stream_traffic_aggregates
+
+TRAFFIC_FILE = 'jakarta_traffic_data.csv'
+AQI_FILE = 'jakarta_aqi_data.csv'
+
+POLLUTANTS = ['PM2.5', 'O3', 'CO']
+DAILY_KEYS = ('Date', 'Location', 'Road_Type')
+GROUP_KEYS = ['Location', 'Road_Type']
+DEFAULT_MAX_LAG = 3
+
+# Index levels of the correlation table after the group keys
+CORRELATION_KEYS = ['Traffic_Metric', 'Pollutant', 'Lag_Days']
+
+
+# ============================================================================
+# Inputs
+# ============================================================================
+
+def daily_traffic(aggregates):
+    """Daily mean of every traffic metric per (Date, Location, Road_Type), sorted by Date"""
+    daily = aggregates.group_means(DAILY_KEYS).reset_index()
+    daily['Date'] = pd.to_datetime(daily['Date'])
+    return daily.sort_values('Date', kind='stable').reset_index(drop=True)
+
+
+def stream_daily_traffic(file_path=TRAFFIC_FILE, chunksize=DEFAULT_CHUNKSIZE):
+    """Read the traffic CSV in chunks and return its daily aggregates"""
+    return daily_traffic(stream_traffic_aggregates(file_path, chunksize, groupings=[DAILY_KEYS]))
+
+
+def frame_daily_traffic(df):
+    """Daily aggregates of a traffic frame already in memory"""
+    return daily_traffic(TrafficAggregates.from_frame(df, groupings=[DAILY_KEYS]))
+
+
+def load_air_quality(file_path=AQI_FILE, use_cache=True):
+    """Daily pollutant readings sorted by Date (several readings on one day are averaged)"""
+    aqi = load_csv_cached(file_path, AQI_SCHEMA) if use_cache else load_csv(file_path, AQI_SCHEMA)
+    aqi = aqi.assign(Date=pd.to_datetime(aqi['Date']).dt.normalize()).dropna(subset=['Date'])
+    return aqi.groupby('Date', sort=True)[POLLUTANTS].mean().reset_index()
+
+
+# ============================================================================
+# Join and statistics
+# ============================================================================
+
+def asof_positions(dates, reference_dates, tolerance_days=0):
+    """
+    Position in the sorted `reference_dates` of the latest date at or before each
+    of `dates` and no more than `tolerance_days` earlier (-1 where there is none)
+    """
+    day = np.timedelta64(1, 'D')
+    reference = np.asarray(reference_dates, dtype='datetime64[ns]')
+    targets = np.asarray(dates, dtype='datetime64[ns]')
+    positions = np.searchsorted(reference, targets, side='right') - 1
+    found = positions >= 0
+    within = (targets - reference[np.clip(positions, 0, None)]) <= tolerance_days * day
+    return np.where(found & within, positions, -1)
+
+
+def lagged_correlations(daily, aqi, max_lag=DEFAULT_MAX_LAG, tolerance_days=0, by=GROUP_KEYS):
+    """
+    Correlation and slope of every pollutant against every traffic metric per
+    group of `by` (Location and Road_Type by default, or e.g. ['Road_Type'] to
+    pool the locations), for lags 0..max_lag days. Returns a frame indexed by
+    `by` + CORRELATION_KEYS with the columns Days, Correlation and Slope.
+    """
+    by = list(by)
+    keys = by + CORRELATION_KEYS
+    sums = []
+    for lag in range(max_lag + 1):
+        positions = asof_positions(daily['Date'] + pd.Timedelta(days=lag), aqi['Date'], tolerance_days)
+        matched = positions >= 0
+        cells = daily.loc[matched, by + METRICS].reset_index(drop=True)
+        readings = aqi[POLLUTANTS].to_numpy(dtype=np.float64)[positions[matched]]
+
+        for metric in METRICS:
+            x = cells[metric].to_numpy(dtype=np.float64)
+            for column, pollutant in enumerate(POLLUTANTS):
+                y = readings[:, column]
+                paired = ~np.isnan(x) & ~np.isnan(y)
+                terms = pd.DataFrame({'n': paired.astype(np.int64)})
+                for name, values in [('x', x), ('y', y), ('xy', x * y), ('xx', x * x), ('yy', y * y)]:
+                    terms[name] = np.where(paired, values, 0.0)
+                group_sums = terms.groupby([cells[key] for key in by], observed=True).sum()
+                group_sums['Traffic_Metric'], group_sums['Pollutant'], group_sums['Lag_Days'] = metric, pollutant, lag
+                sums.append(group_sums)
+
+    if not sums or not sum(len(group_sums) for group_sums in sums):
+        return pd.DataFrame(columns=['Days', 'Correlation', 'Slope'],
+                            index=pd.MultiIndex.from_tuples([], names=keys))
+    sums = pd.concat(sums).reset_index().set_index(keys)
+    n = sums['n']
+    covariance = sums['xy'] - sums['x'] * sums['y'] / n
+    x_variance = sums['xx'] - sums['x'] ** 2 / n
+    y_variance = sums['yy'] - sums['y'] ** 2 / n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = covariance / np.sqrt(x_variance * y_variance)
+        slope = covariance / x_variance
+    defined = (n > 2) & (x_variance > 0) & (y_variance > 0)
+    return pd.DataFrame({
+        'Days': n,
+        'Correlation': correlation.where(defined).clip(-1, 1),
+        'Slope': slope.where(defined),
+    }).sort_index()
+
+
+def strongest_lags(correlations):
+    """For every group, metric and pollutant, the lag with the largest absolute correlation"""
+    defined = correlations.dropna(subset=['Correlation'])
+    if not len(defined):
+        return defined
+    keys = [key for key in correlations.index.names if key != 'Lag_Days']
+    best = defined['Correlation'].abs().groupby(level=keys, observed=True).idxmax()
+    return defined.loc[best.to_numpy()].reset_index('Lag_Days')
+
+
+def analyze_traffic_air_quality(traffic_path=TRAFFIC_FILE, aqi_path=AQI_FILE, max_lag=DEFAULT_MAX_LAG,
+                                tolerance_days=0, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Stream the traffic CSV, join it to the AQI readings and return
+    (daily traffic, aqi, correlations per Location/Road_Type, correlations per Road_Type)
+    """
+    daily = stream_daily_traffic(traffic_path, chunksize)
+    aqi = load_air_quality(aqi_path)
+    return daily, aqi, lagged_correlations(daily, aqi, max_lag, tolerance_days), \
+        lagged_correlations(daily, aqi, max_lag, tolerance_days, by=['Road_Type'])
+
+
+# ============================================================================
+# Report
+# ============================================================================
+
+def parse_args(argv=None):
+    """Helper function to read the command line options"""
+    parser = argparse.ArgumentParser(description="Jakarta traffic and air quality correlation analysis")
+    parser.add_argument('--traffic', default=TRAFFIC_FILE, help="hourly traffic CSV")
+    parser.add_argument('--aqi', default=AQI_FILE, help="daily air quality CSV")
+    parser.add_argument('--max-lag', type=int, default=DEFAULT_MAX_LAG,
+                        help="also compare traffic with pollution up to this many days later")
+    parser.add_argument('--tolerance-days', type=int, default=0,
+                        help="use the latest AQI reading up to this many days old when a day has none")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                        help="traffic rows read per chunk")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Print the correlation report; returns the process exit code"""
+    args = parse_args(argv)
+    try:
+        daily, aqi, correlations, road_correlations = analyze_traffic_air_quality(
+            args.traffic, args.aqi, args.max_lag, args.tolerance_days, args.chunksize)
+    except FileNotFoundError as error:
+        print(f"❌ Error: {error.filename} file not found!")
+        return 1
+
+    print("=" * 60)
+    print(" TRAFFIC AND AIR QUALITY")
+    print("=" * 60)
+    print(f"Traffic: {len(daily)} daily location records, "
+          f"{daily['Date'].min().date() if len(daily) else '-'} to {daily['Date'].max().date() if len(daily) else '-'}")
+    print(f"Air quality: {len(aqi)} daily readings, "
+          f"{aqi['Date'].min().date() if len(aqi) else '-'} to {aqi['Date'].max().date() if len(aqi) else '-'}")
+
+    if correlations['Correlation'].notna().sum() == 0:
+        print("\n⚠️ The traffic and air quality data have too few overlapping days to correlate.")
+        return 0
+
+    for metric, label in [('Vehicle_Count', 'vehicle volume'), ('Average_Speed_kmh', 'average speed')]:
+        print(f"\n--- Same-day correlation with {label} ---")
+        for table in (road_correlations, correlations):
+            same_day = table.xs(0, level='Lag_Days').xs(metric, level='Traffic_Metric')
+            print(same_day['Correlation'].unstack('Pollutant').round(2))
+
+    print("\n--- Strongest lagged effect of vehicle volume on PM2.5 ---")
+    strongest = strongest_lags(correlations).xs(('Vehicle_Count', 'PM2.5'), level=['Traffic_Metric', 'Pollutant'])
+    print(strongest[['Lag_Days', 'Days', 'Correlation', 'Slope']].round(4))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
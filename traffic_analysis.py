@@ -0,0 +1,419 @@
+"""
+Jakarta Traffic Analysis - Library API
+======================================
+
+The STEP 1-7 logic of jakarta_traffic_analysis_solution.py as importable
+functions, so a long-lived process can load and clean the dataset once and
+answer many report requests from memory.
+
+    data = load_traffic('jakarta_traffic_data.csv')   # STEP 1
+    clean_traffic(data)                                # STEP 2
+    report = analyze_traffic(data)                     # STEPs 3-7
+    report.weather.speed_reduction, report.to_dict()
+
+load_traffic() raises FileNotFoundError instead of exiting, and nothing in
+this module prints: the results are plain objects (pandas frames for the
+tables, numbers and labels for the findings) and to_dict() turns them into
+JSON-friendly dictionaries.
+"""
+
+import numpy as np
+import pandas as pd
+
+from columnar_cache import load_csv_cached
+from csv_loader import load_csv
+from data_schemas import TRAFFIC_DERIVED_SCHEMA, TRAFFIC_SCHEMA
+from data_validation import TRAFFIC_RULES, validate as validate_rows
+from fused_groupby import exact_sum
+from lazy_plan import traffic_plan_stats
+from memory_optimizer import optimize_memory, plain_read_usage
+from parallel_analysis import parallel_traffic_aggregates
+from sketches import DEFAULT_QUANTILES
+from traffic_aggregates import DEFAULT_CHUNKSIZE, METRICS, MODE_FILLED_COLUMNS
+from traffic_cube import build_traffic_cube, stream_traffic_cube
+from traffic_features import add_derived_columns
+from traffic_incremental import default_state_path, update_incremental
+
+DATA_FILE = 'jakarta_traffic_data.csv'
+
+# How load_traffic() read the data
+LOAD_MODES = ['memory', 'stream', 'incremental', 'parallel']
+
+RUSH_PERIODS = ['Morning Rush', 'Evening Rush']
+
+
+def _plain(value):
+    """Convert a result value into JSON-friendly Python objects"""
+    if isinstance(value, AnalysisResult):
+        return value.to_dict()
+    if isinstance(value, pd.DataFrame):
+        return {_plain_key(index): _plain(row.to_dict()) for index, row in value.iterrows()}
+    if isinstance(value, pd.Series):
+        return {_plain_key(index): _plain(item) for index, item in value.items()}
+    if isinstance(value, dict):
+        return {_plain_key(key): _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value
+
+
+def _plain_key(key):
+    if isinstance(key, tuple):
+        return " / ".join(str(part) for part in key)
+    return key.item() if isinstance(key, np.generic) else key if isinstance(key, (str, int, bool)) else str(key)
+
+
+class AnalysisResult:
+    """Named result fields plus a JSON-friendly to_dict()"""
+    fields = ()
+
+    def __init__(self, **values):
+        for name in self.fields:
+            setattr(self, name, values.get(name))
+
+    def to_dict(self):
+        return {name: _plain(getattr(self, name)) for name in self.fields}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(self.fields)})"
+
+
+class TrafficPatterns(AnalysisResult):
+    """STEP 3: peak hours, location comparison and the weekend effect (weekday/weekend fields are None if absent)"""
+    fields = (
+        'hourly', 'peak_vehicle_hour', 'peak_vehicle_count', 'slowest_hour', 'slowest_speed',
+        'location_stats', 'top_congested', 'slowest_location', 'slowest_location_speed',
+        'weekend_comparison', 'weekday_vehicles', 'weekend_vehicles', 'weekday_speed', 'weekend_speed',
+        'vehicle_diff_pct', 'speed_diff_pct', 'weekend_effect',
+    )
+
+
+class WeatherImpact(AnalysisResult):
+    """STEP 4: speeds by weather (sunny/rainy fields are None if either is absent)"""
+    fields = ('weather_stats', 'worst_weather', 'worst_weather_speed', 'sunny_speed', 'rainy_speed',
+              'speed_reduction')
+
+
+class RoadTypePerformance(AnalysisResult):
+    """STEP 5: volume and speed by road type"""
+    fields = ('road_stats', 'highest_volume_road', 'highest_volume_count', 'fastest_road', 'fastest_road_speed')
+
+
+class RushHourAnalysis(AnalysisResult):
+    """STEP 6: rush-hour congestion by period, location and day"""
+    fields = (
+        'period_stats', 'by_period', 'morning_avg_vehicles', 'morning_avg_speed', 'evening_avg_vehicles',
+        'evening_avg_speed', 'evening_more_congested', 'evening_by_day', 'worst_evening_day',
+        'worst_evening_speed',
+    )
+
+
+class TrafficReport(AnalysisResult):
+    """Every STEP 3-7 result, plus the best-flowing time period behind STEP 7's surprising insight"""
+    fields = ('patterns', 'weather', 'roads', 'rush_hour', 'best_time', 'best_time_speed')
+
+
+# ----------------------------------------------------------------------------
+# STEP 1-2: loading and cleaning
+# ----------------------------------------------------------------------------
+
+class TrafficData:
+    """
+    A loaded traffic dataset. In 'memory' mode `df` holds the rows; the other
+    modes keep only `aggregates`, from which every report statistic is derived.
+    """
+
+    def __init__(self, file_path, mode, df=None, aggregates=None):
+        self.file_path = file_path
+        self.mode = mode
+        self.df = df
+        self.aggregates = aggregates
+        self.chunksize = None
+        self.workers = None
+        self.partition_by = None
+        self.new_rows = None
+        self.watermark = None
+        self.late_rows = 0
+        self.pending_bytes = 0
+        self.pending_rows = 0
+        self.sketches = False
+        self.date_range = None
+        self.locations = None
+        self.validation = None
+
+        # STEP 1 profile of the raw data
+        if df is not None:
+            self.sample = df.head()
+            self.n_rows, self.n_columns = df.shape
+            self.date_min, self.date_max = df['Date'].min(), df['Date'].max()
+            self.dtypes = df.dtypes
+            self.missing = df.isnull().sum()
+        else:
+            self.sample = aggregates.sample
+            self.n_rows, self.n_columns = aggregates.rows, len(aggregates.columns)
+            self.date_min, self.date_max = aggregates.date_min, aggregates.date_max
+            self.dtypes = aggregates.dtypes
+            self.missing = aggregates.missing.astype(int)
+
+        # Filled in by clean_traffic()
+        self.cleaned = False
+        self.fills = []
+        self.memory_report = None
+
+    @property
+    def stats(self):
+        """The aggregates every report statistic is computed from (available once cleaned)"""
+        if not self.cleaned:
+            raise RuntimeError("Call clean_traffic() before computing report statistics")
+        return self.aggregates
+
+
+def load_traffic(file_path=DATA_FILE, stream=False, incremental=False, chunksize=DEFAULT_CHUNKSIZE,
+                 use_cache=True, workers=None, partition_by='Location', state_path=None, sketches=False,
+                 date_range=None, locations=None, engine='c', validate=False, lazy=False):
+    """
+    STEP 1: load the traffic CSV and profile it. Raises FileNotFoundError.
+
+    - default:       the whole frame in memory (through the typed columnar cache)
+    - stream:        chunked cube build, memory bounded by the number of cells
+    - incremental:   only rows appended since the last run (state persisted at `state_path`)
+    - workers:       aggregate partitions (by Location or date) in a process pool
+    - lazy:          run STEPs 1-7 as optimized lazy_plan plans over one CSV read
+
+    `sketches` also keeps quantile and distinct-count sketches (not in incremental mode).
+    `date_range` (start, end) and `locations` keep only those rows, dropped while the
+    CSV is read (not in incremental mode). `engine` is the csv_loader parse engine
+    (in stream mode 'auto' means c, and 'pyarrow' raises ValueError: it cannot read in chunks).
+    `validate` checks the rows against data_validation.TRAFFIC_RULES and moves the
+    failing ones to `data.validation.quarantine` (memory and parallel modes only).
+    Raises ValueError if no row matches.
+    """
+    filters = {'Location': locations} if locations else None
+    if incremental and (date_range is not None or filters):
+        raise ValueError("date_range and locations cannot be used in incremental mode")
+    if validate and (stream or incremental):
+        raise ValueError("validate needs the rows in memory (not in stream or incremental mode)")
+    if lazy and (stream or incremental or workers or sketches or validate):
+        raise ValueError("lazy mode cannot be combined with stream, incremental, workers, sketches or validate")
+    if incremental:
+        state, new_rows, aggregates = update_incremental(file_path, state_path or default_state_path(file_path),
+                                                         chunksize=chunksize)
+        data = TrafficData(file_path, 'incremental', aggregates=aggregates)
+        data.new_rows, data.watermark = new_rows, state.watermark
+        data.late_rows, data.pending_bytes, data.pending_rows = state.late_rows, state.pending_bytes, \
+            state.pending_rows
+    elif lazy:
+        stats = traffic_plan_stats(file_path, chunksize, date_range, locations)
+        data = TrafficData(file_path, 'lazy', aggregates=stats)
+        # The plans already applied the STEP 2 fills and derived columns
+        data.fills, data.cleaned = stats.fills, True
+    elif stream:
+        cube = stream_traffic_cube(file_path, chunksize, sketches=sketches, date_range=date_range, filters=filters,
+                                   engine=engine)
+        data = TrafficData(file_path, 'stream', aggregates=cube)
+    else:
+        if use_cache:
+            df = load_csv_cached(file_path, TRAFFIC_SCHEMA, engine=engine, date_range=date_range, filters=filters)
+        else:
+            df = load_csv(file_path, TRAFFIC_SCHEMA, date_range=date_range, filters=filters, engine=engine)
+        validation = None
+        if validate:
+            validation = validate_rows(df, TRAFFIC_RULES)
+            df = validation.valid
+        if workers:
+            aggregates = parallel_traffic_aggregates(df, partition_by=partition_by, workers=workers,
+                                                     sketches=sketches)
+            data = TrafficData(file_path, 'parallel', aggregates=aggregates)
+            data.workers, data.partition_by = workers, partition_by
+        else:
+            data = TrafficData(file_path, 'memory', df=df)
+        data.validation = validation
+    data.chunksize = chunksize
+    data.sketches = sketches
+    data.date_range, data.locations = date_range, locations
+    if not data.n_rows and (date_range is not None or filters):
+        raise ValueError(f"No rows of {file_path} match the date range and locations")
+    return data
+
+
+def fill_traffic(data):
+    """
+    STEP 2, part 1 of clean_traffic(): choose the fills for missing values
+    (metric means, categorical modes), parse Date and apply them to the frame.
+    Aggregate-backed data applies the same fills when its statistics are finalized.
+    """
+    df = data.df
+    fills = []
+    for column in METRICS:
+        if data.missing[column] > 0:
+            value = exact_sum(df[column]) / df[column].count() if df is not None else \
+                data.aggregates.global_mean(column)
+            fills.append((column, 'mean', value))
+    for column in MODE_FILLED_COLUMNS:
+        if data.missing[column] > 0:
+            value = df[column].mode()[0] if df is not None else data.aggregates.mode(column)
+            fills.append((column, 'mode', value))
+
+    if df is not None:
+        df['Date'] = pd.to_datetime(df['Date'])
+        for column, _, value in fills:
+            df[column] = df[column].fillna(value)
+    data.fills = fills
+    return data
+
+
+def derive_traffic(data):
+    """STEP 2, part 2: add Day_of_Week / Time_Period and compact the dtypes (frame-backed data only)"""
+    if data.df is not None:
+        add_derived_columns(data.df)
+        data.df, data.memory_report = optimize_memory(data.df, {**TRAFFIC_SCHEMA, **TRAFFIC_DERIVED_SCHEMA},
+                                                      before=plain_read_usage(data.df))
+    return data
+
+
+def aggregate_traffic(data):
+    """STEP 2, part 3: build the cube every report statistic is rolled up from, in one fused pass"""
+    if data.df is not None:
+        data.aggregates = build_traffic_cube(data.df, sketches=data.sketches)
+    data.cleaned = True
+    return data
+
+
+def clean_traffic(data):
+    """
+    STEP 2: fill missing values, add the derived columns and compact the
+    dtypes, then aggregate (fill_traffic, derive_traffic and aggregate_traffic).
+    """
+    if data.cleaned:
+        return data
+    return aggregate_traffic(derive_traffic(fill_traffic(data)))
+
+
+# ----------------------------------------------------------------------------
+# STEP 3-7: analysis
+# ----------------------------------------------------------------------------
+
+def traffic_patterns(stats):
+    """STEP 3 from a cleaned dataset's aggregates"""
+    hourly = stats.group_means('Hour')
+    location_stats = stats.group_means('Location').round(1)
+    weekend_comparison = stats.group_means('Is_Weekend').round(1)
+
+    slowest_location = location_stats.sort_values('Average_Speed_kmh').index[0]
+    result = TrafficPatterns(
+        hourly=hourly,
+        peak_vehicle_hour=hourly['Vehicle_Count'].idxmax(),
+        peak_vehicle_count=hourly['Vehicle_Count'].max(),
+        slowest_hour=hourly['Average_Speed_kmh'].idxmin(),
+        slowest_speed=hourly['Average_Speed_kmh'].min(),
+        location_stats=location_stats,
+        top_congested=location_stats.sort_values('Vehicle_Count', ascending=False).head(3),
+        slowest_location=slowest_location,
+        slowest_location_speed=location_stats.loc[slowest_location, 'Average_Speed_kmh'],
+        weekend_comparison=weekend_comparison,
+        weekend_effect=False,
+    )
+    # A date range or location filter can leave only weekdays or only weekends
+    if False in weekend_comparison.index:
+        result.weekday_vehicles = weekend_comparison.loc[False, 'Vehicle_Count']
+        result.weekday_speed = weekend_comparison.loc[False, 'Average_Speed_kmh']
+    if True in weekend_comparison.index:
+        result.weekend_vehicles = weekend_comparison.loc[True, 'Vehicle_Count']
+        result.weekend_speed = weekend_comparison.loc[True, 'Average_Speed_kmh']
+    if result.weekday_vehicles is not None and result.weekend_vehicles is not None:
+        result.vehicle_diff_pct = ((result.weekend_vehicles - result.weekday_vehicles) / result.weekday_vehicles) * 100
+        result.speed_diff_pct = ((result.weekend_speed - result.weekday_speed) / result.weekday_speed) * 100
+        result.weekend_effect = bool(result.weekend_vehicles < result.weekday_vehicles
+                                     and result.weekend_speed > result.weekday_speed)
+    return result
+
+
+def weather_impact(stats):
+    """STEP 4 from a cleaned dataset's aggregates"""
+    weather_stats = stats.group_means('Weather_Condition').round(1)
+    worst_weather = weather_stats.sort_values('Average_Speed_kmh').index[0]
+    result = WeatherImpact(
+        weather_stats=weather_stats,
+        worst_weather=worst_weather,
+        worst_weather_speed=weather_stats.loc[worst_weather, 'Average_Speed_kmh'],
+    )
+    if 'Sunny' in weather_stats.index and 'Rainy' in weather_stats.index:
+        result.sunny_speed = weather_stats.loc['Sunny', 'Average_Speed_kmh']
+        result.rainy_speed = weather_stats.loc['Rainy', 'Average_Speed_kmh']
+        result.speed_reduction = ((result.sunny_speed - result.rainy_speed) / result.sunny_speed) * 100
+    return result
+
+
+def road_type_performance(stats):
+    """STEP 5 from a cleaned dataset's aggregates"""
+    road_stats = stats.group_means('Road_Type').round(1)
+    highest_volume_road = road_stats.sort_values('Vehicle_Count', ascending=False).index[0]
+    fastest_road = road_stats.sort_values('Average_Speed_kmh', ascending=False).index[0]
+    return RoadTypePerformance(
+        road_stats=road_stats,
+        highest_volume_road=highest_volume_road,
+        highest_volume_count=road_stats.loc[highest_volume_road, 'Vehicle_Count'],
+        fastest_road=fastest_road,
+        fastest_road_speed=road_stats.loc[fastest_road, 'Average_Speed_kmh'],
+    )
+
+
+def rush_hour_analysis(stats):
+    """STEP 6 from a cleaned dataset's aggregates (fields of a rush period without rows are None)"""
+    period_stats = stats.group_means('Time_Period')
+    period_location_stats = stats.group_means(['Time_Period', 'Location'])
+
+    result = RushHourAnalysis(period_stats=period_stats, by_period={}, evening_more_congested=False)
+    for period in RUSH_PERIODS:
+        # A date range or location filter can leave a rush period without rows (e.g. weekends only)
+        if period not in period_stats.index:
+            continue
+        location_congestion = period_location_stats.loc[period, 'Vehicle_Count']
+        result.by_period[period] = {
+            'most_congested_location': location_congestion.idxmax(),
+            'vehicles': location_congestion.max(),
+            'average_speed': period_stats.loc[period, 'Average_Speed_kmh'],
+        }
+
+    if 'Morning Rush' in result.by_period:
+        result.morning_avg_vehicles = period_stats.loc['Morning Rush', 'Vehicle_Count']
+        result.morning_avg_speed = period_stats.loc['Morning Rush', 'Average_Speed_kmh']
+    if 'Evening Rush' in result.by_period:
+        result.evening_avg_vehicles = period_stats.loc['Evening Rush', 'Vehicle_Count']
+        result.evening_avg_speed = period_stats.loc['Evening Rush', 'Average_Speed_kmh']
+        evening_by_day = stats.group_means(['Time_Period', 'Day_of_Week']).loc['Evening Rush'].round(1)
+        result.evening_by_day = evening_by_day
+        result.worst_evening_day = evening_by_day.sort_values('Average_Speed_kmh').index[0]
+        result.worst_evening_speed = evening_by_day.loc[result.worst_evening_day, 'Average_Speed_kmh']
+    if result.morning_avg_vehicles is not None and result.evening_avg_vehicles is not None:
+        result.evening_more_congested = bool(result.evening_avg_vehicles > result.morning_avg_vehicles)
+    return result
+
+
+def traffic_report(patterns, weather, roads, rush_hour):
+    """STEP 7: combine the step results and find the best-flowing time period"""
+    time_periods_performance = rush_hour.period_stats['Average_Speed_kmh'].sort_values(ascending=False)
+    return TrafficReport(
+        patterns=patterns,
+        weather=weather,
+        roads=roads,
+        rush_hour=rush_hour,
+        best_time=time_periods_performance.index[0],
+        best_time_speed=time_periods_performance.iloc[0],
+    )
+
+
+def speed_percentiles(stats, keys=('Location',), quantiles=DEFAULT_QUANTILES):
+    """Approximate Average_Speed_kmh percentiles per group (data loaded with sketches=True)"""
+    return stats.group_quantiles(keys, 'Average_Speed_kmh', quantiles)
+
+
+def analyze_traffic(data):
+    """STEPs 3-7 for a loaded dataset (cleaned first if needed)"""
+    stats = clean_traffic(data).stats
+    return traffic_report(traffic_patterns(stats), weather_impact(stats), road_type_performance(stats),
+                          rush_hour_analysis(stats))
@@ -0,0 +1,129 @@
+"""
+Jakarta Traffic Analysis - OLAP Cube
+====================================
+
+Materializes the traffic data over its small, fixed set of dimensions
+(Location, Hour, Time_Period, Day_of_Week, Is_Weekend, Weather_Condition,
+Road_Type) so that report statistics are computed from cells, not rows.
+
+One build pass (a single fused groupby, chunk by chunk if streaming)
+produces the base cuboid: rows, sum, non-missing count and sum of squares
+of every metric for each observed combination of all dimensions. Every
+other dimension combination is a roll-up of that cuboid (summing cells),
+computed on first use and kept; materialize() precomputes the ones the
+report needs. A year of hourly data for a few dozen locations becomes a
+few tens of thousands of cells, so the whole STEP 3-7 report runs in
+milliseconds.
+
+TrafficCube is a TrafficAggregates, so it applies the same STEP 2 fills
+when results are finalized, and group_stds() adds standard deviations
+from the sums of squares. Quantiles are not derivable from sums; build
+with sketches=True to keep approximate quantile sketches alongside.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from fused_groupby import sum_partials
+from traffic_aggregates import DEFAULT_CHUNKSIZE, METRICS, REPORT_GROUPINGS, TrafficAggregates, \
+    _normalize_keys, stream_traffic_aggregates
+
+CUBE_DIMENSIONS = ('Location', 'Hour', 'Time_Period', 'Day_of_Week', 'Is_Weekend', 'Weather_Condition', 'Road_Type')
+
+
+class TrafficCube(TrafficAggregates):
+    """Base cuboid over every dimension plus memoized roll-ups of any dimension subset"""
+
+    track_squares = True
+
+    def __init__(self, dimensions=None, sketches=False):
+        self.dimensions = tuple(dimensions or CUBE_DIMENSIONS)
+        super().__init__([self.dimensions], sketches)
+        self.rollups = {}
+
+    @property
+    def cells(self):
+        """Number of cells in the base cuboid"""
+        base = self.partials[self.dimensions]
+        return 0 if base is None else len(base)
+
+    def update(self, chunk):
+        self.rollups = {}
+        return super().update(chunk)
+
+    def merge(self, other):
+        self.rollups = {}
+        return super().merge(other)
+
+    def partial(self, keys):
+        """Partial aggregates of any subset of the dimensions, rolled up from the base cuboid"""
+        keys = _normalize_keys(keys)
+        if keys == self.dimensions:
+            return self.partials[keys]
+        missing = [key for key in keys if key not in self.dimensions]
+        if missing:
+            raise KeyError(f"{missing} are not dimensions of this cube {self.dimensions}")
+        if keys not in self.rollups:
+            base = self.partials[self.dimensions]
+            # Missing keys stay as their own cells; group_totals folds or drops them like the report
+            self.rollups[keys] = None if base is None else sum_partials(base, list(keys))
+        return self.rollups[keys]
+
+    def materialize(self, groupings=REPORT_GROUPINGS):
+        """Precompute the roll-ups for `groupings` (default: every grouping of the report)"""
+        for keys in groupings:
+            self.partial(keys)
+        return self
+
+    def group_stds(self, keys):
+        """Per-group sample standard deviations (ddof=1), equivalent to df.groupby(keys)[METRICS].std()"""
+        totals = self.group_totals(keys)
+        stds = pd.DataFrame(index=totals.index)
+        for metric in METRICS:
+            mean = totals[metric] / totals['rows']
+            squares = totals[f'{metric}_sumsq'] - totals['rows'] * mean ** 2
+            variance = (squares / (totals['rows'] - 1)).where(totals['rows'] > 1)
+            stds[metric] = np.sqrt(variance.clip(lower=0))
+        return stds
+
+    def _cast_counts(self, cast):
+        """Apply `cast` to the row and non-missing count columns of every stored partial"""
+        for partial in [self.partials[self.dimensions]] + list(self.rollups.values()):
+            if partial is None:
+                continue
+            for column in partial.columns:
+                if column == 'rows' or column.endswith('_count'):
+                    partial[column] = cast(partial[column])
+        return self
+
+    @classmethod
+    def load(cls, cube_path):
+        """Load a cube written by save() (counts widened back to int64 so later updates cannot overflow)"""
+        return pd.read_pickle(cube_path)._cast_counts(lambda counts: counts.astype(np.int64))
+
+    def save(self, cube_path):
+        """Atomically write the cube with its counts in the smallest integer type that holds them"""
+        directory = os.path.dirname(os.path.abspath(cube_path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = cube_path + '.tmp'
+        self._cast_counts(lambda counts: pd.to_numeric(counts, downcast='integer'))
+        try:
+            pd.to_pickle(self, temp_path)
+        finally:
+            self._cast_counts(lambda counts: counts.astype(np.int64))
+        os.replace(temp_path, cube_path)
+
+
+def build_traffic_cube(df, dimensions=None, sketches=False):
+    """Build and materialize a cube from an in-memory traffic frame in one pass"""
+    return TrafficCube(dimensions, sketches).update(df).materialize()
+
+
+def stream_traffic_cube(file_path, chunksize=DEFAULT_CHUNKSIZE, dimensions=None, sketches=False, date_range=None,
+                        filters=None, engine='c'):
+    """Build and materialize a cube by reading the CSV in chunks of `chunksize` rows (optionally filtered)"""
+    cube = TrafficCube(dimensions, sketches)
+    return stream_traffic_aggregates(file_path, chunksize, aggregates=cube, date_range=date_range,
+                                     filters=filters, engine=engine).materialize()
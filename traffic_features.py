@@ -0,0 +1,162 @@
+"""
+Jakarta Traffic Analysis - Derived Columns
+==========================================
+
+Vectorized feature pipeline shared by the traffic analysis script and the
+streaming aggregation engine, so that every code path derives columns in
+exactly the same way.
+
+Derived columns are registered declaratively with @derived_column and are
+computed with whole-column NumPy operations only:
+
+- Time_Period: a 24-entry lookup table indexed by Hour
+- Day_of_Week: categorical codes taken straight from Date.dt.dayofweek
+
+Run this file directly to benchmark the pipeline against the original
+per-row .apply() implementation.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+TIME_PERIODS = ['Morning Rush', 'Midday', 'Evening Rush', 'Night']
+
+# Time period code for every hour of the day (index = hour)
+TIME_PERIOD_BY_HOUR = np.full(24, TIME_PERIODS.index('Night'), dtype=np.int8)
+TIME_PERIOD_BY_HOUR[7:10] = TIME_PERIODS.index('Morning Rush')
+TIME_PERIOD_BY_HOUR[10:16] = TIME_PERIODS.index('Midday')
+TIME_PERIOD_BY_HOUR[16:20] = TIME_PERIODS.index('Evening Rush')
+
+# Columns added by add_derived_columns() when no explicit list is given
+DEFAULT_DERIVED_COLUMNS = ['Day_of_Week', 'Time_Period']
+
+# name -> (function, required columns); filled by @derived_column
+DERIVED_COLUMNS = {}
+
+
+def derived_column(name, requires):
+    """Register a vectorized function computing the derived column `name`"""
+    def register(func):
+        DERIVED_COLUMNS[name] = (func, list(requires))
+        return func
+    return register
+
+
+def categorize_time_period(hour):
+    """Categorize hours into time periods (scalar reference implementation)"""
+    if 7 <= hour <= 9:
+        return "Morning Rush"
+    elif 10 <= hour <= 15:
+        return "Midday"
+    elif 16 <= hour <= 19:
+        return "Evening Rush"
+    else:
+        return "Night"
+
+
+def _dates(df):
+    """Date column as datetime64 values"""
+    if pd.api.types.is_datetime64_any_dtype(df['Date']):
+        return df['Date']
+    return pd.to_datetime(df['Date'])
+
+
+def _hours(df):
+    """Hour column as an integer array; invalid or missing hours become -1"""
+    hours = pd.to_numeric(df['Hour'], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.where(np.isnan(hours), -1, hours).astype(np.int64)
+
+
+@derived_column('Time_Period', requires=['Hour'])
+def time_period(df):
+    """Hour binned into rush/midday/night periods via the lookup table"""
+    hours = _hours(df)
+    in_range = (hours >= 0) & (hours <= 23)
+    codes = np.where(in_range, TIME_PERIOD_BY_HOUR[np.clip(hours, 0, 23)], TIME_PERIODS.index('Night'))
+    return pd.Categorical.from_codes(codes, categories=TIME_PERIODS)
+
+
+@derived_column('Day_of_Week', requires=['Date'])
+def day_of_week(df):
+    """Weekday name as a categorical (Monday first)"""
+    codes = _dates(df).dt.dayofweek.to_numpy(dtype=np.float64, na_value=np.nan)
+    codes = np.where(np.isnan(codes), -1, codes).astype(np.int8)
+    return pd.Categorical.from_codes(codes, categories=DAY_NAMES)
+
+
+@derived_column('Hour_of_Week', requires=['Date', 'Hour'])
+def hour_of_week(df):
+    """Hours since Monday 00:00 (0-167), useful for weekly seasonality"""
+    days = _dates(df).dt.dayofweek.to_numpy(dtype=np.float64, na_value=np.nan)
+    hours = _hours(df)
+    in_range = (hours >= 0) & (hours <= 23)
+    return pd.array(days * 24 + np.where(in_range, hours, np.nan), dtype='Int16')
+
+
+@derived_column('Congestion_Index', requires=['Vehicle_Count', 'Average_Speed_kmh'])
+def congestion_index(df):
+    """Vehicles per km/h of speed: high volume at low speed means heavy congestion"""
+    speed = df['Average_Speed_kmh'].to_numpy(dtype=np.float64, na_value=np.nan)
+    count = df['Vehicle_Count'].to_numpy(dtype=np.float64, na_value=np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(speed > 0, count / speed, np.nan)
+
+
+def add_derived_columns(df, columns=None):
+    """Add derived columns (default: Day_of_Week and Time_Period) to a traffic frame (in place)"""
+    for name in columns or DEFAULT_DERIVED_COLUMNS:
+        if name not in DERIVED_COLUMNS:
+            raise KeyError(f"Unknown derived column '{name}'. Registered: {sorted(DERIVED_COLUMNS)}")
+        func, requires = DERIVED_COLUMNS[name]
+        missing = [column for column in requires if column not in df.columns]
+        if missing:
+            raise KeyError(f"Derived column '{name}' requires missing columns: {missing}")
+        df[name] = func(df)
+    return df
+
+
+# ----------------------------------------------------------------------------
+# Benchmark: vectorized pipeline vs. the original per-row implementation
+# ----------------------------------------------------------------------------
+
+def add_derived_columns_apply(df):
+    """Original STEP 2 implementation (.dt.day_name() + per-row .apply), kept for benchmarking"""
+    df['Day_of_Week'] = _dates(df).dt.day_name()
+    df['Time_Period'] = df['Hour'].apply(categorize_time_period)
+    return df
+
+
+def benchmark_derived_columns(n_rows=1_000_000, repeats=3, seed=0):
+    """Time both implementations on `n_rows` synthetic rows; returns (apply_s, vectorized_s)"""
+    rng = np.random.default_rng(seed)
+    base = pd.DataFrame({
+        'Date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, n_rows), unit='D'),
+        'Hour': rng.integers(0, 24, n_rows),
+    })
+
+    timings = {}
+    for label, func in [('apply', add_derived_columns_apply), ('vectorized', add_derived_columns)]:
+        best = float('inf')
+        for _ in range(repeats):
+            frame = base.copy()
+            start = time.perf_counter()
+            func(frame)
+            best = min(best, time.perf_counter() - start)
+        timings[label] = best
+
+    # Both implementations must agree row for row
+    expected = add_derived_columns_apply(base.copy())
+    actual = add_derived_columns(base.copy())
+    for column in DEFAULT_DERIVED_COLUMNS:
+        assert (actual[column].astype(str) == expected[column].astype(str)).all(), column
+    return timings['apply'], timings['vectorized']
+
+
+if __name__ == "__main__":
+    for n_rows in [10_000, 100_000, 1_000_000]:
+        apply_s, vectorized_s = benchmark_derived_columns(n_rows)
+        print(f"{n_rows:>9,} rows: .apply {apply_s * 1000:8.1f} ms | "
+              f"vectorized {vectorized_s * 1000:7.1f} ms | speedup {apply_s / vectorized_s:6.1f}x")
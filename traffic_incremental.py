@@ -0,0 +1,237 @@
+"""
+Jakarta Traffic Analysis - Incremental Updates
+==============================================
+
+Keeps the TrafficAggregates behind every report statistic on disk, so a
+growing (append-only) traffic CSV never has to be re-parsed from the start.
+
+Each run resumes from the byte offset where the previous run stopped and
+folds only the appended rows into the stored sums/counts, so the work is
+proportional to the new data. Before resuming, the prefix is checked
+cheaply: the file must be the same one (device and inode), at least as
+long as the offset, and a SHA-256 digest of its first and last
+CHECK_WINDOW_BYTES before the offset must match the stored one. If the file
+was replaced or rewritten, the whole file is scanned again and only rows
+after the stored watermark (Date + Hour) are ingested. Rows at the
+watermark itself are kept unless their Location was already ingested for
+it. Rows older than the watermark cannot be told apart from rows that were
+ingested before, so they are skipped and counted in `state.late_rows`.
+
+Mean/mode imputation stays exact: the state holds non-missing sums and
+counts, and the fills are applied when the report is finalized, so the
+results are identical to a full recompute over the same rows.
+
+Only complete lines are saved in the state: bytes after the last newline
+may be a row the writer has not finished (or the last row of a file that
+does not end in a newline, like the bundled CSVs). If it has every field,
+that row is parsed and folded into the aggregates returned for the run,
+but not into the saved state, so it is read again once more bytes arrive
+(see `state.pending_rows`).
+"""
+
+import copy
+import csv
+import hashlib
+import io
+import os
+
+import pandas as pd
+
+from columnar_cache import CACHE_DIR_NAME
+from traffic_aggregates import DEFAULT_CHUNKSIZE, TrafficAggregates
+
+# Bytes read at a time while looking for the last newline
+READ_BLOCK_BYTES = 1 << 20
+
+# Bytes hashed at the start of the file and just before the resume offset
+CHECK_WINDOW_BYTES = 64 * 1024
+
+# Bumped when the saved state changes shape; an older state is rebuilt from the whole file
+STATE_VERSION = 2
+
+
+class _BoundedReader(io.RawIOBase):
+    """Read-only view of a binary file between two byte offsets"""
+
+    def __init__(self, handle, start, end):
+        self._handle = handle
+        self._handle.seek(start)
+        self._remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self._remaining)
+        if size <= 0:
+            return 0
+        data = self._handle.read(size)
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+
+class IncrementalTrafficState:
+    """Persisted aggregates plus the position reached in the source CSV"""
+
+    # Defaults for states saved before these fields existed
+    version = 1
+    watermark_locations = frozenset()
+    late_rows = 0
+    pending_bytes = 0
+    pending_rows = 0
+    prefix_check = None
+
+    def __init__(self, groupings=None):
+        self.version = STATE_VERSION
+        self.aggregates = TrafficAggregates(groupings)
+        self.columns = None
+        self.byte_offset = 0
+        # (device, inode, digest of the first and last bytes before byte_offset)
+        self.prefix_check = None
+        self.watermark = None
+        # Locations ingested at the watermark (a rescan keeps the other rows at that Date + Hour)
+        self.watermark_locations = frozenset()
+        # Rows of the last run skipped as older than the watermark, and the unterminated
+        # bytes (and rows parsed from them) that are read again on the next run
+        self.late_rows = 0
+        self.pending_bytes = 0
+        self.pending_rows = 0
+
+    @classmethod
+    def load(cls, state_path, groupings=None):
+        """Load a saved state, or start an empty one if there is none yet (or it has an older format)"""
+        if os.path.exists(state_path):
+            state = pd.read_pickle(state_path)
+            if state.version == STATE_VERSION:
+                return state
+        return cls(groupings)
+
+    def save(self, state_path):
+        """Atomically write the state next to the previous one"""
+        directory = os.path.dirname(os.path.abspath(state_path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = state_path + '.tmp'
+        pd.to_pickle(self, temp_path)
+        os.replace(temp_path, state_path)
+
+
+def _prefix_check(handle, offset):
+    """Cheap fingerprint of the bytes before `offset`: file identity plus a digest of its two ends"""
+    info = os.fstat(handle.fileno())
+    digest = hashlib.sha256()
+    for start in sorted({0, max(0, offset - CHECK_WINDOW_BYTES)}):
+        handle.seek(start)
+        digest.update(handle.read(min(CHECK_WINDOW_BYTES, offset - start)))
+    return info.st_dev, info.st_ino, digest.hexdigest()
+
+
+def _complete_end(handle, start, end):
+    """Offset just after the last newline between `start` and `end` (`start` if there is none)"""
+    position = end
+    while position > start:
+        block_start = max(start, position - READ_BLOCK_BYTES)
+        handle.seek(block_start)
+        newline = handle.read(position - block_start).rfind(b'\n')
+        if newline >= 0:
+            return block_start + newline + 1
+        position = block_start
+    return start
+
+
+def _row_timestamps(chunk):
+    """Date + Hour of every row as a timestamp"""
+    dates = pd.to_datetime(chunk['Date'], errors='coerce')
+    hours = pd.to_numeric(chunk['Hour'], errors='coerce')
+    return dates + pd.to_timedelta(hours, unit='h')
+
+
+def _new_rows(state, chunk, filter_watermark):
+    """The rows of a chunk to ingest and their timestamps (rows up to the watermark are dropped on a rescan)"""
+    timestamps = _row_timestamps(chunk)
+    if filter_watermark:
+        at_watermark = (timestamps == state.watermark).to_numpy()
+        seen = chunk['Location'].astype(str).isin(state.watermark_locations).to_numpy()
+        keep = (timestamps > state.watermark).to_numpy() | (at_watermark & ~seen)
+        state.late_rows += int((~keep & ~at_watermark).sum())
+        chunk, timestamps = chunk[keep], timestamps[keep]
+    return chunk, timestamps
+
+
+def update_incremental(file_path, state_path, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Fold the complete rows appended to `file_path` since the last run into
+    the persisted state at `state_path`. Returns (state, rows ingested,
+    aggregates of this run), where the aggregates also include the rows after
+    the last newline, which are not saved.
+    """
+    state = IncrementalTrafficState.load(state_path)
+    new_rows = 0
+    state.late_rows = 0
+
+    with open(file_path, 'rb') as handle:
+        end = os.fstat(handle.fileno()).st_size
+
+        # Resume after the stored offset only if the bytes before it look unchanged
+        resume = (
+            state.columns is not None
+            and state.byte_offset <= end
+            and _prefix_check(handle, state.byte_offset) == state.prefix_check
+        )
+        start = state.byte_offset if resume else 0
+        complete_end = _complete_end(handle, start, end)
+
+        if resume:
+            reader = io.BufferedReader(_BoundedReader(handle, start, complete_end))
+            chunks = pd.read_csv(reader, header=None, names=state.columns, chunksize=chunksize) \
+                if complete_end > start else []
+            filter_watermark = False
+        else:
+            reader = io.BufferedReader(_BoundedReader(handle, 0, complete_end))
+            chunks = pd.read_csv(reader, chunksize=chunksize) if complete_end > 0 else []
+            filter_watermark = state.watermark is not None
+
+        for chunk in chunks:
+            if state.columns is None:
+                state.columns = list(chunk.columns)
+            chunk, timestamps = _new_rows(state, chunk, filter_watermark)
+            if len(chunk) == 0:
+                continue
+            state.aggregates.update(chunk)
+            new_rows += len(chunk)
+            latest = timestamps.max()
+            if pd.isna(latest):
+                continue
+            locations = frozenset(chunk.loc[(timestamps == latest).to_numpy(), 'Location'].astype(str))
+            if state.watermark is None or latest > state.watermark:
+                state.watermark, state.watermark_locations = latest, locations
+            elif latest == state.watermark:
+                state.watermark_locations = state.watermark_locations | locations
+
+        state.byte_offset = complete_end
+        state.prefix_check = _prefix_check(handle, complete_end)
+        state.pending_bytes = end - complete_end
+
+        # The unterminated tail counts for this run only; the saved state stops at the last newline
+        tail = pd.DataFrame()
+        if state.pending_bytes and state.columns is not None:
+            handle.seek(complete_end)
+            text = handle.read(state.pending_bytes)
+            # A row cut off before its last field is still being written; it waits for the next run
+            if len(next(csv.reader([text.decode('utf-8', errors='replace')]), [])) == len(state.columns):
+                tail = pd.read_csv(io.BytesIO(text), header=None, names=state.columns)
+                tail, _ = _new_rows(state, tail, filter_watermark)
+        state.pending_rows = len(tail)
+
+    state.save(state_path)
+    aggregates = state.aggregates
+    if len(tail):
+        aggregates = copy.deepcopy(aggregates).update(tail)
+    return state, new_rows, aggregates
+
+
+def default_state_path(file_path):
+    """State file kept in the .data_cache directory next to the CSV"""
+    directory = os.path.join(os.path.dirname(os.path.abspath(file_path)), CACHE_DIR_NAME)
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(directory, stem + '.state.pkl')
@@ -0,0 +1,230 @@
+"""
+Jakarta Traffic Analysis - Query Cache
+======================================
+
+Answers slice-and-dice questions over a cleaned traffic frame, e.g.
+
+    engine = TrafficQueryEngine(data.df)
+    engine.query(filters={'Time_Period': 'Evening Rush', 'Day_of_Week': 'Friday'}, by='Location')
+    engine.query(filters={'Weather_Condition': 'Rainy'}, by='Hour')['Average_Speed_kmh'].idxmin()
+
+Every query is answered from a traffic_cube.TrafficCube: per-cell rows,
+exact sums and non-missing counts over the filter and group columns. The
+first query builds the base cuboid over CUBE_DIMENSIONS from the rows once
+(or a cube over the query's own columns when it groups or filters by
+others, e.g. Date); every other question is a roll-up of those cells.
+Filtering the cells and summing them over the remaining keys gives the
+same means as filtering the rows first, so:
+
+- results are cached under a normalized (filters, group keys, metrics,
+  aggregation) key, so the same question asked with the filters in a
+  different order is a cache hit
+- a question over any subset of a cached cube's dimensions is answered
+  by rolling that cube up (TrafficCube.partial), without touching the rows
+- cubes and results share one LRU cache with a memory budget (in bytes);
+  only the result lookups count as hits and misses, one per query
+- set_data() installs a new version of the data and drops everything
+  cached for the old one
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from fused_groupby import LOW_SUFFIX, sum_partials
+from traffic_aggregates import METRICS
+from traffic_cube import CUBE_DIMENSIONS, TrafficCube
+
+QUERY_AGGREGATIONS = ['mean', 'sum', 'count']
+
+DEFAULT_MEMORY_BUDGET = 64 * 2**20
+
+
+def _frame_bytes(frame):
+    return int(frame.memory_usage(index=True, deep=True).sum())
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple, set, frozenset, pd.Index)):
+        return list(value)
+    return [value]
+
+
+def _cube_bytes(cube):
+    """Memory of a cube's base cuboid and the roll-ups it has memoized so far"""
+    partials = [cube.partials[cube.dimensions]] + list(cube.rollups.values())
+    return sum(_frame_bytes(partial) for partial in partials if partial is not None)
+
+
+def normalize_query(filters=None, by=None, metrics=None, agg='mean'):
+    """
+    Canonical, hashable form of a query: filters become a sorted tuple of
+    (column, sorted allowed values); group keys keep their order (it is the
+    order of the result index); metrics default to every metric.
+    """
+    if agg not in QUERY_AGGREGATIONS:
+        raise ValueError(f"Unknown aggregation '{agg}'. Choose from {QUERY_AGGREGATIONS}")
+    normalized_filters = tuple(sorted(
+        (column, tuple(sorted(set(_as_list(values)), key=repr)))
+        for column, values in (filters or {}).items()
+    ))
+    by = tuple(_as_list(by))
+    metrics = tuple(_as_list(metrics)) or tuple(METRICS)
+    unknown = [metric for metric in metrics if metric not in METRICS]
+    if unknown:
+        raise ValueError(f"Unknown metrics {unknown}. Choose from {METRICS}")
+    return normalized_filters, by, metrics, agg
+
+
+class QueryCache:
+    """Least-recently-used cache whose entries must fit in `memory_budget` bytes"""
+
+    def __init__(self, memory_budget=DEFAULT_MEMORY_BUDGET):
+        self.memory_budget = memory_budget
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        value = self.lookup(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def lookup(self, key):
+        """Like get(), but not counted as a hit or miss (for entries used internally)"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value, nbytes):
+        if key in self.entries:
+            self.bytes -= self.entries.pop(key)[1]
+        if nbytes > self.memory_budget:
+            return
+        self.entries[key] = (value, nbytes)
+        self.bytes += nbytes
+        while self.bytes > self.memory_budget:
+            _, (_, evicted_bytes) = self.entries.popitem(last=False)
+            self.bytes -= evicted_bytes
+            self.evictions += 1
+
+    def keys(self):
+        return list(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def stats(self):
+        return {'entries': len(self.entries), 'bytes': self.bytes, 'memory_budget': self.memory_budget,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+class TrafficQueryEngine:
+    """
+    Cached filter + groupby queries over a cleaned traffic frame. Pass the
+    TrafficCube already built from `df` (e.g. data.aggregates) as `cube` to
+    reuse it instead of aggregating the rows again.
+    """
+
+    def __init__(self, df, version=0, memory_budget=DEFAULT_MEMORY_BUDGET, cube=None):
+        self.cache = QueryCache(memory_budget)
+        self._lock = threading.RLock()
+        self.set_data(df, version, cube)
+
+    def set_data(self, df, version=None, cube=None):
+        """Install a new version of the data (default: the next version number) and drop cached entries"""
+        with self._lock:
+            self.df = df
+            self.version = version if version is not None else getattr(self, 'version', -1) + 1
+            self.cache.clear()
+            if cube is not None:
+                self.cache.put(('cube', cube.dimensions), cube, _cube_bytes(cube))
+
+    # ------------------------------------------------------------------
+    # Cubes
+    # ------------------------------------------------------------------
+
+    def cube(self, dimensions):
+        """Cells (rows, exact metric sums, non-missing counts) per combination of `dimensions` (sorted)"""
+        dimensions = tuple(sorted(set(dimensions)))
+        with self._lock:
+            key = self._smallest_cached_cube(dimensions)
+            if key is None:
+                base = CUBE_DIMENSIONS if set(dimensions) <= set(CUBE_DIMENSIONS) else dimensions
+                key = ('cube', tuple(base))
+                cube = TrafficCube(base).update(self.df)
+            else:
+                cube = self.cache.lookup(key)
+            cells = cube.partial(dimensions) if dimensions else cube.partials[cube.dimensions]
+            # Stored again so the memory budget counts the roll-up the cube has just memoized
+            self.cache.put(key, cube, _cube_bytes(cube))
+            return cells
+
+    def _smallest_cached_cube(self, dimensions):
+        """Key of the cached cube with the fewest cells that has every requested dimension"""
+        candidates = []
+        for key in self.cache.keys():
+            if key[0] == 'cube' and set(dimensions) <= set(key[1]):
+                candidates.append((self.cache.entries[key][0].cells, key))
+        return min(candidates)[1] if candidates else None
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def query(self, filters=None, by=None, metrics=None, agg='mean'):
+        """
+        Aggregate `metrics` (default: all) with `agg` ('mean', 'sum' or 'count')
+        over the rows matching `filters` ({column: value or list of values}),
+        grouped by `by`. Equivalent to
+        df[filters].groupby(by, observed=True)[metrics].agg(agg).
+        """
+        filters, by, metrics, agg = normalize_query(filters, by, metrics, agg)
+        key = ('result', filters, by, metrics, agg)
+        with self._lock:
+            result = self.cache.get(key)
+            if result is not None:
+                return result.copy()
+
+            dimensions = [column for column, _ in filters] + list(by)
+            cells = self.cube(dimensions)
+            # groupby drops rows with a missing key; the cube keeps them as their own cells
+            keep = cells.index.to_frame().notna().all(axis=1).to_numpy() if dimensions else \
+                np.ones(len(cells), dtype=bool)
+            for column, values in filters:
+                keep = keep & cells.index.get_level_values(column).isin(values)
+            cells = cells[keep]
+            if by:
+                totals = sum_partials(cells, list(by))
+            else:
+                totals = sum_partials(cells.set_axis(pd.Index(['all'] * len(cells)))).reindex(['all'], fill_value=0)
+
+            result = pd.DataFrame(index=totals.index)
+            for metric in metrics:
+                # Each exact sum is rounded once
+                total = totals[f'{metric}_sum'] + totals[f'{metric}_sum{LOW_SUFFIX}']
+                if agg == 'mean':
+                    result[metric] = total / totals[f'{metric}_count']
+                elif agg == 'sum':
+                    result[metric] = total
+                else:
+                    result[metric] = totals[f'{metric}_count'].astype('int64')
+            self.cache.put(key, result, _frame_bytes(result))
+            return result.copy()
+
+    def cache_stats(self):
+        """Hit/miss/eviction counters and memory use of the cache"""
+        with self._lock:
+            return {'version': self.version, **self.cache.stats()}
@@ -15,34 +15,63 @@ data = {
     'StudyHours': [10, 12, 8, 11, 15, 9]
 }
 
-# You will learn to create a DataFrame - a powerful, table-like structure.
-df = pd.DataFrame(data)
-
-print("----------- Original Student Data -----------")
-print(df)
-print("\n")
-
-# You'll learn how to handle problems, like missing scores.
-# We'll fill the missing score with the average of other scores.
-average_score = df['Score'].mean()
-df['Score'].fillna(average_score, inplace=True)
-
-print("----------- Data After Cleaning (No Missing Scores) -----------")
-print(df)
-print("\n")
-
-# You'll be able to ask complex questions and get answers easily.
-# Q1: What is the average score for each subject?
-print("----------- Average Score Per Subject -----------")
-avg_score_by_subject = df.groupby('Subject')['Score'].mean().round(2)
-print(avg_score_by_subject)
-print("\n")
-
-# Q2: Who is the top-performing student in Math?
-print("----------- Top Student in Math -----------")
-math_students = df[df['Subject'] == 'Math']
-top_math_student = math_students.loc[math_students['Score'].idxmax()]
-print(top_math_student)
-print("\n")
-
-print("🎉 By the end of this lesson, you will be able to perform this entire analysis yourself!")
+
+def load_students(file_path=None):
+    """The lesson data above, or a student CSV with the same columns (e.g. sample_student_data.csv)"""
+    # You will learn to create a DataFrame - a powerful, table-like structure.
+    if file_path is None:
+        return pd.DataFrame(data)
+    return pd.read_csv(file_path)
+
+
+def fill_missing_scores(df):
+    """Fill missing scores with the average of the other scores"""
+    average_score = df['Score'].mean()
+    df['Score'] = df['Score'].fillna(average_score)
+    return df
+
+
+def average_score_by_subject(df):
+    """Q1: What is the average score for each subject?"""
+    return df.groupby('Subject')['Score'].mean().round(2)
+
+
+def top_student(df, subject='Math'):
+    """Q2: Who is the top-performing student in a subject?"""
+    subject_students = df[df['Subject'] == subject]
+    return subject_students.loc[subject_students['Score'].idxmax()]
+
+
+def main():
+    df = load_students()
+
+    print("----------- Original Student Data -----------")
+    print(df)
+    print("\n")
+
+    # You'll learn how to handle problems, like missing scores.
+    # We'll fill the missing score with the average of other scores.
+    df = fill_missing_scores(df)
+
+    print("----------- Data After Cleaning (No Missing Scores) -----------")
+    print(df)
+    print("\n")
+
+    # You'll be able to ask complex questions and get answers easily.
+    # Q1: What is the average score for each subject?
+    print("----------- Average Score Per Subject -----------")
+    avg_score_by_subject = average_score_by_subject(df)
+    print(avg_score_by_subject)
+    print("\n")
+
+    # Q2: Who is the top-performing student in Math?
+    print("----------- Top Student in Math -----------")
+    top_math_student = top_student(df, 'Math')
+    print(top_math_student)
+    print("\n")
+
+    print("🎉 By the end of this lesson, you will be able to perform this entire analysis yourself!")
+
+
+if __name__ == "__main__":
+    main()